@@ -0,0 +1,346 @@
+import bisect
+from collections import namedtuple
+
+
+# Areas covered by a set of shapes; `overlaps` holds, per input shape, the
+# part of it that is also covered by at least one other shape
+Coverage = namedtuple('Coverage', ['union_area', 'total_area', 'overlap_area', 'overlaps'])
+
+# Room footprint of a floor plan: covered, doubly covered and uncovered area
+# of the plan, and the overlap area of every room
+Footprint = namedtuple('Footprint', ['covered_area', 'overlap_area', 'free_area', 'room_overlaps'])
+
+
+class _CoverageTree:
+    """
+    Segment tree over the elementary intervals between sorted y coordinates.
+
+    Every node keeps how many rectangles cover its whole interval, and the
+    length of its interval covered at least once and at least twice, so both
+    lengths of the whole range are read from the root after each update.
+    """
+
+    def __init__(self, ys):
+        """
+        Build an empty tree
+
+        Args:
+            ys: Sorted distinct y coordinates (at least two)
+        """
+        self.ys = ys
+        self.size = len(ys) - 1
+        self.count = [0] * (4 * self.size)
+        self.covered = [0.0] * (4 * self.size)
+        self.covered_twice = [0.0] * (4 * self.size)
+
+    def update(self, low, high, delta):
+        """
+        Add `delta` to the cover count of the elementary intervals [low, high)
+
+        Args:
+            low: Index of the first elementary interval
+            high: Index past the last elementary interval
+            delta: +1 when a rectangle starts, -1 when it ends
+        """
+        self._update(1, 0, self.size, low, high, delta)
+
+    def _update(self, node, left, right, low, high, delta):
+        if high <= left or right <= low:
+            return
+        if low <= left and right <= high:
+            self.count[node] += delta
+        else:
+            middle = (left + right) // 2
+            self._update(2 * node, left, middle, low, high, delta)
+            self._update(2 * node + 1, middle, right, low, high, delta)
+        self._pull(node, left, right)
+
+    def _pull(self, node, left, right):
+        """Recompute the covered lengths of a node from its count and children"""
+        count = self.count[node]
+        length = self.ys[right] - self.ys[left]
+        leaf = right - left == 1
+
+        if count >= 2:
+            self.covered[node] = self.covered_twice[node] = length
+        elif count == 1:
+            self.covered[node] = length
+            # Anything covered once more below is covered twice here
+            self.covered_twice[node] = 0.0 if leaf else self.covered[2 * node] + self.covered[2 * node + 1]
+        elif leaf:
+            self.covered[node] = self.covered_twice[node] = 0.0
+        else:
+            self.covered[node] = self.covered[2 * node] + self.covered[2 * node + 1]
+            self.covered_twice[node] = self.covered_twice[2 * node] + self.covered_twice[2 * node + 1]
+
+    @property
+    def covered_length(self):
+        """Length of the y range covered at least once"""
+        return self.covered[1]
+
+    @property
+    def covered_twice_length(self):
+        """Length of the y range covered at least twice"""
+        return self.covered_twice[1]
+
+
+def _sweep_rectangles(rectangles):
+    """
+    Sweep a vertical line over rectangles
+
+    Args:
+        rectangles: List of (min_x, min_y, max_x, max_y) tuples
+
+    Returns:
+        (area covered at least once, area covered at least twice)
+    """
+    rectangles = [rect for rect in rectangles if rect[2] > rect[0] and rect[3] > rect[1]]
+    if not rectangles:
+        return 0.0, 0.0
+
+    ys = sorted({y for rect in rectangles for y in (rect[1], rect[3])})
+    index = {y: i for i, y in enumerate(ys)}
+    events = []
+    for min_x, min_y, max_x, max_y in rectangles:
+        events.append((min_x, 1, index[min_y], index[max_y]))
+        events.append((max_x, -1, index[min_y], index[max_y]))
+    events.sort()
+
+    tree = _CoverageTree(ys)
+    area = area_twice = 0.0
+    previous_x = events[0][0]
+    for x, delta, low, high in events:
+        width = x - previous_x
+        if width:
+            area += tree.covered_length * width
+            area_twice += tree.covered_twice_length * width
+            previous_x = x
+        tree.update(low, high, delta)
+    return area, area_twice
+
+
+def union_area(rectangles):
+    """
+    Get the exact area covered by a set of axis-aligned rectangles
+
+    A sweep line with a segment tree over the compressed y coordinates keeps
+    the covered length up to date, so the cost is O(n log n).
+
+    Args:
+        rectangles: Iterable of (min_x, min_y, max_x, max_y) tuples
+
+    Returns:
+        Area of the union
+    """
+    return _sweep_rectangles(list(rectangles))[0]
+
+
+def rectilinear_rectangles(points):
+    """
+    Split a polygon with only horizontal and vertical edges into rectangles
+
+    The polygon is cut into horizontal slabs at its vertex y coordinates;
+    within a slab its interior is a fixed set of x intervals.
+
+    Args:
+        points: List of (x, y) vertices
+
+    Returns:
+        List of disjoint (min_x, min_y, max_x, max_y) rectangles, or None if
+        the polygon has a slanted edge
+    """
+    edges = list(zip(points, points[1:] + points[:1]))
+    if any(x1 != x2 and y1 != y2 for (x1, y1), (x2, y2) in edges):
+        return None
+
+    vertical = [(x1, min(y1, y2), max(y1, y2)) for (x1, y1), (x2, y2) in edges if x1 == x2 and y1 != y2]
+    ys = sorted({y for _, y in points})
+    rectangles = []
+    for low, high in zip(ys, ys[1:]):
+        middle = (low + high) / 2
+        xs = sorted(x for x, y1, y2 in vertical if y1 < middle < y2)
+        rectangles.extend((xs[i], low, xs[i + 1], high) for i in range(0, len(xs) - 1, 2))
+    return rectangles
+
+
+def _overlapping_pairs(rectangles):
+    """
+    Find the pairs of rectangles whose interiors overlap (sort and sweep on x)
+
+    Args:
+        rectangles: List of (min_x, min_y, max_x, max_y) tuples
+
+    Returns:
+        List of (i, j) index pairs
+    """
+    order = sorted(range(len(rectangles)), key=lambda i: rectangles[i][0])
+    active = []
+    pairs = []
+    for i in order:
+        min_x, min_y, max_x, max_y = rectangles[i]
+        active = [j for j in active if rectangles[j][2] > min_x]
+        for j in active:
+            other = rectangles[j]
+            if other[1] < max_y and other[3] > min_y:
+                pairs.append((j, i))
+        active.append(i)
+    return pairs
+
+
+def _rectangle_coverage(pieces):
+    """
+    Coverage of shapes that are unions of disjoint rectangles
+
+    Args:
+        pieces: List with, per shape, its list of rectangles
+
+    Returns:
+        Coverage
+    """
+    rectangles = []
+    owners = []
+    for shape, shape_rectangles in enumerate(pieces):
+        rectangles.extend(shape_rectangles)
+        owners.extend([shape] * len(shape_rectangles))
+
+    union, covered_twice = _sweep_rectangles(rectangles)
+    total = float(sum((rect[2] - rect[0]) * (rect[3] - rect[1]) for rect in rectangles))
+
+    # Each rectangle only meets the few others its sweep found, so the
+    # overlap of a shape is a small union clipped to its own rectangles
+    clipped = {}
+    for i, j in _overlapping_pairs(rectangles):
+        if owners[i] == owners[j]:
+            continue
+        first, second = rectangles[i], rectangles[j]
+        clip = (max(first[0], second[0]), max(first[1], second[1]),
+                min(first[2], second[2]), min(first[3], second[3]))
+        clipped.setdefault(i, []).append(clip)
+        clipped.setdefault(j, []).append(clip)
+
+    overlaps = [0.0] * len(pieces)
+    for i, clips in clipped.items():
+        overlaps[owners[i]] += union_area(clips)
+
+    return Coverage(union, total, covered_twice, overlaps)
+
+
+def _x_at(edge, y):
+    """X coordinate of a non-horizontal edge (x1, y1, x2, y2), y1 < y2, at height y"""
+    x1, y1, x2, y2 = edge
+    return x1 + (x2 - x1) * (y - y1) / (y2 - y1)
+
+
+def _polygon_coverage(polygons):
+    """
+    Coverage of arbitrary simple polygons
+
+    The plane is cut into horizontal slabs at every vertex y and at every y
+    where edges of two different polygons cross. Inside such a slab all
+    covered lengths change linearly with y, so measuring them at the middle
+    of the slab gives the exact area.
+
+    Args:
+        polygons: List of vertex lists
+
+    Returns:
+        Coverage
+    """
+    edges = []
+    for shape, points in enumerate(polygons):
+        for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+            if y1 != y2:
+                edge = (x1, y1, x2, y2) if y1 < y2 else (x2, y2, x1, y1)
+                edges.append((edge, shape))
+    edges.sort(key=lambda item: item[0][1])
+    starts = [edge[1] for edge, _ in edges]
+
+    union = covered_twice = total = 0.0
+    overlaps = [0.0] * len(polygons)
+    ys = sorted({y for points in polygons for _, y in points})
+    for low, high in zip(ys, ys[1:]):
+        active = [(edge, shape) for edge, shape in edges[:bisect.bisect_right(starts, low)] if edge[3] >= high]
+
+        # Crossings between different polygons split the slab further
+        cuts = {low, high}
+        ends = [(_x_at(edge, low), _x_at(edge, high)) for edge, _ in active]
+        for i in range(len(active)):
+            for j in range(i + 1, len(active)):
+                if active[i][1] == active[j][1]:
+                    continue
+                start = ends[i][0] - ends[j][0]
+                end = ends[i][1] - ends[j][1]
+                if start * end < 0:
+                    cuts.add(low + (high - low) * start / (start - end))
+
+        cuts = sorted(cuts)
+        for bottom, top in zip(cuts, cuts[1:]):
+            height = top - bottom
+            middle = (bottom + top) / 2
+            crossings = {}
+            for edge, shape in active:
+                crossings.setdefault(shape, []).append(_x_at(edge, middle))
+
+            events = []
+            for shape, xs in crossings.items():
+                xs.sort()
+                for i in range(0, len(xs) - 1, 2):
+                    events.append((xs[i], 1, shape))
+                    events.append((xs[i + 1], -1, shape))
+                    total += (xs[i + 1] - xs[i]) * height
+            events.sort()
+
+            inside = {}
+            previous_x = None
+            for x, delta, shape in events:
+                if previous_x is not None and x > previous_x:
+                    width = (x - previous_x) * height
+                    if inside:
+                        union += width
+                    if len(inside) >= 2:
+                        covered_twice += width
+                        for other in inside:
+                            overlaps[other] += width
+                previous_x = x
+                inside[shape] = inside.get(shape, 0) + delta
+                if not inside[shape]:
+                    del inside[shape]
+
+    return Coverage(union, total, covered_twice, overlaps)
+
+
+def shape_coverage(shapes):
+    """
+    Get the exact union, overlap and per-shape overlap areas of a set of shapes
+
+    Rectangles and polygons with only axis-aligned edges are reduced to
+    rectangles and measured with the segment-tree sweep in O(n log n) (plus
+    the overlapping pairs). A polygon with a slanted edge switches to an
+    exact slab sweep over the polygon edges.
+
+    Args:
+        shapes: List of (min_x, min_y, max_x, max_y) rectangles or lists of
+            absolute (x, y) polygon vertices
+
+    Returns:
+        Coverage with `overlaps` in the order of `shapes`
+    """
+    pieces = []
+    for shape in shapes:
+        if len(shape) == 4 and not isinstance(shape[0], (tuple, list)):
+            pieces.append([tuple(shape)])
+            continue
+        rectangles = rectilinear_rectangles(list(shape))
+        if rectangles is None:
+            break
+        pieces.append(rectangles)
+    else:
+        return _rectangle_coverage(pieces)
+
+    polygons = []
+    for shape in shapes:
+        if len(shape) == 4 and not isinstance(shape[0], (tuple, list)):
+            min_x, min_y, max_x, max_y = shape
+            shape = [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)]
+        polygons.append(list(shape))
+    return _polygon_coverage(polygons)
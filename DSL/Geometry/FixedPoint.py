@@ -0,0 +1,165 @@
+import hashlib
+import struct
+
+from DSL.Geometry.SpatialIndex import element_bounds
+
+
+# Resolution used to fingerprint floor plans that have no grid of their own
+DEFAULT_FINGERPRINT_RESOLUTION = 1000
+
+# Numeric attributes snapped besides an element's GEOMETRY_FIELDS
+_ANCHOR_FIELDS = ('distance_wall',)
+
+
+class FixedPointGrid:
+    """
+    Integer geometry kernel.
+
+    Coordinates are quantized to 1/resolution plan units: every value is a
+    whole number of grid steps, so converting it to an int with to_int() is
+    exact and intersection, adjacency and snapping tests can compare ints.
+    With a resolution of 1 the stored coordinates are plain ints.
+    """
+
+    def __init__(self, resolution=1):
+        """
+        Create a grid
+
+        Args:
+            resolution: Grid steps per plan unit (e.g. 10 for millimetres when
+                the plan is drawn in centimetres)
+        """
+        if int(resolution) != resolution or resolution < 1:
+            raise ValueError(f"Grid resolution must be a positive integer: {resolution}")
+        self.resolution = int(resolution)
+
+    def to_int(self, value):
+        """
+        Get a coordinate as a number of grid steps
+
+        Args:
+            value: Coordinate in plan units
+
+        Returns:
+            Nearest int number of grid steps
+        """
+        return round(value * self.resolution)
+
+    def from_int(self, steps):
+        """
+        Get the coordinate of a number of grid steps
+
+        Args:
+            steps: Int number of grid steps
+
+        Returns:
+            Coordinate in plan units (an int when the resolution is 1)
+        """
+        if self.resolution == 1:
+            return int(steps)
+        return steps / self.resolution
+
+    def snap(self, value):
+        """
+        Round a coordinate to the grid
+
+        Args:
+            value: Coordinate in plan units (None is kept)
+
+        Returns:
+            Snapped coordinate
+        """
+        if value is None:
+            return None
+        return self.from_int(self.to_int(value))
+
+    def snap_points(self, points):
+        """
+        Round polygon vertices to the grid
+
+        Args:
+            points: Sequence of (x, y) vertices or None
+
+        Returns:
+            Tuple of snapped vertices (None is kept)
+        """
+        if not points:
+            return points
+        return tuple((self.snap(x), self.snap(y)) for x, y in points)
+
+    def snap_value(self, name, value):
+        """
+        Round the value of one geometry attribute to the grid
+
+        Args:
+            name: Attribute name
+            value: New value
+
+        Returns:
+            Snapped value
+        """
+        if name == 'points':
+            return self.snap_points(value)
+        if isinstance(value, (int, float)):
+            return self.snap(value)
+        return value
+
+    def snap_element(self, element):
+        """
+        Round the geometry of an element to the grid in place
+
+        Args:
+            element: Model object
+        """
+        fields = getattr(element, 'GEOMETRY_FIELDS', ('x', 'y', 'width', 'height')) + _ANCHOR_FIELDS
+        for name in fields:
+            value = getattr(element, name, None)
+            if value is None:
+                continue
+            snapped = self.snap_value(name, value)
+            if snapped != value or type(snapped) is not type(value):
+                setattr(element, name, snapped)
+
+    def int_bounds(self, element):
+        """
+        Get the bounding box of an element in grid steps
+
+        Args:
+            element: Floor plan element
+
+        Returns:
+            (min_x, min_y, max_x, max_y) tuple of ints
+        """
+        return tuple(self.to_int(value) for value in element_bounds(element))
+
+    def fingerprint(self, elements_by_kind, header=None):
+        """
+        Get a digest of the geometry of a set of elements
+
+        The digest only depends on the grid coordinates, ids and order of the
+        elements, so it is identical across runs and processes and can key
+        caches of layout or rendering results.
+
+        Args:
+            elements_by_kind: Dictionary of kind -> list of elements
+            header: Optional header dictionary
+
+        Returns:
+            Hexadecimal digest string
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(struct.pack('<q', self.resolution))
+        if header:
+            digest.update(struct.pack('<qq', self.to_int(header['width']), self.to_int(header['height'])))
+
+        for kind, elements in elements_by_kind.items():
+            digest.update(kind.encode('utf-8') + b'\0')
+            digest.update(struct.pack('<q', len(elements)))
+            for element in elements:
+                digest.update(str(getattr(element, 'id', None)).encode('utf-8') + b'\0')
+                digest.update(struct.pack('<4q', *self.int_bounds(element)))
+                points = getattr(element, 'points', None)
+                if points:
+                    steps = [self.to_int(coordinate) for point in points for coordinate in point]
+                    digest.update(struct.pack(f'<{len(steps)}q', *steps))
+        return digest.hexdigest()
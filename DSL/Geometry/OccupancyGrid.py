@@ -0,0 +1,234 @@
+import math
+
+import numpy as np
+
+
+class OccupancyGrid:
+    """
+    Raster of the taken parts of a rectangular area, for free-space searches.
+
+    The area [0, width] x [0, height] is split into square cells; a cell is
+    taken once any blocked box reaches into it. A box fits at a cell corner
+    when all the cells it covers are free. Corners are searched in square
+    tiles, closest tile first, each tested at once by ANDing shifted rows
+    and columns of its cells, so a search costs a few array operations
+    however many boxes are blocked. Cells only ever become taken, so a tile
+    where a box of some size fits nowhere is remembered and skipped by later
+    searches for boxes at least as wide and as tall.
+    """
+
+    # Corners per side of the tiles searched at once
+    TILE = 64
+
+    # Box heights (in cells) dead tiles are remembered for; taller boxes
+    # share the entry of this height
+    DEAD_ROWS = 64
+
+    def __init__(self, width, height, cell_size):
+        """
+        Create a grid with every cell free
+
+        Args:
+            width: Width of the area
+            height: Height of the area
+            cell_size: Side of a cell (a power of two keeps the corner
+                coordinates exact)
+        """
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.columns = max(1, math.ceil(width / cell_size))
+        self.rows = max(1, math.ceil(height / cell_size))
+        self.taken = np.zeros((self.rows, self.columns), dtype=bool)
+
+        # First and last corner coordinates of every tile column and row
+        tile_columns = np.arange(0, self.columns, self.TILE)
+        tile_rows = np.arange(0, self.rows, self.TILE)
+        self._tile_x = (tile_columns * cell_size, (np.minimum(tile_columns + self.TILE, self.columns) - 1) * cell_size)
+        self._tile_y = (tile_rows * cell_size, (np.minimum(tile_rows + self.TILE, self.rows) - 1) * cell_size)
+
+        # Per tile and number of rows a box covers, the fewest columns of a
+        # box of that height known to fit nowhere in the tile
+        self._dead_columns = np.full((len(tile_rows), len(tile_columns), self.DEAD_ROWS + 1),
+                                     self.columns + 1, dtype=np.int32)
+
+    @staticmethod
+    def suggest_cell_size(min_extent, width, height, max_cells=1 << 22):
+        """
+        Pick a power-of-two cell size for an area and its boxes
+
+        Args:
+            min_extent: Smallest box side to be placed
+            width: Width of the area
+            height: Height of the area
+            max_cells: Largest number of cells of the grid
+
+        Returns:
+            An eighth of min_extent, rounded down to a power of two, or the
+            smallest power of two that keeps the grid within max_cells
+        """
+        size = max(min_extent / 8, math.sqrt(max(width * height, 0) / max_cells), 1e-9)
+        exponent = math.floor(math.log2(size))
+        if 2.0 ** exponent * 2.0 ** exponent * max_cells < width * height:
+            exponent += 1
+        return 2 ** exponent if exponent >= 0 else 2.0 ** exponent
+
+    def block(self, min_x, min_y, max_x, max_y):
+        """
+        Mark the cells that reach into the inside of a box as taken
+
+        Args:
+            min_x, min_y, max_x, max_y: Bounds of the box
+        """
+        size = self.cell_size
+        first_column = max(0, math.floor(min_x / size))
+        first_row = max(0, math.floor(min_y / size))
+        last_column = min(self.columns, math.ceil(max_x / size))
+        last_row = min(self.rows, math.ceil(max_y / size))
+        if first_column < last_column and first_row < last_row:
+            self.taken[first_row:last_row, first_column:last_column] = True
+
+    def nearest_free(self, width, height, x, y):
+        """
+        Find the cell corner closest to a point where a box fits
+
+        The box must lie inside the area and cover free cells only. The
+        corners within about a box size of the point are tested first; if
+        none of them is closer than the corners beyond, tiles are searched in
+        order of their distance from the point until the closest free corner
+        found is nearer than any tile left.
+
+        Args:
+            width: Width of the box
+            height: Height of the box
+            x, y: Point the top-left corner of the box should be close to
+
+        Returns:
+            (x, y) of the closest free corner (the topmost, then leftmost on
+            ties), or None if the box fits nowhere
+        """
+        size = self.cell_size
+        max_column = math.floor((self.width - width) / size)
+        max_row = math.floor((self.height - height) / size)
+        if max_column < 0 or max_row < 0:
+            return None
+        span = (math.ceil(width / size), math.ceil(height / size))
+        limits = (max_column, max_row)
+
+        # Corners beyond the window are more than reach + 1/2 cells away
+        column = min(max(round(x / size), 0), max_column)
+        row = min(max(round(y / size), 0), max_row)
+        reach = max(span)
+        best, _ = self._closest_corner(max(0, row - reach), min(max_row, row + reach) + 1,
+                                       max(0, column - reach), min(max_column, column + reach) + 1,
+                                       span, limits, x, y)
+        if best is not None and best[0] <= ((reach + 0.5) * size) ** 2:
+            return best[2], best[1]
+
+        # Closest distance from the point to the corners of each tile
+        dead = self._dead_columns[:, :, min(span[1], self.DEAD_ROWS)] <= span[0]
+        first_x, last_x = self._tile_x
+        first_y, last_y = self._tile_y
+        dx = np.maximum(np.maximum(first_x - x, x - last_x), 0.0)
+        dy = np.maximum(np.maximum(first_y - y, y - last_y), 0.0)
+        dx[first_x > max_column * size] = np.inf
+        dy[first_y > max_row * size] = np.inf
+        lower = dy[:, None] ** 2 + dx[None, :] ** 2
+        lower[dead] = np.inf
+
+        # Tiles nearer than the best corner so far, closest first, in rounds
+        # of growing radius so that far tiles are rarely sorted
+        lower = lower.ravel()
+        searched, radius = -1.0, (self.TILE * size) ** 2
+        while True:
+            limit = best[0] if best is not None else radius
+            tiles = np.flatnonzero((lower > searched) & (lower <= limit))
+            for tile in tiles[np.argsort(lower[tiles], kind='stable')].tolist():
+                if best is not None and lower[tile] > best[0]:
+                    break
+                tile_row, tile_column = divmod(tile, dead.shape[1])
+                first_row, first_column = tile_row * self.TILE, tile_column * self.TILE
+                corner, dead_span = self._closest_corner(first_row, first_row + self.TILE,
+                                                         first_column, first_column + self.TILE,
+                                                         span, limits, x, y)
+                if dead_span is not None and dead_span[1] <= self.DEAD_ROWS:
+                    dead_columns = self._dead_columns[tile_row, tile_column, dead_span[1]:]
+                    np.minimum(dead_columns, dead_span[0], out=dead_columns)
+                if corner is not None and (best is None or corner < best):
+                    best = corner
+
+            if best is not None and best[0] <= limit:
+                return best[2], best[1]
+            if best is None and not np.isfinite(lower[lower > limit]).any():
+                return None
+            searched, radius = limit, radius * 4
+
+    @staticmethod
+    def _free_runs(free, length):
+        """
+        Find the cells starting a run of free cells along the first axis
+
+        Args:
+            free: Bool array of the free cells
+            length: Number of free cells a run needs
+
+        Returns:
+            (bool array shorter by length - 1 along the first axis, None or
+            the shortest run length found nowhere if there is no run)
+        """
+        # Runs of 1, 2, 4, ... cells are the AND of two shifted shorter runs
+        covered = 1
+        while covered < length:
+            step = min(covered, length - covered)
+            free = free[:-step] & free[step:]
+            covered += step
+            if not free.any():
+                return free, covered
+        return free, None
+
+    def _closest_corner(self, first_row, end_row, first_column, end_column, span, limits, x, y):
+        """
+        Find the closest free corner in a block of corners
+
+        Args:
+            first_row, end_row: Corner rows to test (end exclusive)
+            first_column, end_column: Corner columns to test (end exclusive)
+            span: (columns, rows) of cells covered by the box
+            limits: (max_column, max_row) of the corners inside the area
+            x, y: Point to measure the distance from
+
+        Returns:
+            ((squared distance, y, x) of the closest free corner within the
+            limits or None, None if the box fits at some corner of the block
+            with its cells inside the grid or else the (columns, rows) of a
+            box, no larger than this one, that fits at none of them)
+        """
+        span_columns, span_rows = span
+        end_row = min(end_row, self.rows - span_rows + 1)
+        end_column = min(end_column, self.columns - span_columns + 1)
+        if end_row <= first_row:
+            return None, (1, span_rows)
+        if end_column <= first_column:
+            return None, (span_columns, 1)
+
+        # Corners whose box covers free cells only: runs of free cells down
+        # the columns, then (transposed) along the rows. A shorter run found
+        # nowhere rules out smaller boxes too.
+        free = ~self.taken[first_row:end_row + span_rows - 1, first_column:end_column + span_columns - 1]
+        free, missing_rows = self._free_runs(free, span_rows)
+        if missing_rows is not None:
+            return None, (1, missing_rows)
+        free, missing_columns = self._free_runs(np.ascontiguousarray(free.T), span_columns)
+        if missing_columns is not None:
+            return None, (missing_columns, span_rows)
+
+        columns, rows = np.nonzero(free)
+        rows, columns = rows + first_row, columns + first_column
+        inside = (rows <= limits[1]) & (columns <= limits[0])
+        if not inside.any():
+            return None, None
+
+        xs, ys = columns[inside] * self.cell_size, rows[inside] * self.cell_size
+        distances = (xs - x) ** 2 + (ys - y) ** 2
+        best = np.lexsort((xs, ys, distances))[0]
+        return (distances[best].item(), ys[best].item(), xs[best].item()), None
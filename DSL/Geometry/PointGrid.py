@@ -0,0 +1,127 @@
+import math
+
+import numpy as np
+
+
+class PointGrid:
+    """
+    Uniform grid over a set of points for batched nearest-point queries.
+
+    The points are sorted by grid cell, about one point per cell. A query
+    point looks at the cells in growing square rings around its own cell and
+    stops once no unvisited cell can hold a closer point, so every query
+    looks at a handful of points instead of all of them. All query points
+    are processed together, ring by ring, as array operations.
+    """
+
+    def __init__(self, x, y):
+        """
+        Index a set of points
+
+        Args:
+            x: Array of point x coordinates
+            y: Array of point y coordinates
+        """
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        count = len(self.x)
+        if count == 0:
+            raise ValueError("A point grid needs at least one point")
+
+        self.min_x, self.min_y = float(self.x.min()), float(self.y.min())
+        span_x, span_y = float(self.x.max()) - self.min_x, float(self.y.max()) - self.min_y
+
+        # About one point per cell, and never more cells than a few per point
+        self.cell_size = max(math.sqrt(span_x * span_y / count), max(span_x, span_y) / count, 1e-9)
+        self.columns = int(span_x // self.cell_size) + 1
+        self.rows = int(span_y // self.cell_size) + 1
+
+        cells = self._cell_y(self.y) * self.columns + self._cell_x(self.x)
+        self.order = np.argsort(cells, kind='stable')
+        self.starts = np.searchsorted(cells[self.order], np.arange(self.columns * self.rows + 1))
+
+    def _cell_x(self, x):
+        """Get the grid column of x coordinates, clamped to the grid"""
+        return np.clip(((x - self.min_x) // self.cell_size).astype(np.int64), 0, self.columns - 1)
+
+    def _cell_y(self, y):
+        """Get the grid row of y coordinates, clamped to the grid"""
+        return np.clip(((y - self.min_y) // self.cell_size).astype(np.int64), 0, self.rows - 1)
+
+    def nearest(self, x, y, batch_size=1 << 16):
+        """
+        Find the closest indexed point of every query point
+
+        Distances are computed as dx * dx + dy * dy, and ties go to the
+        point with the lowest index, so the result matches an argmin over
+        all the points.
+
+        Args:
+            x: Array of query x coordinates
+            y: Array of query y coordinates
+            batch_size: Number of query points processed together
+
+        Returns:
+            Int array with the index of the closest point of every query
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        nearest = np.empty(len(x), dtype=np.intp)
+        for start in range(0, len(x), batch_size):
+            nearest[start:start + batch_size] = self._nearest_batch(x[start:start + batch_size],
+                                                                    y[start:start + batch_size])
+        return nearest
+
+    def _nearest_batch(self, x, y):
+        """Find the closest indexed point of a batch of query points"""
+        best_distance = np.full(len(x), np.inf)
+        best_index = np.full(len(x), np.iinfo(np.intp).max, dtype=np.intp)
+        cell_x, cell_y = self._cell_x(x), self._cell_y(y)
+        active = np.arange(len(x))
+
+        for ring in range(max(self.columns, self.rows)):
+            # Cells at Chebyshev distance `ring` from the query cell
+            offsets = [(dx, dy) for dx in range(-ring, ring + 1) for dy in range(-ring, ring + 1)
+                       if max(abs(dx), abs(dy)) == ring]
+            offset_x = np.array([offset[0] for offset in offsets])
+            offset_y = np.array([offset[1] for offset in offsets])
+            query_cells_x = cell_x[active, None] + offset_x
+            query_cells_y = cell_y[active, None] + offset_y
+            inside = ((query_cells_x >= 0) & (query_cells_x < self.columns) &
+                      (query_cells_y >= 0) & (query_cells_y < self.rows))
+            queries = np.broadcast_to(active[:, None], inside.shape)[inside]
+            cells = (query_cells_y * self.columns + query_cells_x)[inside]
+
+            # One pair per query and point of the visited cells
+            starts, counts = self.starts[cells], self.starts[cells + 1] - self.starts[cells]
+            queries = np.repeat(queries, counts)
+            first = np.repeat(np.cumsum(counts) - counts, counts)
+            points = self.order[np.repeat(starts, counts) + np.arange(len(queries)) - first]
+
+            if len(queries):
+                dx = self.x[points] - x[queries]
+                dy = self.y[points] - y[queries]
+                distance = dx * dx + dy * dy
+
+                # Closest pair of each query, lowest point index on ties
+                closest = np.full(len(x), np.inf)
+                np.minimum.at(closest, queries, distance)
+                tie = distance == closest[queries]
+                queries, points = queries[tie], points[tie]
+                lowest = np.full(len(x), np.iinfo(np.intp).max, dtype=np.intp)
+                np.minimum.at(lowest, queries, points)
+                queries = np.unique(queries)
+                distance, points = closest[queries], lowest[queries]
+
+                better = (distance < best_distance[queries]) | (
+                    (distance == best_distance[queries]) & (points < best_index[queries]))
+                best_distance[queries[better]] = distance[better]
+                best_index[queries[better]] = points[better]
+
+            # Unvisited cells are at least `ring` cells away from the query
+            reach = ring * self.cell_size
+            active = active[best_distance[active] > reach * reach]
+            if not len(active):
+                break
+
+        return best_index
@@ -0,0 +1,249 @@
+import numpy as np
+
+
+class Polygon:
+    """
+    Simple polygon with lazily computed, cached geometry.
+
+    Vertices are kept in NumPy arrays so bounds, area, centroid and
+    point-in-polygon tests are vectorized over the edges. Every derived
+    value is computed on first use and reused afterwards; a Polygon is
+    immutable, so the cache never goes stale.
+    """
+
+    def __init__(self, points):
+        """
+        Create a polygon
+
+        Args:
+            points: Sequence of (x, y) vertices in order (clockwise or counter-clockwise)
+        """
+        self.points = tuple((float(x), float(y)) for x, y in points)
+        coordinates = np.array(self.points, dtype=np.float64).reshape(-1, 2)
+        self.xs = coordinates[:, 0]
+        self.ys = coordinates[:, 1]
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cached(self, key, compute):
+        """Get a derived value, computing it on first use"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def bounds(self):
+        """Axis-aligned bounding box as (min_x, min_y, max_x, max_y)"""
+        def compute():
+            if not self.points:
+                return (0.0, 0.0, 0.0, 0.0)
+            return (float(self.xs.min()), float(self.ys.min()),
+                    float(self.xs.max()), float(self.ys.max()))
+        return self._cached('bounds', compute)
+
+    @property
+    def signed_area(self):
+        """Shoelace area, positive for counter-clockwise vertices (y axis up)"""
+        def compute():
+            xs, ys = self.xs, self.ys
+            return float(np.dot(xs, np.roll(ys, -1)) - np.dot(ys, np.roll(xs, -1))) / 2
+        return self._cached('signed_area', compute)
+
+    @property
+    def area(self):
+        """Enclosed area"""
+        return abs(self.signed_area)
+
+    @property
+    def centroid(self):
+        """Area centroid as (x, y), the vertex average for degenerate polygons"""
+        def compute():
+            xs, ys = self.xs, self.ys
+            if len(xs) == 0:
+                return (0.0, 0.0)
+
+            next_xs, next_ys = np.roll(xs, -1), np.roll(ys, -1)
+            cross = xs * next_ys - next_xs * ys
+            doubled_area = float(cross.sum())
+            if doubled_area == 0:
+                return (float(xs.mean()), float(ys.mean()))
+
+            return (float(((xs + next_xs) * cross).sum()) / (3 * doubled_area),
+                    float(((ys + next_ys) * cross).sum()) / (3 * doubled_area))
+        return self._cached('centroid', compute)
+
+    def edges(self):
+        """
+        Get the edges of the polygon
+
+        Returns:
+            List of (x1, y1, x2, y2) tuples, closing edge included
+        """
+        points = self.points
+        return [(points[i][0], points[i][1], points[(i + 1) % len(points)][0], points[(i + 1) % len(points)][1])
+                for i in range(len(points))]
+
+    def contains_point(self, x, y):
+        """
+        Check if the polygon contains a point (edges included)
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+
+        Returns:
+            True if the point is inside or on the boundary
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+        return bool(self.contains_points(np.array([x], dtype=np.float64),
+                                         np.array([y], dtype=np.float64))[0])
+
+    def contains_points(self, xs, ys):
+        """
+        Test many points at once (edges included)
+
+        Args:
+            xs: Array of X coordinates
+            ys: Array of Y coordinates
+
+        Returns:
+            Boolean array
+        """
+        xs = np.asarray(xs, dtype=np.float64)[:, None]
+        ys = np.asarray(ys, dtype=np.float64)[:, None]
+        x1, y1 = self.xs[None, :], self.ys[None, :]
+        x2, y2 = np.roll(self.xs, -1)[None, :], np.roll(self.ys, -1)[None, :]
+
+        # Points lying on an edge count as inside
+        cross = (x2 - x1) * (ys - y1) - (y2 - y1) * (xs - x1)
+        on_edge = ((cross == 0) &
+                   (np.minimum(x1, x2) <= xs) & (xs <= np.maximum(x1, x2)) &
+                   (np.minimum(y1, y2) <= ys) & (ys <= np.maximum(y1, y2)))
+
+        # Crossing number: count edges crossed by a ray towards +x
+        straddles = (y1 > ys) != (y2 > ys)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_x = x1 + (ys - y1) * (x2 - x1) / (y2 - y1)
+        crossings = (straddles & (xs < crossing_x)).sum(axis=1)
+
+        return on_edge.any(axis=1) | (crossings % 2 == 1)
+
+    def triangulate(self):
+        """
+        Split the polygon into triangles by ear clipping
+
+        Returns:
+            List of (i, j, k) vertex index triples
+        """
+        return self._cached('triangles', self._ear_clip)
+
+    def triangle_array(self):
+        """
+        Get the triangulation as coordinates
+
+        Returns:
+            Array of shape (triangles, 3, 2)
+        """
+        def compute():
+            triangles = self.triangulate()
+            if not triangles:
+                return np.zeros((0, 3, 2), dtype=np.float64)
+            indices = np.array(triangles)
+            return np.stack([self.xs[indices], self.ys[indices]], axis=-1)
+        return self._cached('triangle_array', compute)
+
+    def overlaps(self, other, offset_x=0.0, offset_y=0.0):
+        """
+        Check whether the interiors of two polygons overlap (touching edges do not count)
+
+        Both polygons are split into triangles and every pair is tested with
+        the separating axis theorem in one vectorized pass.
+
+        Args:
+            other: Polygon to test against
+            offset_x: X offset applied to the other polygon
+            offset_y: Y offset applied to the other polygon
+
+        Returns:
+            True if the polygons share a region of positive area
+        """
+        own_min_x, own_min_y, own_max_x, own_max_y = self.bounds
+        other_min_x, other_min_y, other_max_x, other_max_y = other.bounds
+        if (own_max_x <= other_min_x + offset_x or other_max_x + offset_x <= own_min_x or
+                own_max_y <= other_min_y + offset_y or other_max_y + offset_y <= own_min_y):
+            return False
+
+        first = self.triangle_array()
+        second = other.triangle_array() + np.array([offset_x, offset_y])
+        if len(first) == 0 or len(second) == 0:
+            return False
+
+        # Every pair of triangles, broadcast to shape (a, b, 3, 2)
+        first = np.broadcast_to(first[:, None], (len(first), len(second), 3, 2))
+        second = np.broadcast_to(second[None, :], first.shape)
+
+        separated = np.zeros(first.shape[:2], dtype=bool)
+        for triangles in (first, second):
+            edges = np.roll(triangles, -1, axis=2) - triangles
+            normals = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)  # (a, b, 3, 2)
+
+            # Project both triangles on the three edge normals of one of them
+            own = np.einsum('abkd,abvd->abkv', normals, first)
+            theirs = np.einsum('abkd,abvd->abkv', normals, second)
+            gap = ((own.max(axis=3) <= theirs.min(axis=3)) |
+                   (theirs.max(axis=3) <= own.min(axis=3)))
+            separated |= gap.any(axis=2)
+
+        return bool((~separated).any())
+
+    def _ear_clip(self):
+        """Ear-clipping triangulation, O(n^2) in the number of vertices"""
+        count = len(self.points)
+        if count < 3:
+            return []
+
+        xs, ys = self.xs, self.ys
+        indices = list(range(count))
+        if self.signed_area < 0:
+            indices.reverse()  # Work on counter-clockwise vertices
+
+        triangles = []
+        while len(indices) > 3:
+            remaining = np.array(indices)
+            size = len(indices)
+            for position in range(size):
+                a = indices[position - 1]
+                b = indices[position]
+                c = indices[(position + 1) % size]
+
+                turn = (xs[b] - xs[a]) * (ys[c] - ys[b]) - (ys[b] - ys[a]) * (xs[c] - xs[b])
+                if turn == 0:
+                    # Collinear vertex: drop it without emitting a triangle
+                    del indices[position]
+                    break
+                if turn < 0:
+                    continue  # Reflex vertex
+
+                # An ear must not contain any other remaining vertex
+                others = remaining[(remaining != a) & (remaining != b) & (remaining != c)]
+                px, py = xs[others], ys[others]
+                d1 = (xs[b] - xs[a]) * (py - ys[a]) - (ys[b] - ys[a]) * (px - xs[a])
+                d2 = (xs[c] - xs[b]) * (py - ys[b]) - (ys[c] - ys[b]) * (px - xs[b])
+                d3 = (xs[a] - xs[c]) * (py - ys[c]) - (ys[a] - ys[c]) * (px - xs[c])
+                if np.any((d1 >= 0) & (d2 >= 0) & (d3 >= 0)):
+                    continue
+
+                triangles.append((a, b, c))
+                del indices[position]
+                break
+            else:
+                # Self-intersecting input has no ear left; finish with a fan
+                break
+
+        for position in range(1, len(indices) - 1):
+            triangles.append((indices[0], indices[position], indices[position + 1]))
+        return triangles
\ No newline at end of file
@@ -0,0 +1,196 @@
+import heapq
+import math
+from collections import namedtuple
+
+
+# A stretch of wall shared by two rooms
+SharedSegment = namedtuple('SharedSegment', ['room_a', 'room_b', 'side_a', 'side_b',
+                                             'orientation', 'coordinate', 'start', 'end'])
+
+
+def room_edges(room):
+    """
+    Get the axis-aligned edges of a room
+
+    Args:
+        room: Room object (rectangular or with a polygon outline)
+
+    Returns:
+        List of (orientation, line coordinate, start, end, side) tuples
+    """
+    if getattr(room, 'points', None):
+        return _polygon_edges(room)
+
+    x, y = room.x, room.y
+    right, bottom = x + room.width, y + room.height
+    return [
+        ('horizontal', y, x, right, 'top'),
+        ('horizontal', bottom, x, right, 'bottom'),
+        ('vertical', x, y, bottom, 'left'),
+        ('vertical', right, y, bottom, 'right')
+    ]
+
+
+def _polygon_edges(room):
+    """
+    Get the axis-aligned edges of a polygon room (slanted edges are skipped)
+
+    The side of each edge is the side the room interior is not on, so a
+    horizontal edge with the interior below it is a 'top' edge.
+    """
+    # Interior lies to the left of each edge for positive signed area (y up)
+    interior_left = room.polygon.signed_area > 0
+
+    edges = []
+    for x1, y1, x2, y2 in room.polygon.edges():
+        x1, y1, x2, y2 = room.x + x1, room.y + y1, room.x + x2, room.y + y2
+        if y1 == y2 and x1 != x2:
+            interior_below = (x2 > x1) == interior_left
+            edges.append(('horizontal', y1, min(x1, x2), max(x1, x2), 'top' if interior_below else 'bottom'))
+        elif x1 == x2 and y1 != y2:
+            interior_right = (y2 < y1) == interior_left
+            edges.append(('vertical', x1, min(y1, y2), max(y1, y2), 'left' if interior_right else 'right'))
+    return edges
+
+
+def find_shared_segments(rooms, tolerance=1.0):
+    """
+    Find every stretch of wall shared by two rooms
+
+    Edges are grouped by orientation and bucketed by their line coordinate,
+    then each pair of neighbouring buckets is swept along the edge direction
+    with a heap of active edges, so the cost is O(n log n + k) for k shared
+    segments.
+
+    Args:
+        rooms: List of Room objects
+        tolerance: Maximum distance between two parallel edges that still
+            count as one wall (the layout leaves a 1px gap between rooms)
+
+    Returns:
+        List of SharedSegment tuples sorted by orientation, line and start
+    """
+    groups = {'horizontal': [], 'vertical': []}
+    for order, room in enumerate(rooms):
+        for orientation, line, start, end, side in room_edges(room):
+            if end > start:
+                groups[orientation].append((line, start, end, order, side))
+
+    segments = []
+    for orientation, edges in groups.items():
+        buckets = {}
+        for edge in edges:
+            key = math.floor(edge[0] / tolerance) if tolerance > 0 else edge[0]
+            buckets.setdefault(key, []).append(edge)
+
+        for key, own in buckets.items():
+            # Edges within the tolerance are in the same or the next bucket
+            following = buckets.get(key + 1, []) if tolerance > 0 else []
+            candidates = [(edge, True) for edge in own] + [(edge, False) for edge in following]
+            candidates.sort(key=lambda item: item[0][1])
+
+            active = []  # min-heap of (end, sequence, edge, in own bucket)
+            for sequence, (edge, is_own) in enumerate(candidates):
+                line, start, end, order, side = edge
+                while active and active[0][0] <= start:
+                    heapq.heappop(active)
+
+                for other_end, _, other, other_own in active:
+                    # Pairs that lie entirely in the next bucket are found there
+                    if not (is_own or other_own) or other[3] == order:
+                        continue
+                    if abs(other[0] - line) > tolerance:
+                        continue
+
+                    first, second = (other, edge) if other[3] < order else (edge, other)
+                    segments.append(SharedSegment(
+                        rooms[first[3]], rooms[second[3]], first[4], second[4], orientation,
+                        (line + other[0]) / 2, start, min(end, other_end)))
+
+                heapq.heappush(active, (end, sequence, edge, is_own))
+
+    segments.sort(key=lambda segment: (segment.orientation, segment.coordinate, segment.start, segment.end))
+    return segments
+
+
+class WallAdjacencyGraph:
+    """
+    Graph of rooms connected by the wall segments they share
+    """
+
+    def __init__(self, rooms, tolerance=1.0):
+        """
+        Build the graph for a set of rooms
+
+        Args:
+            rooms: List of Room objects
+            tolerance: Maximum gap between two edges of the same wall
+        """
+        self.tolerance = tolerance
+        self.rooms = list(rooms)
+        self.segments = find_shared_segments(self.rooms, tolerance)
+
+        # id(room) -> {id(neighbour) -> list of SharedSegment}
+        self.adjacency = {id(room): {} for room in self.rooms}
+        self._rooms_by_key = {id(room): room for room in self.rooms}
+        for segment in self.segments:
+            key_a, key_b = id(segment.room_a), id(segment.room_b)
+            self.adjacency[key_a].setdefault(key_b, []).append(segment)
+            self.adjacency[key_b].setdefault(key_a, []).append(segment)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def neighbors(self, room):
+        """
+        Get the rooms that share at least one wall segment with a room
+
+        Args:
+            room: Room object
+
+        Returns:
+            List of Room objects
+        """
+        return [self._rooms_by_key[key] for key in self.adjacency.get(id(room), {})]
+
+    def shared_segments(self, room_a, room_b=None):
+        """
+        Get the wall segments shared by a room
+
+        Args:
+            room_a: Room object
+            room_b: Optional second room to restrict the result to
+
+        Returns:
+            List of SharedSegment tuples
+        """
+        neighbours = self.adjacency.get(id(room_a), {})
+        if room_b is not None:
+            return list(neighbours.get(id(room_b), []))
+        return [segment for segments in neighbours.values() for segment in segments]
+
+    def shared_length(self, room_a, room_b):
+        """
+        Get the total length of wall shared by two rooms
+
+        Args:
+            room_a: Room object
+            room_b: Room object
+
+        Returns:
+            Shared length in plan units
+        """
+        return sum(segment.end - segment.start for segment in self.shared_segments(room_a, room_b))
+
+    def are_adjacent(self, room_a, room_b):
+        """
+        Check whether two rooms share a wall
+
+        Args:
+            room_a: Room object
+            room_b: Room object
+
+        Returns:
+            True if the rooms share at least one wall segment
+        """
+        return id(room_b) in self.adjacency.get(id(room_a), {})
\ No newline at end of file
@@ -0,0 +1,156 @@
+import bisect
+from collections import namedtuple
+
+
+# One way to snap a dragged rectangle along one axis: the offset to move it
+# by, the part of the rectangle that lines up ('min', 'center' or 'max'),
+# the coordinate it lines up with, what lies there ('edge', 'center' or
+# 'grid') and the ID of the element it belongs to (None for the grid)
+SnapCandidate = namedtuple('SnapCandidate', ['offset', 'anchor', 'target', 'kind', 'element_id'])
+
+# Result of a snap query: the best candidate per axis (None when nothing is
+# within the tolerance) and all candidates found, closest first
+SnapResult = namedtuple('SnapResult', ['x', 'y', 'candidates_x', 'candidates_y'])
+
+# Preference between candidates at the same distance
+_KIND_PRIORITY = {'edge': 0, 'center': 1, 'grid': 2}
+
+
+class _AxisIndex:
+    """Sorted coordinates of one kind along one axis, with their owners"""
+
+    __slots__ = ('values', 'owners')
+
+    def __init__(self, entries):
+        entries.sort(key=lambda entry: entry[0])
+        self.values = [value for value, _ in entries]
+        self.owners = [owner for _, owner in entries]
+
+    def near(self, value, tolerance, exclude, limit):
+        """
+        Find the indexed coordinates within a distance of a value
+
+        A binary search finds where the value falls; the search then walks
+        outward, closest coordinate first, so the cost is O(log n + limit).
+
+        Args:
+            value: Coordinate to snap
+            tolerance: Largest distance
+            exclude: Owners whose coordinates are skipped
+            limit: Largest number of coordinates returned
+
+        Returns:
+            List of (coordinate, owner) pairs, closest first
+        """
+        values, owners = self.values, self.owners
+        right = bisect.bisect_left(values, value)
+        left = right - 1
+        found = []
+        while len(found) < limit:
+            left_distance = value - values[left] if left >= 0 else None
+            right_distance = values[right] - value if right < len(values) else None
+            if left_distance is not None and left_distance <= tolerance and (
+                    right_distance is None or left_distance <= right_distance):
+                index = left
+                left -= 1
+            elif right_distance is not None and right_distance <= tolerance:
+                index = right
+                right += 1
+            else:
+                break
+            if owners[index] not in exclude:
+                found.append((values[index], owners[index]))
+        return found
+
+
+class SnapIndex:
+    """
+    Sorted edge and center coordinates of the rooms and walls of a floor plan.
+
+    Each axis keeps two sorted lists: the edges (room sides, wall endpoints)
+    and the room centers. Snapping a dragged rectangle binary-searches the
+    lists for its edges and center, so a query costs O(log n) whatever the
+    size of the plan. The index is immutable; FloorPlan.get_snap_index()
+    rebuilds it when the plan changes.
+    """
+
+    def __init__(self, rooms, walls=()):
+        """
+        Build the index
+
+        Args:
+            rooms: Rooms to snap to
+            walls: Walls to snap to
+        """
+        edges_x, edges_y, centers_x, centers_y = [], [], [], []
+        for room in rooms:
+            edges_x.extend(((room.x, room.id), (room.x + room.width, room.id)))
+            edges_y.extend(((room.y, room.id), (room.y + room.height, room.id)))
+            centers_x.append((room.x + room.width / 2, room.id))
+            centers_y.append((room.y + room.height / 2, room.id))
+        for wall in walls:
+            edges_x.extend(((wall.start_x, wall.id), (wall.end_x, wall.id)))
+            edges_y.extend(((wall.start_y, wall.id), (wall.end_y, wall.id)))
+
+        self.edges_x = _AxisIndex(edges_x)
+        self.edges_y = _AxisIndex(edges_y)
+        self.centers_x = _AxisIndex(centers_x)
+        self.centers_y = _AxisIndex(centers_y)
+
+    def __len__(self):
+        return len(self.centers_x.values)
+
+    def snap(self, min_x, min_y, max_x, max_y, tolerance=10.0, grid_size=None, exclude=(), limit=8):
+        """
+        Find where a dragged rectangle should snap
+
+        Its sides snap to edges, its center to room centers and its top-left
+        corner to the grid. The best candidate of an axis is the closest one,
+        edges before centers before the grid at equal distance.
+
+        Args:
+            min_x, min_y, max_x, max_y: Bounds of the dragged rectangle
+            tolerance: Largest distance a snap may move the rectangle
+            grid_size: Optional grid spacing
+            exclude: IDs of elements not to snap to (the dragged element)
+            limit: Largest number of candidates per part of the rectangle
+
+        Returns:
+            SnapResult
+        """
+        exclude = set(exclude)
+        candidates_x = self._axis_candidates(min_x, max_x, self.edges_x, self.centers_x,
+                                             tolerance, grid_size, exclude, limit)
+        candidates_y = self._axis_candidates(min_y, max_y, self.edges_y, self.centers_y,
+                                             tolerance, grid_size, exclude, limit)
+        return SnapResult(candidates_x[0] if candidates_x else None,
+                          candidates_y[0] if candidates_y else None,
+                          candidates_x, candidates_y)
+
+    @staticmethod
+    def _axis_candidates(low, high, edges, centers, tolerance, grid_size, exclude, limit):
+        """
+        Find the snap candidates along one axis
+
+        Args:
+            low, high: Extent of the dragged rectangle along the axis
+            edges, centers: _AxisIndex of the axis
+            tolerance, grid_size, exclude, limit: See snap()
+
+        Returns:
+            List of SnapCandidate, best first
+        """
+        candidates = []
+        for anchor, value in (('min', low), ('max', high)):
+            for target, owner in edges.near(value, tolerance, exclude, limit):
+                candidates.append(SnapCandidate(target - value, anchor, target, 'edge', owner))
+        center = (low + high) / 2
+        for target, owner in centers.near(center, tolerance, exclude, limit):
+            candidates.append(SnapCandidate(target - center, 'center', target, 'center', owner))
+        if grid_size:
+            target = round(low / grid_size) * grid_size
+            if abs(target - low) <= tolerance:
+                candidates.append(SnapCandidate(target - low, 'min', target, 'grid', None))
+
+        candidates.sort(key=lambda candidate: (abs(candidate.offset), _KIND_PRIORITY[candidate.kind]))
+        return candidates
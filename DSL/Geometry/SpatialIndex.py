@@ -0,0 +1,405 @@
+import heapq
+import math
+
+
+def element_bounds(element):
+    """
+    Get the axis-aligned bounding box of a floor plan element
+
+    Args:
+        element: Wall (start/end points) or any element with x, y, width, height
+
+    Returns:
+        (min_x, min_y, max_x, max_y) tuple
+    """
+    if hasattr(element, 'start_x'):
+        return (min(element.start_x, element.end_x), min(element.start_y, element.end_y),
+                max(element.start_x, element.end_x), max(element.start_y, element.end_y))
+    return (element.x, element.y, element.x + element.width, element.y + element.height)
+
+
+class SpatialIndex:
+    """
+    Uniform grid index over element bounding boxes.
+
+    Each element is registered in every grid cell its bounding box covers, so
+    point and rectangle queries only look at the elements of a few cells. The
+    index can be rebuilt in bulk or updated one element at a time.
+    """
+
+    def __init__(self, cell_size=100.0):
+        """
+        Initialize an empty index
+
+        Args:
+            cell_size: Width and height of a grid cell in plan units
+        """
+        self.cell_size = float(cell_size)
+        self.cells = {}
+
+        # id(element) -> [element, kind, bounds, insertion sequence]
+        self.entries = {}
+        self._sequence = 0
+
+        # kind -> number of indexed elements of that kind
+        self._counts = {}
+
+        # Range of occupied cells, used to bound nearest-neighbour searches
+        self._min_cell = None
+        self._max_cell = None
+
+    @classmethod
+    def build(cls, elements_by_kind, cell_size=None):
+        """
+        Build an index in bulk
+
+        Args:
+            elements_by_kind: Dictionary of kind -> list of elements
+            cell_size: Grid cell size (chosen from the element sizes if None)
+
+        Returns:
+            SpatialIndex object
+        """
+        if cell_size is None:
+            cell_size = cls.suggest_cell_size(
+                element for elements in elements_by_kind.values() for element in elements)
+
+        index = cls(cell_size)
+        for kind, elements in elements_by_kind.items():
+            for element in elements:
+                index.insert(element, kind)
+        return index
+
+    @staticmethod
+    def suggest_cell_size(elements, default=100.0):
+        """
+        Pick a cell size close to the median element extent
+
+        Args:
+            elements: Iterable of elements
+            default: Size used when there are no elements
+
+        Returns:
+            Cell size in plan units
+        """
+        extents = []
+        for element in elements:
+            min_x, min_y, max_x, max_y = element_bounds(element)
+            extents.append(max(max_x - min_x, max_y - min_y))
+
+        if not extents:
+            return default
+
+        extents.sort()
+        return max(1.0, extents[len(extents) // 2])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, element):
+        return id(element) in self.entries
+
+    def count(self, kind=None):
+        """
+        Get the number of indexed elements
+
+        Args:
+            kind: Optional element kind to count
+
+        Returns:
+            Number of elements (of that kind)
+        """
+        if kind is None:
+            return len(self.entries)
+        return self._counts.get(kind, 0)
+
+    def _cell_range(self, bounds):
+        """Get the inclusive range of cells covered by a bounding box"""
+        size = self.cell_size
+        return (math.floor(bounds[0] / size), math.floor(bounds[1] / size),
+                math.floor(bounds[2] / size), math.floor(bounds[3] / size))
+
+    def insert(self, element, kind):
+        """
+        Add an element to the index
+
+        Args:
+            element: Element to add
+            kind: Element kind ('rooms', 'walls', 'doors', 'windows', 'furniture')
+        """
+        if id(element) in self.entries:
+            self.update(element)
+            return
+
+        bounds = element_bounds(element)
+        entry = [element, kind, bounds, self._sequence]
+        self._sequence += 1
+        self.entries[id(element)] = entry
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        self._add_to_cells(entry)
+
+    def remove(self, element):
+        """
+        Remove an element from the index
+
+        Args:
+            element: Element to remove
+
+        Returns:
+            True if the element was indexed, False otherwise
+        """
+        entry = self.entries.pop(id(element), None)
+        if entry is None:
+            return False
+        self._counts[entry[1]] -= 1
+        self._remove_from_cells(entry)
+        return True
+
+    def update(self, element):
+        """
+        Re-index an element after its geometry changed
+
+        Args:
+            element: Element that moved or was resized
+        """
+        entry = self.entries.get(id(element))
+        if entry is None:
+            return
+
+        bounds = element_bounds(element)
+        if bounds == entry[2]:
+            return
+
+        if self._cell_range(bounds) == self._cell_range(entry[2]):
+            entry[2] = bounds
+            return
+
+        self._remove_from_cells(entry)
+        entry[2] = bounds
+        self._add_to_cells(entry)
+
+    def _add_to_cells(self, entry):
+        """Register an entry in every cell its bounds cover"""
+        min_cx, min_cy, max_cx, max_cy = self._cell_range(entry[2])
+        key = id(entry[0])
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = self.cells[(cx, cy)] = {}
+                cell[key] = entry
+
+        if self._min_cell is None:
+            self._min_cell = [min_cx, min_cy]
+            self._max_cell = [max_cx, max_cy]
+        else:
+            self._min_cell[0] = min(self._min_cell[0], min_cx)
+            self._min_cell[1] = min(self._min_cell[1], min_cy)
+            self._max_cell[0] = max(self._max_cell[0], max_cx)
+            self._max_cell[1] = max(self._max_cell[1], max_cy)
+
+    def _remove_from_cells(self, entry):
+        """Unregister an entry from the cells its bounds cover"""
+        min_cx, min_cy, max_cx, max_cy = self._cell_range(entry[2])
+        key = id(entry[0])
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    cell.pop(key, None)
+                    if not cell:
+                        del self.cells[(cx, cy)]
+
+    def query_point(self, x, y, kind=None):
+        """
+        Find the elements whose bounding box contains a point (edges included)
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            kind: Optional element kind to filter by
+
+        Returns:
+            List of elements in insertion order
+        """
+        cell = self.cells.get((math.floor(x / self.cell_size), math.floor(y / self.cell_size)))
+        if not cell:
+            return []
+
+        found = [entry for entry in cell.values()
+                 if (kind is None or entry[1] == kind) and
+                 entry[2][0] <= x <= entry[2][2] and entry[2][1] <= y <= entry[2][3]]
+        found.sort(key=lambda entry: entry[3])
+        return [entry[0] for entry in found]
+
+    def query_rect(self, min_x, min_y, max_x, max_y, kind=None, include_touching=True):
+        """
+        Find the elements whose bounding box overlaps a rectangle
+
+        Args:
+            min_x, min_y, max_x, max_y: Query rectangle
+            kind: Optional element kind to filter by
+            include_touching: Whether boxes that only share an edge count as overlapping
+
+        Returns:
+            List of elements in insertion order
+        """
+        return [entry[0] for entry in self._query_entries(min_x, min_y, max_x, max_y, kind, include_touching)]
+
+    def query_rect_bounds(self, min_x, min_y, max_x, max_y, kind=None, include_touching=True):
+        """
+        Find the elements whose bounding box overlaps a rectangle, with their bounding boxes
+
+        Args:
+            min_x, min_y, max_x, max_y: Query rectangle
+            kind: Optional element kind to filter by
+            include_touching: Whether boxes that only share an edge count as overlapping
+
+        Returns:
+            (elements, bounds): list of elements in insertion order and the
+            list of their indexed (min_x, min_y, max_x, max_y) tuples
+        """
+        found = self._query_entries(min_x, min_y, max_x, max_y, kind, include_touching)
+        return [entry[0] for entry in found], [entry[2] for entry in found]
+
+    def _query_entries(self, min_x, min_y, max_x, max_y, kind, include_touching):
+        """Find the entries whose bounding box overlaps a rectangle, in insertion order"""
+        if not self.entries:
+            return []
+
+        # Only the occupied part of the grid can hold anything
+        min_cx, min_cy, max_cx, max_cy = self._cell_range((min_x, min_y, max_x, max_y))
+        min_cx = max(min_cx, self._min_cell[0])
+        min_cy = max(min_cy, self._min_cell[1])
+        max_cx = min(max_cx, self._max_cell[0])
+        max_cy = min(max_cy, self._max_cell[1])
+        if min_cx > max_cx or min_cy > max_cy:
+            return []
+
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self.entries):
+            seen = self.entries
+        else:
+            seen = {}
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    cell = self.cells.get((cx, cy))
+                    if cell:
+                        seen.update(cell)
+
+        found = []
+        for entry in seen.values():
+            if kind is not None and entry[1] != kind:
+                continue
+            bounds = entry[2]
+            if include_touching:
+                overlaps = (bounds[0] <= max_x and bounds[2] >= min_x and
+                            bounds[1] <= max_y and bounds[3] >= min_y)
+            else:
+                overlaps = (bounds[0] < max_x and bounds[2] > min_x and
+                            bounds[1] < max_y and bounds[3] > min_y)
+            if overlaps:
+                found.append(entry)
+
+        found.sort(key=lambda entry: entry[3])
+        return found
+
+    def nearest(self, x, y, k=1, kind=None):
+        """
+        Find the k elements whose bounding-box centers are closest to a point
+
+        Ties are broken by insertion order, so the result matches a linear
+        scan that keeps the first closest element.
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            k: Number of elements to return
+            kind: Optional element kind to filter by
+
+        Returns:
+            List of up to k elements, closest first
+        """
+        if not self.entries or k <= 0:
+            return []
+
+        size = self.cell_size
+        qx = math.floor(x / size)
+        qy = math.floor(y / size)
+        min_cx, min_cy = self._min_cell
+        max_cx, max_cy = self._max_cell
+
+        # Rings closer than the occupied area are empty, rings past it add nothing
+        start = max(min_cx - qx, qx - max_cx, min_cy - qy, qy - max_cy, 0)
+        stop = max(qx - min_cx, max_cx - qx, qy - min_cy, max_cy - qy, 0)
+
+        # Scanning many empty cells is slower than looking at every entry, so
+        # the search gives up on the rings once they cost more than that
+        budget = 4 * len(self.entries) + 16
+
+        best = []  # max-heap of (-distance, -sequence, element)
+        seen = set()
+        for ring in range(start, stop + 1):
+            budget -= 8 * ring or 1
+            if budget < 0:
+                return self._nearest_linear(x, y, k, kind)
+
+            for cell_key in self._ring_cells(qx, qy, ring):
+                cell = self.cells.get(cell_key)
+                if not cell:
+                    continue
+                for key, entry in cell.items():
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if kind is not None and entry[1] != kind:
+                        continue
+                    self._push_candidate(best, k, x, y, entry)
+
+            # Unseen elements have their center at least `ring` cells away
+            if len(best) == k and -best[0][0] < (ring * size) ** 2:
+                break
+
+        return [item[2] for item in sorted(best, key=lambda item: (-item[0], -item[1]))]
+
+    def _nearest_linear(self, x, y, k, kind):
+        """Nearest-neighbour search that looks at every entry"""
+        best = []
+        for entry in self.entries.values():
+            if kind is None or entry[1] == kind:
+                self._push_candidate(best, k, x, y, entry)
+        return [item[2] for item in sorted(best, key=lambda item: (-item[0], -item[1]))]
+
+    @staticmethod
+    def _push_candidate(best, k, x, y, entry):
+        """Keep the k closest entries in a bounded max-heap"""
+        bounds = entry[2]
+        dx = (bounds[0] + bounds[2]) / 2 - x
+        dy = (bounds[1] + bounds[3]) / 2 - y
+        item = (-(dx * dx + dy * dy), -entry[3], entry[0])
+        if len(best) < k:
+            heapq.heappush(best, item)
+        elif item[:2] > best[0][:2]:
+            heapq.heapreplace(best, item)
+
+    def _ring_cells(self, qx, qy, ring):
+        """Get the cells at Chebyshev distance `ring` from a cell, clipped to the occupied area"""
+        if ring == 0:
+            yield (qx, qy)
+            return
+
+        min_cx, min_cy = self._min_cell
+        max_cx, max_cy = self._max_cell
+        x_lo = max(qx - ring, min_cx)
+        x_hi = min(qx + ring, max_cx)
+
+        for cy in (qy - ring, qy + ring):
+            if min_cy <= cy <= max_cy:
+                for cx in range(x_lo, x_hi + 1):
+                    yield (cx, cy)
+
+        y_lo = max(qy - ring + 1, min_cy)
+        y_hi = min(qy + ring - 1, max_cy)
+        for cx in (qx - ring, qx + ring):
+            if min_cx <= cx <= max_cx:
+                for cy in range(y_lo, y_hi + 1):
+                    yield (cx, cy)
\ No newline at end of file
@@ -0,0 +1,183 @@
+import bisect
+import math
+
+
+def _line_parameters(x1, y1, x2, y2):
+    """
+    Describe a segment by the line it lies on and its extent along that line
+
+    Args:
+        x1, y1: Start point
+        x2, y2: End point
+
+    Returns:
+        (ux, uy, offset, t1, t2) where (ux, uy) is the canonical unit direction,
+        offset locates the line (y for horizontal, x for vertical lines, signed
+        distance from the origin otherwise) and t1 <= t2 are the positions of
+        the end points along the direction
+    """
+    dx = x2 - x1
+    dy = y2 - y1
+
+    # Axis-aligned segments keep their exact coordinates
+    if dy == 0:
+        ux, uy, offset, t1, t2 = 1.0, 0.0, y1, x1, x2
+    elif dx == 0:
+        ux, uy, offset, t1, t2 = 0.0, 1.0, x1, y1, y2
+    else:
+        length = math.hypot(dx, dy)
+        ux, uy = dx / length, dy / length
+        if ux < 0:
+            ux, uy = -ux, -uy
+        offset = ux * y1 - uy * x1
+        t1 = x1 * ux + y1 * uy
+        t2 = x2 * ux + y2 * uy
+
+    if t1 > t2:
+        t1, t2 = t2, t1
+    return ux, uy, offset, t1, t2
+
+
+def merge_collinear_segments(segments, precision=1e-6):
+    """
+    Merge collinear segments that touch or overlap into maximal segments
+
+    Segments are grouped by the line they lie on, and each group is reduced
+    to the union of its intervals with one sort, so the cost is O(n log n).
+
+    Args:
+        segments: Iterable of (x1, y1, x2, y2) tuples
+        precision: Distance under which two lines or two end points are the same
+
+    Returns:
+        List of (x1, y1, x2, y2) tuples, ordered by line and position
+    """
+    lines = {}
+    for x1, y1, x2, y2 in segments:
+        if x1 == x2 and y1 == y2:
+            continue
+        ux, uy, offset, t1, t2 = _line_parameters(x1, y1, x2, y2)
+        key = (round(ux / precision), round(uy / precision), round(offset / precision))
+        line = lines.get(key)
+        if line is None:
+            line = lines[key] = (ux, uy, offset, [])
+        line[3].append((t1, t2))
+
+    merged = []
+    for key in sorted(lines):
+        ux, uy, offset, intervals = lines[key]
+        intervals.sort()
+
+        start, end = intervals[0]
+        for t1, t2 in intervals[1:]:
+            if t1 <= end + precision:
+                end = max(end, t2)
+            else:
+                merged.append(_segment_from_line(ux, uy, offset, start, end))
+                start, end = t1, t2
+        merged.append(_segment_from_line(ux, uy, offset, start, end))
+
+    return merged
+
+
+def cut_openings(segments, openings, precision=1e-6):
+    """
+    Subtract door and window openings from wall segments
+
+    Wall lines are indexed per direction by their sorted offsets, so each
+    opening finds the lines it crosses with a binary search. The openings
+    of every line are then sorted once and subtracted from its intervals in
+    a single merge pass, which keeps the cost at O((walls + openings) log n).
+
+    Args:
+        segments: List of (x1, y1, x2, y2) wall segments, as returned by
+            merge_collinear_segments (no two overlap on the same line)
+        openings: Iterable of (x1, y1, x2, y2, reach) tuples; an opening
+            removes its extent from every parallel wall line within `reach`
+        precision: Distance under which two lines or two end points are the same
+
+    Returns:
+        (segments, count) tuple with the remaining wall segments and the
+        number of openings that lie on a wall line
+    """
+    # Direction key -> {offset key -> [ux, uy, offset, intervals, cuts]}
+    directions = {}
+    for x1, y1, x2, y2 in segments:
+        if x1 == x2 and y1 == y2:
+            continue
+        ux, uy, offset, t1, t2 = _line_parameters(x1, y1, x2, y2)
+        lines = directions.setdefault((round(ux / precision), round(uy / precision)), {})
+        line = lines.get(round(offset / precision))
+        if line is None:
+            line = lines[round(offset / precision)] = [ux, uy, offset, [], []]
+        line[3].append((t1, t2))
+
+    sorted_offsets = {key: sorted(lines) for key, lines in directions.items()}
+
+    count = 0
+    for x1, y1, x2, y2, reach in openings:
+        if x1 == x2 and y1 == y2:
+            continue
+        ux, uy, offset, t1, t2 = _line_parameters(x1, y1, x2, y2)
+        direction = (round(ux / precision), round(uy / precision))
+        offsets = sorted_offsets.get(direction)
+        if not offsets:
+            continue
+
+        low = bisect.bisect_left(offsets, round((offset - reach) / precision) - 1)
+        high = bisect.bisect_right(offsets, round((offset + reach) / precision) + 1)
+        for offset_key in offsets[low:high]:
+            directions[direction][offset_key][4].append((t1, t2))
+        if high > low:
+            count += 1
+
+    remaining = []
+    for direction in sorted(directions):
+        lines = directions[direction]
+        for offset_key in sorted_offsets[direction]:
+            ux, uy, offset, intervals, cuts = lines[offset_key]
+            intervals.sort()
+            cuts.sort()
+
+            position = 0
+            for start, end in intervals:
+                # Cuts are sorted, so the ones ending before this interval are done
+                while position < len(cuts) and cuts[position][1] <= start:
+                    position += 1
+
+                current = start
+                index = position
+                while index < len(cuts) and cuts[index][0] < end:
+                    cut_start, cut_end = cuts[index]
+                    if cut_start - current > precision:
+                        remaining.append(_segment_from_line(ux, uy, offset, current, cut_start))
+                    current = max(current, cut_end)
+                    index += 1
+
+                if end - current > precision:
+                    remaining.append(_segment_from_line(ux, uy, offset, current, end))
+
+    return remaining, count
+
+
+def _segment_from_line(ux, uy, offset, t1, t2):
+    """Convert a line interval back to end point coordinates"""
+    if uy == 0:
+        return (t1, offset, t2, offset)
+    if ux == 0:
+        return (offset, t1, offset, t2)
+    return (t1 * ux - offset * uy, t1 * uy + offset * ux,
+            t2 * ux - offset * uy, t2 * uy + offset * ux)
+
+
+def segments_to_path(segments):
+    """
+    Build SVG path data drawing a list of segments
+
+    Args:
+        segments: List of (x1, y1, x2, y2) tuples
+
+    Returns:
+        Path data string
+    """
+    return ' '.join(f'M {x1} {y1} L {x2} {y2}' for x1, y1, x2, y2 in segments)
\ No newline at end of file
@@ -0,0 +1,9 @@
+from .SpatialIndex import SpatialIndex, element_bounds
+from .SharedWalls import WallAdjacencyGraph, SharedSegment, find_shared_segments, room_edges
+from .WallUnion import merge_collinear_segments, cut_openings, segments_to_path
+from .Polygon import Polygon
+from .Coverage import Coverage, Footprint, union_area, shape_coverage
+from .FixedPoint import FixedPointGrid
+from .SnapIndex import SnapIndex, SnapCandidate, SnapResult
+from .PointGrid import PointGrid
+from .OccupancyGrid import OccupancyGrid
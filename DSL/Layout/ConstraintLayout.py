@@ -0,0 +1,367 @@
+from collections import namedtuple
+
+from DSL.Models.Room import Room
+from DSL.Layout.ConstraintSolver import (ConstraintSolver, LinearConstraint, UnsatisfiableConstraintError,
+                                         Variable, EQ, GE, LE, WEAK, MEDIUM, STRONG, REQUIRED)
+
+
+# Solver strength of each LayoutConstraint strength
+STRENGTHS = {'required': REQUIRED, 'strong': STRONG, 'medium': MEDIUM, 'weak': WEAK}
+
+# Unknowns of a constrained room
+RoomVariables = namedtuple('RoomVariables', ['room', 'x', 'y', 'width', 'height'])
+
+
+class _Component:
+    """Rooms linked by constraints, solved together by one solver"""
+
+    __slots__ = ('solver', 'room_ids', 'relations')
+
+    def __init__(self):
+        self.solver = ConstraintSolver()
+        # Room IDs in the order they joined (a dict keeps results reproducible)
+        self.room_ids = {}
+        # Solver constraints of the relations between the rooms
+        self.relations = []
+
+
+class ConstraintLayout:
+    """
+    Places the rooms named in LayoutConstraints so the relations hold
+
+    Each constrained room gets four solver variables. Besides the relations,
+    weak "stay" constraints keep rooms where they are, strong ones keep their
+    size and keep them inside the plan, so the solver only moves what the
+    relations require.
+
+    Rooms that no chain of constraints links are independent, so each group
+    of linked rooms gets a solver of its own (a constraint linking two groups
+    merges them) and solving stays linear in the number of groups. The
+    solvers are kept between edits: dragging a room, adding or removing a
+    constraint only re-solves the group it touches.
+    """
+
+    def __init__(self, floor_plan, max_width, max_height):
+        """
+        Initialize the constraint layout
+
+        Args:
+            floor_plan: FloorPlan whose rooms are constrained
+            max_width: Width of the plan
+            max_height: Height of the plan
+        """
+        self.floor_plan = floor_plan
+        self.max_width = max_width
+        self.max_height = max_height
+
+        # RoomVariables and group of each room, by room ID
+        self._rooms = {}
+        self._components = {}
+
+        # Plan bounds and size limits of each room, by room ID
+        self._bounds = {}
+
+        # Room values the stay constraints hold, and the stay constraints, by room ID
+        self._stays = {}
+
+        # (room ID, solver constraint) pairs of each LayoutConstraint
+        self._relations = {}
+
+        # Last suggested position of the rooms being dragged, by room ID
+        self._dragging = {}
+
+        # Groups re-solved since the last apply()
+        self._dirty = {}
+
+    def has_room(self, room_id):
+        """Check if a room is constrained"""
+        return room_id in self._rooms
+
+    def add_constraint(self, constraint):
+        """
+        Add a relation between rooms
+
+        A required relation that contradicts the ones added before is
+        skipped with a warning, like the relations between missing rooms.
+
+        Args:
+            constraint: LayoutConstraint
+
+        Returns:
+            True if the relation was added
+        """
+        self._anchor()
+        strength = STRENGTHS.get(constraint.strength, REQUIRED)
+        added = []
+        for first_id, second_id in constraint.pairs():
+            first, second = self._variables(first_id), self._variables(second_id)
+            if first is None or second is None:
+                missing = first_id if first is None else second_id
+                print(f"Warning: Constraint {constraint.id!r} refers to unknown room {missing!r}")
+                continue
+            component = self._merge(self._components[first_id], self._components[second_id])
+            for terms, constant in self._equations(constraint.relation, first, second, constraint.gap):
+                linear = LinearConstraint(terms, constant, EQ, strength)
+                try:
+                    component.solver.add_constraint(linear)
+                except UnsatisfiableConstraintError:
+                    print(f"Warning: Ignoring constraint {constraint.id!r}: {first_id} {constraint.relation} "
+                          f"{second_id} contradicts the other constraints")
+                    self._remove_relations(added)
+                    return False
+                component.relations.append(linear)
+                added.append((first_id, linear))
+
+        self._relations[constraint] = added
+        return True
+
+    def remove_constraint(self, constraint):
+        """
+        Remove a relation added before
+
+        The rooms stay in one group; they are only free to move apart.
+
+        Args:
+            constraint: LayoutConstraint passed to add_constraint()
+        """
+        self._anchor()
+        self._remove_relations(self._relations.pop(constraint, []))
+
+    def drag(self, room_id, x, y):
+        """
+        Move a constrained room, taking the rooms related to it along
+
+        Repeated calls for the same room only suggest a new position to the
+        solver until release() is called.
+
+        Args:
+            room_id: ID of the room
+            x, y: Requested position
+        """
+        variables = self._rooms[room_id]
+        component = self._components[room_id]
+        if room_id not in self._dragging:
+            if not self._dragging:
+                self._anchor()
+            component.solver.add_edit_variable(variables.x, MEDIUM)
+            component.solver.add_edit_variable(variables.y, MEDIUM)
+        self._dragging[room_id] = (x, y)
+        component.solver.suggest_value(variables.x, x)
+        component.solver.suggest_value(variables.y, y)
+        self._dirty[id(component)] = component
+
+    def release(self, room_id):
+        """
+        End a drag; the rooms stay where the last apply() put them
+
+        Args:
+            room_id: ID of a room passed to drag()
+        """
+        if room_id not in self._dragging:
+            return
+        # Anchor before removing the edit, which would let the room spring back
+        del self._dragging[room_id]
+        self._anchor()
+        variables = self._rooms[room_id]
+        component = self._components[room_id]
+        component.solver.remove_edit_variable(variables.x)
+        component.solver.remove_edit_variable(variables.y)
+        self._dirty[id(component)] = component
+
+    def apply(self):
+        """
+        Write the solution of the groups re-solved since the last call to the rooms
+
+        Returns:
+            List of the rooms that moved or changed size
+        """
+        grid = self.floor_plan.grid
+        changed = []
+        for component in self._dirty.values():
+            component.solver.update_variables()
+            for room_id in component.room_ids:
+                variables = self._rooms[room_id]
+                room = variables.room
+                moved = False
+                for name in ('x', 'y', 'width', 'height'):
+                    value = getattr(variables, name).value
+                    value = grid.snap(value) if grid is not None else round(value, 6)
+                    if value != getattr(room, name):
+                        setattr(room, name, value)
+                        moved = True
+                if moved:
+                    changed.append(room)
+        self._dirty = {}
+        return changed
+
+    def _variables(self, room_id):
+        """
+        Get the variables of a room, creating them and the room's group on first use
+
+        Args:
+            room_id: ID of the room
+
+        Returns:
+            RoomVariables, or None if the plan has no such room
+        """
+        variables = self._rooms.get(room_id)
+        if variables is not None:
+            return variables
+
+        room = self.floor_plan.get_element_by_id(room_id)
+        if not isinstance(room, Room):
+            return None
+
+        variables = RoomVariables(room, Variable(f"{room_id}.x"), Variable(f"{room_id}.y"),
+                                  Variable(f"{room_id}.width"), Variable(f"{room_id}.height"))
+        component = _Component()
+        component.room_ids[room_id] = None
+        self._rooms[room_id] = variables
+        self._components[room_id] = component
+
+        self._bounds[room_id] = [
+            LinearConstraint([(variables.x, 1.0)], 0.0, GE, STRONG),
+            LinearConstraint([(variables.y, 1.0)], 0.0, GE, STRONG),
+            LinearConstraint([(variables.x, 1.0), (variables.width, 1.0)], -self.max_width, LE, STRONG),
+            LinearConstraint([(variables.y, 1.0), (variables.height, 1.0)], -self.max_height, LE, STRONG),
+            LinearConstraint([(variables.width, 1.0)], 0.0, GE, REQUIRED),
+            LinearConstraint([(variables.height, 1.0)], 0.0, GE, REQUIRED)
+        ]
+        for bound in self._bounds[room_id]:
+            component.solver.add_constraint(bound)
+
+        # Polygon outlines cannot be resized
+        size_strength = REQUIRED if room.points else STRONG
+        self._set_stays(room_id, (room.x, room.y, room.width, room.height), size_strength)
+        return variables
+
+    def _merge(self, first, second):
+        """
+        Merge two groups of rooms, adding the constraints of the smaller one to the other's solver
+
+        Args:
+            first: _Component
+            second: _Component
+
+        Returns:
+            The merged _Component
+        """
+        if first is second:
+            return first
+        if len(first.room_ids) < len(second.room_ids):
+            first, second = second, first
+
+        solver = first.solver
+        for room_id in second.room_ids:
+            for linear in self._bounds[room_id] + self._stays[room_id][1]:
+                solver.add_constraint(linear)
+            self._components[room_id] = first
+        for linear in second.relations:
+            solver.add_constraint(linear)
+        for room_id in second.room_ids:
+            if room_id in self._dragging:
+                variables = self._rooms[room_id]
+                solver.add_edit_variable(variables.x, MEDIUM)
+                solver.add_edit_variable(variables.y, MEDIUM)
+                solver.suggest_value(variables.x, self._dragging[room_id][0])
+                solver.suggest_value(variables.y, self._dragging[room_id][1])
+
+        first.room_ids.update(second.room_ids)
+        first.relations.extend(second.relations)
+        self._dirty.pop(id(second), None)
+        self._dirty[id(first)] = first
+        return first
+
+    def _remove_relations(self, relations):
+        """
+        Remove the solver constraints of a relation
+
+        Args:
+            relations: (room ID, solver constraint) pairs
+        """
+        for room_id, linear in relations:
+            component = self._components[room_id]
+            component.solver.remove_constraint(linear)
+            component.relations.remove(linear)
+            self._dirty[id(component)] = component
+
+    def _set_stays(self, room_id, values, size_strength):
+        """
+        Hold a room at a position and size, replacing the stays it had
+
+        Args:
+            room_id: ID of the room
+            values: (x, y, width, height) to hold
+            size_strength: Strength of the size stays
+        """
+        variables = self._rooms[room_id]
+        solver = self._components[room_id].solver
+        _, old_stays = self._stays.get(room_id, (None, []))
+        for stay in old_stays:
+            solver.remove_constraint(stay)
+        stays = [LinearConstraint([(variable, 1.0)], -value, EQ, strength)
+                 for variable, value, strength in zip(variables[1:], values,
+                                                      (WEAK, WEAK, size_strength, size_strength))]
+        for stay in stays:
+            solver.add_constraint(stay)
+        self._stays[room_id] = (values, stays)
+        self._dirty[id(self._components[room_id])] = self._components[room_id]
+
+    def _anchor(self):
+        """
+        Move the stay constraints to where the rooms are now
+
+        Rooms move outside the solver too (the overlap layout, edits, the end
+        of a drag), and the solver must not pull them back to where they were.
+        """
+        for room_id, variables in self._rooms.items():
+            if room_id in self._dragging:
+                continue
+            room = variables.room
+            current = (room.x, room.y, room.width, room.height)
+            old_values, stays = self._stays[room_id]
+            if current != old_values:
+                self._set_stays(room_id, current, stays[2].strength)
+
+    @staticmethod
+    def _equations(relation, first, second, gap):
+        """
+        Get the linear equations of a relation between two rooms
+
+        Args:
+            relation: LayoutConstraint relation
+            first: RoomVariables of the first room
+            second: RoomVariables of the second room
+            gap: Distance between rooms placed next to each other
+
+        Returns:
+            List of (terms, constant) pairs, each meaning sum(terms) + constant == 0
+        """
+        a, b = first, second
+        if relation == 'right_of':
+            return [([(a.x, 1.0), (b.x, -1.0), (b.width, -1.0)], -gap)]
+        if relation == 'left_of':
+            return [([(a.x, 1.0), (a.width, 1.0), (b.x, -1.0)], gap)]
+        if relation == 'below':
+            return [([(a.y, 1.0), (b.y, -1.0), (b.height, -1.0)], -gap)]
+        if relation == 'above':
+            return [([(a.y, 1.0), (a.height, 1.0), (b.y, -1.0)], gap)]
+        if relation == 'align_left':
+            return [([(a.x, 1.0), (b.x, -1.0)], 0.0)]
+        if relation == 'align_right':
+            return [([(a.x, 1.0), (a.width, 1.0), (b.x, -1.0), (b.width, -1.0)], 0.0)]
+        if relation == 'align_top':
+            return [([(a.y, 1.0), (b.y, -1.0)], 0.0)]
+        if relation == 'align_bottom':
+            return [([(a.y, 1.0), (a.height, 1.0), (b.y, -1.0), (b.height, -1.0)], 0.0)]
+        if relation == 'align_center_x':
+            return [([(a.x, 2.0), (a.width, 1.0), (b.x, -2.0), (b.width, -1.0)], 0.0)]
+        if relation == 'align_center_y':
+            return [([(a.y, 2.0), (a.height, 1.0), (b.y, -2.0), (b.height, -1.0)], 0.0)]
+
+        equations = []
+        if relation in ('same_width', 'same_size'):
+            equations.append(([(a.width, 1.0), (b.width, -1.0)], 0.0))
+        if relation in ('same_height', 'same_size'):
+            equations.append(([(a.height, 1.0), (b.height, -1.0)], 0.0))
+        return equations
@@ -0,0 +1,468 @@
+from collections import namedtuple
+
+
+# Constraint strengths: a violated constraint costs its strength per unit of
+# error, so any amount of a stronger constraint outweighs a weaker one
+WEAK = 1.0
+MEDIUM = 1e3
+STRONG = 1e6
+REQUIRED = 1001001000.0
+
+# Relational operators of a LinearConstraint
+EQ, LE, GE = '==', '<=', '>='
+
+# Values closer to zero than this are zero
+_EPSILON = 1e-8
+
+
+class UnsatisfiableConstraintError(ValueError):
+    """A required constraint contradicts the required constraints already added"""
+
+
+class Variable:
+    """
+    Unknown of a constraint system.
+
+    `value` holds the solution after ConstraintSolver.update_variables().
+    """
+
+    __slots__ = ('name', 'value')
+
+    def __init__(self, name=''):
+        self.name = name
+        self.value = 0.0
+
+    def __repr__(self):
+        return f"Variable({self.name!r}, {self.value})"
+
+
+class LinearConstraint:
+    """
+    Linear constraint `sum(coefficient * variable) + constant <op> 0`.
+    """
+
+    __slots__ = ('terms', 'constant', 'op', 'strength')
+
+    def __init__(self, terms, constant=0.0, op=EQ, strength=REQUIRED):
+        """
+        Create a constraint
+
+        Args:
+            terms: Iterable of (Variable, coefficient) pairs
+            constant: Constant term
+            op: EQ, LE or GE
+            strength: REQUIRED, STRONG, MEDIUM, WEAK or any value in between
+        """
+        if op not in (EQ, LE, GE):
+            raise ValueError(f"Unknown constraint operator: {op}")
+        merged = {}
+        for variable, coefficient in terms:
+            merged[variable] = merged.get(variable, 0.0) + coefficient
+        self.terms = tuple(merged.items())
+        self.constant = float(constant)
+        self.op = op
+        self.strength = min(max(float(strength), 0.0), REQUIRED)
+
+    def __repr__(self):
+        terms = ' + '.join(f"{coefficient} * {variable.name}" for variable, coefficient in self.terms)
+        return f"LinearConstraint({terms} + {self.constant} {self.op} 0, strength={self.strength})"
+
+
+# Symbols of the simplex tableau
+_EXTERNAL, _SLACK, _ERROR, _DUMMY = range(4)
+
+
+class _Symbol:
+    """Column of the tableau: a variable, slack, error or dummy"""
+
+    __slots__ = ('kind',)
+
+    def __init__(self, kind):
+        self.kind = kind
+
+
+# Symbols a constraint added to the tableau, so it can be removed again
+_Tag = namedtuple('_Tag', ['marker', 'other'])
+
+
+class _EditInfo:
+    """Edit constraint of a variable and the value last suggested for it"""
+
+    __slots__ = ('tag', 'constraint', 'constant')
+
+    def __init__(self, tag, constraint):
+        self.tag = tag
+        self.constraint = constraint
+        self.constant = 0.0
+
+
+class _Row:
+    """Tableau row `basic = constant + sum(coefficient * symbol)`"""
+
+    __slots__ = ('constant', 'cells')
+
+    def __init__(self, constant=0.0, cells=None):
+        self.constant = constant
+        self.cells = dict(cells) if cells else {}
+
+    def copy(self):
+        return _Row(self.constant, self.cells)
+
+    def add(self, value):
+        self.constant += value
+        return self.constant
+
+    def insert_symbol(self, symbol, coefficient=1.0):
+        value = self.cells.get(symbol, 0.0) + coefficient
+        if abs(value) < _EPSILON:
+            self.cells.pop(symbol, None)
+        else:
+            self.cells[symbol] = value
+
+    def insert_row(self, row, coefficient=1.0):
+        self.constant += row.constant * coefficient
+        for symbol, value in row.cells.items():
+            self.insert_symbol(symbol, value * coefficient)
+
+    def reverse_sign(self):
+        self.constant = -self.constant
+        self.cells = {symbol: -value for symbol, value in self.cells.items()}
+
+    def solve_for(self, symbol):
+        """Rewrite `0 = row` as `symbol = row'`"""
+        coefficient = -1.0 / self.cells.pop(symbol)
+        self.constant *= coefficient
+        self.cells = {other: value * coefficient for other, value in self.cells.items()}
+
+    def solve_for_pair(self, leaving, entering):
+        """Rewrite `leaving = row` as `entering = row'`"""
+        self.insert_symbol(leaving, -1.0)
+        self.solve_for(entering)
+
+    def coefficient(self, symbol):
+        return self.cells.get(symbol, 0.0)
+
+    def substitute(self, symbol, row):
+        coefficient = self.cells.pop(symbol, None)
+        if coefficient is not None:
+            self.insert_row(row, coefficient)
+
+
+class ConstraintSolver:
+    """
+    Incremental Cassowary linear constraint solver.
+
+    Required constraints always hold; the others are met as well as the
+    required ones allow, stronger ones first. The tableau is kept between
+    calls: adding or removing a constraint pivots only the rows it touches,
+    and suggesting a new value for an edit variable (while dragging) is a
+    dual simplex step from the previous solution.
+    """
+
+    def __init__(self):
+        self._constraints = {}
+        self._rows = {}
+        self._variables = {}
+        self._edits = {}
+        self._infeasible = []
+        self._objective = _Row()
+        self._artificial = None
+
+    def has_constraint(self, constraint):
+        return constraint in self._constraints
+
+    def add_constraint(self, constraint):
+        """
+        Add a constraint
+
+        Args:
+            constraint: LinearConstraint
+
+        Raises:
+            UnsatisfiableConstraintError: If the constraint is required and
+                contradicts the required constraints (the solver is unchanged)
+        """
+        if constraint in self._constraints:
+            raise ValueError("Constraint already added")
+
+        tag, row = self._create_row(constraint)
+        subject = self._choose_subject(row, tag)
+        if subject is None and all(symbol.kind == _DUMMY for symbol in row.cells):
+            if abs(row.constant) >= _EPSILON:
+                self._remove_objective_errors(constraint, tag)
+                raise UnsatisfiableConstraintError("Required constraint cannot be satisfied")
+            subject = tag.marker
+
+        if subject is None:
+            if not self._add_with_artificial_variable(row):
+                # Undo whatever part of the row made it into the tableau
+                if tag.marker in self._rows or any(tag.marker in basic.cells for basic in self._rows.values()):
+                    self._constraints[constraint] = tag
+                    self.remove_constraint(constraint)
+                raise UnsatisfiableConstraintError("Required constraint cannot be satisfied")
+        else:
+            row.solve_for(subject)
+            self._substitute(subject, row)
+            self._rows[subject] = row
+
+        self._constraints[constraint] = tag
+        self._optimize(self._objective)
+
+    def remove_constraint(self, constraint):
+        """
+        Remove a constraint
+
+        Args:
+            constraint: LinearConstraint added before
+        """
+        tag = self._constraints.pop(constraint, None)
+        if tag is None:
+            raise ValueError("Unknown constraint")
+
+        self._remove_objective_errors(constraint, tag)
+        if self._rows.pop(tag.marker, None) is None:
+            leaving = self._marker_leaving_symbol(tag.marker)
+            if leaving is None:
+                raise RuntimeError("Failed to find the leaving row of a constraint")
+            row = self._rows.pop(leaving)
+            row.solve_for_pair(leaving, tag.marker)
+            self._substitute(tag.marker, row)
+        self._optimize(self._objective)
+
+    def has_edit_variable(self, variable):
+        return variable in self._edits
+
+    def add_edit_variable(self, variable, strength):
+        """
+        Make a variable editable with suggest_value()
+
+        Args:
+            variable: Variable
+            strength: Strength of the suggested values (below REQUIRED)
+        """
+        if variable in self._edits:
+            raise ValueError("Variable is already being edited")
+        if strength >= REQUIRED:
+            raise ValueError("Edit variables cannot be required")
+        constraint = LinearConstraint([(variable, 1.0)], 0.0, EQ, strength)
+        self.add_constraint(constraint)
+        self._edits[variable] = _EditInfo(self._constraints[constraint], constraint)
+
+    def remove_edit_variable(self, variable):
+        """
+        Stop editing a variable
+
+        Args:
+            variable: Variable passed to add_edit_variable()
+        """
+        info = self._edits.pop(variable, None)
+        if info is None:
+            raise ValueError("Variable is not being edited")
+        self.remove_constraint(info.constraint)
+
+    def suggest_value(self, variable, value):
+        """
+        Suggest a value for an edit variable and re-solve incrementally
+
+        Args:
+            variable: Variable passed to add_edit_variable()
+            value: Suggested value
+        """
+        info = self._edits.get(variable)
+        if info is None:
+            raise ValueError("Variable is not being edited")
+
+        delta = value - info.constant
+        info.constant = value
+        marker, other = info.tag
+
+        row = self._rows.get(marker)
+        if row is not None:
+            if row.add(-delta) < 0.0:
+                self._infeasible.append(marker)
+        else:
+            row = self._rows.get(other)
+            if row is not None:
+                if row.add(delta) < 0.0:
+                    self._infeasible.append(other)
+            else:
+                for symbol, row in self._rows.items():
+                    coefficient = row.coefficient(marker)
+                    if coefficient and row.add(delta * coefficient) < 0.0 and symbol.kind != _EXTERNAL:
+                        self._infeasible.append(symbol)
+        self._dual_optimize()
+
+    def update_variables(self):
+        """Write the current solution into the `value` of every variable"""
+        rows = self._rows
+        for variable, symbol in self._variables.items():
+            row = rows.get(symbol)
+            variable.value = row.constant if row is not None else 0.0
+
+    def _variable_symbol(self, variable):
+        symbol = self._variables.get(variable)
+        if symbol is None:
+            symbol = self._variables[variable] = _Symbol(_EXTERNAL)
+        return symbol
+
+    def _create_row(self, constraint):
+        """Build the tableau row of a constraint, with its slack/error symbols"""
+        row = _Row(constraint.constant)
+        for variable, coefficient in constraint.terms:
+            if abs(coefficient) < _EPSILON:
+                continue
+            symbol = self._variable_symbol(variable)
+            basic = self._rows.get(symbol)
+            if basic is not None:
+                row.insert_row(basic, coefficient)
+            else:
+                row.insert_symbol(symbol, coefficient)
+
+        strength = constraint.strength
+        if constraint.op in (LE, GE):
+            coefficient = 1.0 if constraint.op == LE else -1.0
+            slack = _Symbol(_SLACK)
+            row.insert_symbol(slack, coefficient)
+            other = None
+            if strength < REQUIRED:
+                other = _Symbol(_ERROR)
+                row.insert_symbol(other, -coefficient)
+                self._objective.insert_symbol(other, strength)
+            tag = _Tag(slack, other)
+        elif strength < REQUIRED:
+            plus, minus = _Symbol(_ERROR), _Symbol(_ERROR)
+            row.insert_symbol(plus, -1.0)
+            row.insert_symbol(minus, 1.0)
+            self._objective.insert_symbol(plus, strength)
+            self._objective.insert_symbol(minus, strength)
+            tag = _Tag(plus, minus)
+        else:
+            dummy = _Symbol(_DUMMY)
+            row.insert_symbol(dummy)
+            tag = _Tag(dummy, None)
+
+        if row.constant < 0.0:
+            row.reverse_sign()
+        return tag, row
+
+    def _choose_subject(self, row, tag):
+        """Symbol to make basic for a new row, or None if it needs an artificial variable"""
+        for symbol in row.cells:
+            if symbol.kind == _EXTERNAL:
+                return symbol
+        for symbol in tag:
+            if symbol is not None and symbol.kind in (_SLACK, _ERROR) and row.coefficient(symbol) < 0.0:
+                return symbol
+        return None
+
+    def _add_with_artificial_variable(self, row):
+        """Add a row through a temporary artificial variable; False if infeasible"""
+        artificial = _Symbol(_SLACK)
+        self._rows[artificial] = row.copy()
+        self._artificial = row.copy()
+        self._optimize(self._artificial)
+        success = abs(self._artificial.constant) < _EPSILON
+        self._artificial = None
+
+        basic = self._rows.pop(artificial, None)
+        if basic is not None:
+            if not basic.cells:
+                return success
+            entering = next((symbol for symbol in basic.cells if symbol.kind in (_SLACK, _ERROR)), None)
+            if entering is None:
+                return False
+            basic.solve_for_pair(artificial, entering)
+            self._substitute(entering, basic)
+            self._rows[entering] = basic
+
+        for basic in self._rows.values():
+            basic.cells.pop(artificial, None)
+        self._objective.cells.pop(artificial, None)
+        return success
+
+    def _substitute(self, symbol, row):
+        """Replace a symbol that became basic by its row everywhere"""
+        for basic_symbol, basic in self._rows.items():
+            basic.substitute(symbol, row)
+            if basic_symbol.kind != _EXTERNAL and basic.constant < 0.0:
+                self._infeasible.append(basic_symbol)
+        self._objective.substitute(symbol, row)
+        if self._artificial is not None:
+            self._artificial.substitute(symbol, row)
+
+    def _optimize(self, objective):
+        """Primal simplex: pivot until no symbol can lower the objective"""
+        while True:
+            entering = next((symbol for symbol, value in objective.cells.items()
+                             if symbol.kind != _DUMMY and value < 0.0), None)
+            if entering is None:
+                return
+
+            leaving, ratio = None, None
+            for symbol, row in self._rows.items():
+                if symbol.kind == _EXTERNAL:
+                    continue
+                coefficient = row.coefficient(entering)
+                if coefficient < 0.0:
+                    candidate = -row.constant / coefficient
+                    if ratio is None or candidate < ratio:
+                        leaving, ratio = symbol, candidate
+            if leaving is None:
+                raise RuntimeError("The objective is unbounded")
+
+            row = self._rows.pop(leaving)
+            row.solve_for_pair(leaving, entering)
+            self._substitute(entering, row)
+            self._rows[entering] = row
+
+    def _dual_optimize(self):
+        """Dual simplex: pivot until every restricted row is feasible again"""
+        while self._infeasible:
+            leaving = self._infeasible.pop()
+            row = self._rows.get(leaving)
+            if row is None or abs(row.constant) < _EPSILON or row.constant >= 0.0:
+                continue
+
+            entering, ratio = None, None
+            for symbol, coefficient in row.cells.items():
+                if coefficient > 0.0 and symbol.kind != _DUMMY:
+                    candidate = self._objective.coefficient(symbol) / coefficient
+                    if ratio is None or candidate < ratio:
+                        entering, ratio = symbol, candidate
+            if entering is None:
+                raise RuntimeError("Dual optimization failed")
+
+            del self._rows[leaving]
+            row.solve_for_pair(leaving, entering)
+            self._substitute(entering, row)
+            self._rows[entering] = row
+
+    def _remove_objective_errors(self, constraint, tag):
+        """Take the error symbols of a constraint out of the objective"""
+        for symbol in tag:
+            if symbol is not None and symbol.kind == _ERROR:
+                row = self._rows.get(symbol)
+                if row is not None:
+                    self._objective.insert_row(row, -constraint.strength)
+                else:
+                    self._objective.insert_symbol(symbol, -constraint.strength)
+
+    def _marker_leaving_symbol(self, marker):
+        """Basic symbol to pivot out when removing a constraint whose marker is not basic"""
+        first = second = third = None
+        first_ratio = second_ratio = None
+        for symbol, row in self._rows.items():
+            coefficient = row.coefficient(marker)
+            if not coefficient:
+                continue
+            if symbol.kind == _EXTERNAL:
+                third = symbol
+            elif coefficient < 0.0:
+                ratio = -row.constant / coefficient
+                if first_ratio is None or ratio < first_ratio:
+                    first, first_ratio = symbol, ratio
+            else:
+                ratio = row.constant / coefficient
+                if second_ratio is None or ratio < second_ratio:
+                    second, second_ratio = symbol, ratio
+        return first or second or third
@@ -0,0 +1,222 @@
+import time
+from collections import namedtuple
+
+from DSL.Geometry.Polygon import Polygon
+
+
+# Room to furnish, in layout units: its size, its outline relative to its
+# top-left corner (None for rectangles), the (min_x, min_y, max_x, max_y)
+# rectangles furniture must keep clear of (door swings, furniture placed by
+# hand), the footprint of every item to pack and whether it may turn, and
+# the distance furniture keeps from the outline (the half of the wall drawn
+# inside the room)
+PackingProblem = namedtuple('PackingProblem', ['width', 'height', 'outline', 'obstacles',
+                                               'widths', 'heights', 'rotatable', 'clearance'],
+                            defaults=(0,))
+
+# Packed items: per item, the top-left corner of its footprint relative to
+# the room (None for items that did not fit) and whether it turned 90 degrees
+PackingResult = namedtuple('PackingResult', ['positions', 'turned', 'placed_area'])
+
+# Item orders tried by the packer, largest items first by each measure
+_ORDERS = (
+    lambda w, h: w * h,
+    lambda w, h: max(w, h),
+    lambda w, h: w + h,
+    lambda w, h: h,
+)
+
+# Placement rules: score of putting a (w, h) item in a free rectangle at
+# (x, y) with the given width and height; the lowest score wins
+_RULES = (
+    # Best short side fit
+    lambda x, y, w, h, free_w, free_h: (min(free_w - w, free_h - h), max(free_w - w, free_h - h)),
+    # Best area fit
+    lambda x, y, w, h, free_w, free_h: (free_w * free_h - w * h, min(free_w - w, free_h - h)),
+    # Bottom-left: topmost, then leftmost position
+    lambda x, y, w, h, free_w, free_h: (y + h, x),
+)
+
+# Sizes closer than this are equal (float geometry)
+_EPSILON = 1e-9
+
+
+class FurniturePacker:
+    """
+    Packs furniture into a room with the maximal-rectangles algorithm.
+
+    The free space of the room is kept as the list of all maximal empty
+    rectangles; each item goes into the free rectangle the placement rule
+    scores best, in either orientation if it may turn, and the rectangles it
+    covers are split around it. Several item orders and placement rules are
+    tried and the packing that places the most furniture area wins; a time
+    budget cuts the strategies short (the first one always completes).
+    """
+
+    def __init__(self, time_budget=None):
+        """
+        Create a packer
+
+        Args:
+            time_budget: Optional seconds per room; None tries every
+                strategy, which keeps the result independent of timing
+        """
+        self.time_budget = time_budget
+
+    def pack(self, problem):
+        """
+        Pack the items of a room
+
+        Args:
+            problem: PackingProblem
+
+        Returns:
+            PackingResult of the best packing found
+        """
+        deadline = time.time() + self.time_budget if self.time_budget is not None else None
+        total_area = sum(w * h for w, h in zip(problem.widths, problem.heights))
+        outline = Polygon(problem.outline) if problem.outline else None
+
+        best = None
+        for order in _ORDERS:
+            for rule in _RULES:
+                result = _max_rects(problem, outline, order, rule)
+                if best is None or result.placed_area > best.placed_area + _EPSILON:
+                    best = result
+                if best.placed_area >= total_area - _EPSILON:
+                    return best
+                if deadline is not None and time.time() >= deadline:
+                    return best
+        return best
+
+
+def pack_rooms(problems, time_budget=None):
+    """
+    Pack the furniture of several rooms (in a worker process)
+
+    Args:
+        problems: List of PackingProblem
+        time_budget: Optional seconds per room
+
+    Returns:
+        List of PackingResult, one per problem
+    """
+    packer = FurniturePacker(time_budget)
+    return [packer.pack(problem) for problem in problems]
+
+
+def _max_rects(problem, outline, order, rule):
+    """
+    Run one maximal-rectangles packing
+
+    Args:
+        problem: PackingProblem
+        outline: Polygon of the room outline or None
+        order: Key of the item order (larger first)
+        rule: Placement rule
+
+    Returns:
+        PackingResult
+    """
+    clearance = problem.clearance
+    if 2 * clearance >= min(problem.width, problem.height):
+        return PackingResult([None] * len(problem.widths), [False] * len(problem.widths), 0)
+    free = [(clearance, clearance, problem.width - clearance, problem.height - clearance)]
+    for obstacle in problem.obstacles:
+        free = _split_free(free, obstacle)
+
+    count = len(problem.widths)
+    positions = [None] * count
+    turned = [False] * count
+    placed_area = 0
+    items = sorted(range(count), key=lambda i: (-order(problem.widths[i], problem.heights[i]), i))
+    for item in items:
+        width, height = problem.widths[item], problem.heights[item]
+        orientations = [(width, height, False)]
+        if problem.rotatable[item] and width != height:
+            orientations.append((height, width, True))
+
+        best = None
+        for min_x, min_y, max_x, max_y in free:
+            free_w, free_h = max_x - min_x, max_y - min_y
+            for w, h, turn in orientations:
+                if w > free_w + _EPSILON or h > free_h + _EPSILON:
+                    continue
+                for x, y in _anchors(min_x, min_y, max_x, max_y, w, h, outline, clearance):
+                    score = rule(x, y, w, h, free_w, free_h)
+                    if best is None or score < best[0]:
+                        best = (score, x, y, w, h, turn)
+        if best is None:
+            continue
+
+        _, x, y, w, h, turn = best
+        positions[item] = (x, y)
+        turned[item] = turn
+        placed_area += w * h
+        free = _split_free(free, (x, y, x + w, y + h))
+    return PackingResult(positions, turned, placed_area)
+
+
+def _anchors(min_x, min_y, max_x, max_y, w, h, outline, clearance=0):
+    """
+    Get the positions to try for an item in a free rectangle
+
+    Rectangular rooms only try the top-left corner. Polygon rooms try all
+    four corners of the free rectangle and keep those where the item, grown
+    by the clearance on every side, lies inside the outline: its corners are
+    inside and no outline vertex pokes into it.
+    """
+    if outline is None:
+        return [(min_x, min_y)]
+    anchors = []
+    for x, y in ((min_x, min_y), (max_x - w, min_y), (min_x, max_y - h), (max_x - w, max_y - h)):
+        left, top, right, bottom = x - clearance, y - clearance, x + w + clearance, y + h + clearance
+        corners_x = [left, right, left, right]
+        corners_y = [top, top, bottom, bottom]
+        if not outline.contains_points(corners_x, corners_y).all():
+            continue
+        if any(left + _EPSILON < px < right - _EPSILON and top + _EPSILON < py < bottom - _EPSILON
+               for px, py in zip(outline.xs.tolist(), outline.ys.tolist())):
+            continue
+        anchors.append((x, y))
+    return anchors
+
+
+def _split_free(free, used):
+    """
+    Remove a used rectangle from the free rectangles
+
+    Args:
+        free: List of maximal free (min_x, min_y, max_x, max_y) rectangles
+        used: Rectangle taken by an item or obstacle
+
+    Returns:
+        New list of maximal free rectangles
+    """
+    used_min_x, used_min_y, used_max_x, used_max_y = used
+    result = []
+    for rect in free:
+        min_x, min_y, max_x, max_y = rect
+        if (used_min_x >= max_x - _EPSILON or used_max_x <= min_x + _EPSILON or
+                used_min_y >= max_y - _EPSILON or used_max_y <= min_y + _EPSILON):
+            result.append(rect)
+            continue
+        # Up to four maximal rectangles around the used one
+        if used_min_x > min_x + _EPSILON:
+            result.append((min_x, min_y, used_min_x, max_y))
+        if used_max_x < max_x - _EPSILON:
+            result.append((used_max_x, min_y, max_x, max_y))
+        if used_min_y > min_y + _EPSILON:
+            result.append((min_x, min_y, max_x, used_min_y))
+        if used_max_y < max_y - _EPSILON:
+            result.append((min_x, used_max_y, max_x, max_y))
+
+    # Drop the rectangles another one contains
+    result.sort(key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True)
+    maximal = []
+    for rect in result:
+        if not any(other[0] <= rect[0] + _EPSILON and other[1] <= rect[1] + _EPSILON and
+                   other[2] >= rect[2] - _EPSILON and other[3] >= rect[3] - _EPSILON
+                   for other in maximal):
+            maximal.append(rect)
+    return maximal
@@ -0,0 +1,272 @@
+import os
+import uuid
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from DSL.Models.ElementColumns import ElementColumns
+from DSL.Models.TrackedElement import TrackedElement
+
+
+# Kinds of element the layout moves, with the fields it writes
+LAYOUT_KINDS = ('rooms', 'doors', 'windows', 'furniture')
+LAYOUT_FIELDS = {
+    'rooms': ('x', 'y', 'width', 'height'),
+    'doors': ('x', 'y', 'width', 'height'),
+    'windows': ('x', 'y', 'width', 'height'),
+    'furniture': ('x', 'y', 'width', 'height', 'rotation'),
+}
+
+# Door directions, stored as their index in this tuple
+DIRECTIONS = ('right', 'left', 'down', 'up')
+
+# Laid-out geometry of one floor plan: kind -> (n, k) float array of the
+# kind's LAYOUT_FIELDS, and the door directions as uint8 indices into DIRECTIONS
+LayoutEntry = namedtuple('LayoutEntry', ['geometry', 'directions'])
+
+
+def prune_directory(directory, suffix, max_entries=None, max_bytes=None):
+    """
+    Delete the least recently used files of a cache directory over its limits
+
+    Files are ranked by modification time, so readers that refresh it on a
+    hit (os.utime) make the directory an LRU. Files being written (temporary
+    names) and files of other caches are left alone.
+
+    Args:
+        directory: Cache directory
+        suffix: File name suffix of the cache's entries
+        max_entries: Number of files to keep (None for no limit)
+        max_bytes: Total size of the files to keep (None for no limit)
+
+    Returns:
+        Number of files deleted
+    """
+    if max_entries is None and max_bytes is None:
+        return 0
+    files = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(suffix) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        # Deleted by another process meanwhile
+                        continue
+                    files.append((stat.st_mtime_ns, entry.name, stat.st_size))
+    except OSError as e:
+        print(f"Warning: Could not list cache directory {directory}: {str(e)}")
+        return 0
+
+    files.sort(reverse=True)
+    total = 0
+    deleted = 0
+    for kept, (_, name, size) in enumerate(files):
+        total += size
+        if (max_entries is not None and kept >= max_entries) or (max_bytes is not None and total > max_bytes):
+            try:
+                os.remove(os.path.join(directory, name))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Warning: Could not delete cache file {name}: {str(e)}")
+    return deleted
+
+
+class LayoutCache:
+    """
+    Cache of laid-out floor plans keyed by their input geometry.
+
+    Entries only hold the positions and sizes the layout writes and the door
+    directions, as arrays, so restoring one is a few array copies. The most
+    recently used entries stay in memory; with a directory, entries are also
+    written to disk and survive restarts. The disk tier is an LRU as well:
+    reading an entry refreshes its file's modification time, and the least
+    recently used files go once the directory holds too many or too much.
+    """
+
+    def __init__(self, max_entries=256, directory=None, max_disk_entries=4096, max_disk_bytes=256 << 20):
+        """
+        Create a cache
+
+        Args:
+            max_entries: Number of entries kept in memory
+            directory: Optional directory for the on-disk tier
+            max_disk_entries: Number of entries kept on disk (None for no limit)
+            max_disk_bytes: Total size of the entries kept on disk (None for no limit)
+        """
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def restore(self, key, floor_plan):
+        """
+        Apply a cached layout to a floor plan
+
+        Args:
+            key: Layout key of the floor plan
+            floor_plan: FloorPlan with the input geometry of that key
+
+        Returns:
+            True if a layout was found and applied
+        """
+        entry = self.get(key)
+        if entry is None or not self._matches(entry, floor_plan):
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        for kind in LAYOUT_KINDS:
+            self._write_geometry(floor_plan, getattr(floor_plan, kind), entry.geometry[kind], LAYOUT_FIELDS[kind])
+        self._write_directions(floor_plan.doors, entry.directions)
+        return True
+
+    def store(self, key, floor_plan):
+        """
+        Cache the layout of a floor plan
+
+        Args:
+            key: Layout key the floor plan had before it was laid out
+            floor_plan: The laid-out FloorPlan
+        """
+        directions = [DIRECTIONS.index(direction) if direction in DIRECTIONS else -1
+                      for direction in self._read_field(floor_plan.doors, 'direction')]
+        if -1 in directions:
+            # Only the four layout directions can be stored
+            return
+        entry = LayoutEntry(
+            {kind: self._read_geometry(getattr(floor_plan, kind), LAYOUT_FIELDS[kind]) for kind in LAYOUT_KINDS},
+            np.array(directions, dtype=np.uint8),
+        )
+        self.put(key, entry)
+
+    def get(self, key):
+        """
+        Look an entry up in memory, then on disk
+
+        Args:
+            key: Layout key
+
+        Returns:
+            LayoutEntry or None
+        """
+        entry = self.entries.get(key)
+        if entry is None and self.directory:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, entry)
+        elif entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        """
+        Add an entry
+
+        Args:
+            key: Layout key
+            entry: LayoutEntry
+        """
+        self._remember(key, entry)
+        if self.directory:
+            self._save(key, entry)
+
+    def _remember(self, key, entry):
+        """Put an entry in memory, evicting the least recently used one"""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def _save(self, key, entry):
+        """Write an entry to disk"""
+        path = self._path(key)
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                np.savez(file, directions=entry.directions, **entry.geometry)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not save layout {path}: {str(e)}")
+            return
+        prune_directory(self.directory, '.npz', self.max_disk_entries, self.max_disk_bytes)
+
+    def _load(self, key):
+        """Read an entry from disk, or None if it is missing or unreadable"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as arrays:
+                geometry = {kind: arrays[kind].reshape(-1, len(LAYOUT_FIELDS[kind])) for kind in LAYOUT_KINDS}
+                entry = LayoutEntry(geometry, arrays['directions'].astype(np.uint8))
+            # Mark the file as recently used for prune_directory()
+            os.utime(path)
+            return entry
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring saved layout {path}: {str(e)}")
+            return None
+
+    def _matches(self, entry, floor_plan):
+        """Check that an entry has one row per element of the floor plan"""
+        return (all(len(entry.geometry[kind]) == len(getattr(floor_plan, kind)) for kind in LAYOUT_KINDS)
+                and len(entry.directions) == len(floor_plan.doors))
+
+    def _read_field(self, elements, name):
+        """Read one field of every element as a list"""
+        if isinstance(elements, ElementColumns):
+            if name in elements.string_fields:
+                lookup = elements.strings.lookup
+                return [lookup(code) for code in elements.column(name).tolist()]
+            return elements.column(name).tolist()
+        return [getattr(element, name, None) for element in elements]
+
+    def _read_geometry(self, elements, fields):
+        """Read some layout fields of some elements into an (n, len(fields)) array"""
+        if isinstance(elements, ElementColumns):
+            return np.stack([elements.column(name) for name in fields], axis=1)
+        return np.array([[getattr(element, name) for name in fields] for element in elements],
+                        dtype=np.float64).reshape(-1, len(fields))
+
+    def _write_geometry(self, floor_plan, elements, geometry, fields):
+        """Write some layout fields of some elements, moving only those that differ"""
+        if not len(elements):
+            return
+        if isinstance(elements, ElementColumns):
+            for field, name in enumerate(fields):
+                elements.column(name)[:] = geometry[:, field]
+            floor_plan.spatial_index = None
+            return
+
+        for element, values in zip(elements, geometry.tolist()):
+            moved = False
+            for name, value in zip(fields, values):
+                current = getattr(element, name)
+                if current != value:
+                    # Keep ints as ints (integer geometry mode)
+                    setattr(element, name, int(value) if isinstance(current, int) and value.is_integer() else value)
+                    moved = True
+            if moved and not isinstance(element, TrackedElement):
+                floor_plan.update_element(element)
+
+    def _write_directions(self, doors, directions):
+        """Write the door directions"""
+        if isinstance(doors, ElementColumns):
+            codes = np.array([doors.strings.intern(direction) for direction in DIRECTIONS], dtype=np.int32)
+            doors.column('direction')[:] = codes[directions]
+            return
+        for door, index in zip(doors, directions.tolist()):
+            if door.direction != DIRECTIONS[index]:
+                door.direction = DIRECTIONS[index]
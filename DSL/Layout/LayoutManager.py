@@ -1,10 +1,29 @@
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
 from DSL.Models.FloorPlan import FloorPlan
+from DSL.Models.ElementColumns import ElementColumns
 from DSL.Models.Room import Room
 from DSL.Models.Wall import Wall
 from DSL.Models.Door import Door
 from DSL.Models.Window import Window
 from DSL.Models.Furniture import Furniture
-import math
+from DSL.Geometry.SpatialIndex import SpatialIndex, element_bounds
+from DSL.Geometry.PointGrid import PointGrid
+from DSL.Geometry.OccupancyGrid import OccupancyGrid
+from DSL.Layout.LayoutOptimizer import LayoutOptimizer, LayoutProblem
+from DSL.Layout.ConstraintLayout import ConstraintLayout
+from DSL.Layout.FurniturePacker import FurniturePacker, PackingProblem, pack_rooms
+
+
+# Version of the layout algorithm, part of every cached layout's key; bump it
+# whenever a change makes the same input lay out differently
+LAYOUT_VERSION = 4
 
 
 class LayoutManager:
@@ -32,6 +51,49 @@ class LayoutManager:
         self.min_door_width = 1
         self.min_door_height = 1
 
+        # Integer geometry mode: exact comparisons, so rooms can be placed flush
+        self.grid = floor_plan.grid
+        self.room_gap = 0 if self.grid is not None else 1
+
+        # Pushes tried per room before falling back to a free-space search
+        self.max_push_iterations = 32
+
+        # Openings looked up per batch in the grid of room centers when
+        # snapping openings; smaller groups look their closest room up in the index
+        self.distance_batch_size = 1 << 16
+        self.max_indexed_openings = 64
+
+        # Plans with this many rooms lay out independent clusters of rooms in
+        # up to max_workers processes (None for the CPU count)
+        self.parallel_min_rooms = 2000
+        self.max_workers = None
+
+        # Seeded searches of the global optimizer (None for one per worker)
+        self.restarts = None
+
+        # LayoutCache of results shared between runs (None to always lay out)
+        self.cache = None
+
+        # Seconds the furniture packer may spend per room (None tries every
+        # packing strategy, which keeps layouts cacheable), and the number of
+        # rooms to furnish from which rooms are packed in parallel processes
+        self.furniture_time_budget = None
+        self.parallel_min_furnished_rooms = 64
+
+        # ConstraintLayout of the plan's constraints, kept between edits
+        # (created by optimize_layout() or the first constraint edit)
+        self.constraint_layout = None
+
+        # Bottom edge of the placed rooms, and the largest distance from a
+        # snapped opening to the center of its room (computed when needed)
+        self._placed_bottom = None
+        self._room_reach = None
+
+        # OccupancyGrid of the placed rooms during a bulk placement, created
+        # by its first free-space search (None until then and outside of one)
+        self._free_space = None
+        self._placing_in_bulk = False
+
         # Use header dimensions if available
         if self.floor_plan.header:
             if 'width' in self.floor_plan.header:
@@ -39,15 +101,38 @@ class LayoutManager:
             if 'height' in self.floor_plan.header:
                 self.max_height = self.floor_plan.header['height']
 
-    def optimize_layout(self):
+    def optimize_layout(self, time_budget=None):
         """
         Main method to optimize the floor plan layout
 
+        With a cache, a plan whose input was laid out before gets the cached
+        result instead. Layouts found with a time budget (or a furniture time
+        budget) depend on timing and are not cached.
+
+        Args:
+            time_budget: Optional seconds for the global optimizer, which then
+                moves the greedily placed rooms to minimize their total
+                distance from the declared positions
+
         Returns:
             Optimized FloorPlan object
         """
+        key = None
+        if self.cache is not None and not time_budget and self.furniture_time_budget is None:
+            key = self._cache_key()
+            if self.cache.restore(key, self.floor_plan):
+                return self.floor_plan
+
+        # Step 0: Place the constrained rooms so their relations hold
+        if self.floor_plan.constraints:
+            self._solve_constraints()
+
+        origins = [(room.x, room.y) for room in self.floor_plan.rooms] if time_budget else None
+
         # Step 1: Position rooms without overlaps while preserving coordinates
         self._prevent_room_intersections()
+        if time_budget:
+            self._minimize_room_displacement(origins, time_budget)
 
         # Step 2: Place windows on walls
         self._place_windows_on_walls()
@@ -55,94 +140,870 @@ class LayoutManager:
         # Step 3: Place doors on walls
         self._place_doors_on_walls()
 
+        # Step 4: Pack the furniture without a position into its room
+        self._place_furniture()
+
+        if key is not None:
+            self.cache.store(key, self.floor_plan)
         return self.floor_plan
 
+    def _cache_key(self):
+        """
+        Get the key of the floor plan's layout in a LayoutCache
+
+        Besides the geometry fingerprint of the plan, the key covers all else
+        the layout reads: the layout version and settings, how openings are anchored to
+        walls, door directions, the endpoints of the walls, the constraints
+        and which furniture is packed into which room.
+
+        Returns:
+            Hexadecimal digest string
+        """
+        floor_plan = self.floor_plan
+        digest = hashlib.blake2b(floor_plan.fingerprint().encode('utf-8'), digest_size=16)
+        settings = (LAYOUT_VERSION, self.wall_thickness, self.max_width, self.max_height, self.min_door_width,
+                    self.min_door_height, self.room_gap, self.max_push_iterations)
+        digest.update(repr(settings).encode('utf-8'))
+
+        for kind, fields in (('doors', ('wall_id', 'parent_id', 'distance_wall', 'direction')),
+                             ('windows', ('wall_id', 'parent_id', 'distance_wall')),
+                             ('furniture', ('parent_id', 'rotation', 'auto_place'))):
+            elements = getattr(floor_plan, kind)
+            for name in fields:
+                if isinstance(elements, ElementColumns) and name not in elements.numeric_fields + elements.string_fields:
+                    # Not stored by columns (furniture in columns is never packed)
+                    continue
+                if isinstance(elements, ElementColumns) and name in elements.string_fields:
+                    # Codes depend on interning order; hash the strings they stand for
+                    codes, inverse = np.unique(elements.column(name), return_inverse=True)
+                    digest.update(repr([elements.strings.lookup(code) for code in codes.tolist()]).encode('utf-8'))
+                    digest.update(inverse.astype(np.int64).tobytes())
+                elif isinstance(elements, ElementColumns):
+                    digest.update(np.ascontiguousarray(elements.column(name), dtype=np.float64).tobytes())
+                else:
+                    digest.update(repr([getattr(element, name, None) for element in elements]).encode('utf-8'))
+
+        for wall_id, wall in self._wall_table().items():
+            digest.update(repr((wall_id, wall.start_x, wall.start_y, wall.end_x, wall.end_y,
+                                getattr(wall, 'parent_id', None))).encode('utf-8'))
+        digest.update(repr([constraint.key() for constraint in floor_plan.constraints]).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _solve_constraints(self):
+        """
+        Create the constraint layout of the plan's constraints and apply it
+
+        Returns:
+            List of the rooms the constraints moved
+        """
+        self.constraint_layout = None
+        self._get_constraint_layout()
+        return self._apply_constraints()
+
+    def _get_constraint_layout(self):
+        """
+        Get the constraint layout, creating it from the plan's constraints on first use
+
+        Returns:
+            ConstraintLayout object
+        """
+        if self.constraint_layout is None:
+            self.constraint_layout = ConstraintLayout(self.floor_plan, self.max_width, self.max_height)
+            for constraint in self.floor_plan.constraints:
+                self.constraint_layout.add_constraint(constraint)
+        return self.constraint_layout
+
+    def _apply_constraints(self):
+        """
+        Write the constraint layout's solution to the rooms
+
+        Returns:
+            List of the rooms the constraints moved
+        """
+        moved = self.constraint_layout.apply()
+        for room in moved:
+            self.floor_plan.update_element(room)
+        return moved
+
+    def drag_room(self, room_id, x, y):
+        """
+        Move a room during an interactive drag
+
+        Rooms related to the dragged room by constraints follow it; the
+        constraint solver only re-solves from its previous solution, so
+        each call is cheap. The overlap layout then runs around the moved
+        rooms only (see update_layout()). Call release_room() when the drag
+        ends.
+
+        Args:
+            room_id: ID of the dragged room
+            x, y: New position of the room
+
+        Returns:
+            List of the elements the layout changed
+        """
+        floor_plan = self.floor_plan
+        version = floor_plan.version
+        constraint_layout = self._get_constraint_layout()
+        if constraint_layout.has_room(room_id):
+            constraint_layout.drag(room_id, x, y)
+            moved_ids = [room.id for room in self._apply_constraints()]
+        else:
+            room = floor_plan.get_element_by_id(room_id)
+            if room is None:
+                return []
+            room.x, room.y = x, y
+            floor_plan.update_element(room)
+            moved_ids = [room_id]
+        self.update_layout(moved_ids, since=version)
+        return floor_plan.changed_elements_since(version)
+
+    def release_room(self, room_id):
+        """
+        End the drag of a room, leaving the rooms where the drag put them
+
+        Args:
+            room_id: ID of the room passed to drag_room()
+        """
+        if self.constraint_layout is not None:
+            self.constraint_layout.release(room_id)
+
+    def set_constraint(self, constraint):
+        """
+        Add a constraint to the plan, replacing the one with the same ID
+
+        Args:
+            constraint: LayoutConstraint
+
+        Returns:
+            List of the elements the layout changed
+        """
+        floor_plan = self.floor_plan
+        version = floor_plan.version
+        constraint_layout = self._get_constraint_layout()
+        if constraint.id is not None:
+            for existing in [c for c in floor_plan.constraints if c.id == constraint.id]:
+                floor_plan.constraints.remove(existing)
+                constraint_layout.remove_constraint(existing)
+        floor_plan.add_constraint(constraint)
+        constraint_layout.add_constraint(constraint)
+        self.update_layout([room.id for room in self._apply_constraints()], since=version)
+        return floor_plan.changed_elements_since(version)
+
+    def remove_constraint(self, constraint_id):
+        """
+        Remove a constraint from the plan
+
+        The rooms stay where they are; they are only free to move apart.
+
+        Args:
+            constraint_id: ID of the constraint
+
+        Returns:
+            True if the plan had the constraint
+        """
+        removed = [c for c in self.floor_plan.constraints if c.id == constraint_id]
+        for constraint in removed:
+            self.floor_plan.constraints.remove(constraint)
+            if self.constraint_layout is not None:
+                self.constraint_layout.remove_constraint(constraint)
+        return bool(removed)
+
+    def update_layout(self, element_ids, since=None):
+        """
+        Re-run the layout around a few edited elements
+
+        Edited rooms keep their new position, moved back inside the plan and
+        off each other if needed. Only the rooms they now overlap are placed
+        again, each against all the others, so conflicts spread outward no
+        further than they have to. Doors and windows are snapped again only
+        if they were edited, lay on an affected room, or are close enough to
+        a moved room for it to become their closest room.
+
+        Args:
+            element_ids: IDs of the edited rooms, doors and windows
+            since: Optional floor plan version from before the edit; the
+                change log then tells where the edited rooms were, so the
+                openings they left behind are snapped again too
+
+        Returns:
+            List of the elements the layout changed
+        """
+        floor_plan = self.floor_plan
+        version = floor_plan.version
+        index = floor_plan.get_spatial_index()
+        self._placed_bottom = None
+
+        edited = [floor_plan.get_element_by_id(element_id) for element_id in element_ids]
+        edited = [element for element in edited if element is not None]
+        edited_rooms = sorted((element for element in edited if isinstance(element, Room)),
+                              key=lambda r: r.width * r.height, reverse=True)
+        regions = self._previous_bounds(edited_rooms, since) if since is not None else []
+
+        # Edited rooms are placed first and push the other rooms out of the way
+        for room in edited_rooms:
+            index.remove(room)
+        placed_edits = set()
+        displaced = []
+        unplaced = []
+        for room in edited_rooms:
+            self._ensure_within_boundaries(room)
+            for other in self._find_intersections(room, index):
+                if id(other) in placed_edits:
+                    continue
+                regions.append(element_bounds(other))
+                index.remove(other)
+                displaced.append(other)
+            if not self._place_room(room, index):
+                unplaced.append(room)
+            index.insert(room, 'rooms')
+            placed_edits.add(id(room))
+
+        displaced.sort(key=lambda r: r.width * r.height, reverse=True)
+        for room in displaced:
+            if not self._place_room(room, index):
+                unplaced.append(room)
+            index.insert(room, 'rooms')
+        self._report_unplaced(unplaced)
+
+        # Openings on the affected rooms where they were, and openings close
+        # enough to where they are now for them to be their closest room
+        reach = self._nearest_room_reach(edited_rooms)
+        for room in edited_rooms + displaced:
+            center_x, center_y = room.x + room.width / 2, room.y + room.height / 2
+            regions.append((center_x - reach, center_y - reach, center_x + reach, center_y + reach))
+        openings = {'windows': {}, 'doors': {}}
+        for element in edited:
+            kind = 'doors' if isinstance(element, Door) else 'windows' if isinstance(element, Window) else None
+            if kind:
+                openings[kind][id(element)] = element
+        for bounds in regions:
+            for kind, found in openings.items():
+                for element in index.query_rect(*bounds, kind=kind):
+                    found.setdefault(id(element), element)
+
+        self._place_openings(list(openings['windows'].values()), False)
+        self._place_openings(list(openings['doors'].values()), True)
+
+        return floor_plan.changed_elements_since(version)
+
+    def _nearest_room_reach(self, rooms):
+        """
+        Get an upper bound of the distance from a snapped opening to its room
+
+        An opening snapped to a room lies within the room, so its center is at
+        most half the room diagonal away from the room center. The bound is
+        computed once and only grows as edited rooms get larger.
+
+        Args:
+            rooms: Edited rooms
+
+        Returns:
+            Distance in plan units
+        """
+        if self._room_reach is None:
+            self._room_reach = max((math.hypot(room.width, room.height) / 2 for room in self.floor_plan.rooms),
+                                   default=0)
+        for room in rooms:
+            self._room_reach = max(self._room_reach, math.hypot(room.width, room.height) / 2)
+        return self._room_reach
+
+    def _previous_bounds(self, rooms, since):
+        """
+        Get where some rooms were at an earlier version of the floor plan
+
+        Args:
+            rooms: Rooms of the floor plan
+            since: Earlier floor plan version
+
+        Returns:
+            List of (min_x, min_y, max_x, max_y) tuples, one per room
+        """
+        old_values = {}
+        for change in self.floor_plan.changes_since(since):
+            if change.action == 'update' and change.attribute in ('x', 'y', 'width', 'height'):
+                old_values.setdefault((id(change.element), change.attribute), change.old_value)
+
+        bounds = []
+        for room in rooms:
+            x = old_values.get((id(room), 'x'), room.x)
+            y = old_values.get((id(room), 'y'), room.y)
+            bounds.append((x, y, x + old_values.get((id(room), 'width'), room.width),
+                           y + old_values.get((id(room), 'height'), room.height)))
+        return bounds
+
     def _prevent_room_intersections(self):
         """
         Adjusts room positions to prevent intersections while trying to keep
         rooms close to their original positions
+
+        Large plans made of several independent clusters of rooms (e.g. the
+        buildings of a site) lay the clusters out in parallel processes.
+
+        Every room the pushes cannot place costs a free-space search, so
+        crowded plans are slower: with rooms covering 70% of the plan about
+        four in ten of them need one (DSL/benchmarks/layout_scaling.py).
+        """
+        rooms = self.floor_plan.rooms
+        if len(rooms) >= self.parallel_min_rooms and self._worker_count() > 1:
+            clusters, index = self._room_clusters(rooms)
+            if len(clusters) > 1 and self._layout_clusters(clusters, index):
+                return
+
+        self._layout_rooms(rooms)
+
+    def _minimize_room_displacement(self, origins, time_budget):
+        """
+        Improve the greedy room placement with the global optimizer
+
+        The optimizer treats rooms as their bounding boxes kept room_gap
+        apart, so its layouts are overlap-free for polygon rooms too; the
+        result is checked with the exact room shapes before it is kept. In
+        float mode the positions it tries are rounded to the decimal places
+        of the plan's own values.
+
+        Args:
+            origins: Declared (x, y) position of every room
+            time_budget: Seconds the optimizer may run
+        """
+        rooms = self.floor_plan.rooms
+        if len(rooms) < 2:
+            return
+
+        placed = [(room.x, room.y) for room in rooms]
+        digits = None
+        if self.grid is None:
+            # Moves are rounded to the resolution the plan was written in
+            digits = self._decimal_places([value for x, y in origins + placed for value in (x, y)] +
+                                          [value for room in rooms for value in (room.width, room.height)] +
+                                          [self.max_width, self.max_height])
+        problem = LayoutProblem(
+            origin_x=[self._steps(x) for x, _ in origins],
+            origin_y=[self._steps(y) for _, y in origins],
+            widths=[self._steps(room.width) for room in rooms],
+            heights=[self._steps(room.height) for room in rooms],
+            max_width=self._steps(self.max_width),
+            max_height=self._steps(self.max_height),
+            start_x=[self._steps(x) for x, _ in placed],
+            start_y=[self._steps(y) for _, y in placed],
+            integer=self.grid is not None,
+            gap=self._steps(self.room_gap),
+            digits=digits,
+        )
+        result = LayoutOptimizer(self.restarts, self.max_workers).optimize(problem, time_budget)
+        if result is None:
+            return
+
+        rooms = list(rooms)
+        index = SpatialIndex(SpatialIndex.suggest_cell_size(rooms))
+        for room, x, y in zip(rooms, result.xs, result.ys):
+            room.x, room.y = self._coordinate(x), self._coordinate(y)
+            index.insert(room, 'rooms')
+        if any(other is not room for room in rooms for other in self._find_intersections(room, index)):
+            print("Optimized layout has overlapping rooms, keeping the greedy layout")
+            for room, (x, y) in zip(rooms, placed):
+                room.x, room.y = x, y
+
+        for room, position in zip(rooms, placed):
+            if (room.x, room.y) != position:
+                self.floor_plan.update_element(room)
+
+    def _layout_rooms(self, rooms):
+        """
+        Place rooms one after the other, largest first, without overlaps
+
+        Args:
+            rooms: Rooms to place
         """
         # Sort rooms by area (largest first) for processing order
-        sorted_rooms = sorted(self.floor_plan.rooms,
+        sorted_rooms = sorted(rooms,
                               key=lambda r: r.width * r.height,
                               reverse=True)
 
-        # Keep track of placed rooms
-        placed_rooms = []
+        # Spatial index of the rooms placed so far
+        placed_rooms = SpatialIndex(SpatialIndex.suggest_cell_size(sorted_rooms))
+        self._placed_bottom = 0
+        self._placing_in_bulk = True
+        unplaced = []
 
         for room in sorted_rooms:
-            # Check if this room intersects with any already placed room
-            while self._has_intersection(room, placed_rooms):
-                # Resolve the intersection by moving the room
-                self._resolve_intersection(room, placed_rooms)
+            if not self._place_room(room, placed_rooms):
+                unplaced.append(room)
+
+            # Add to placed rooms
+            placed_rooms.insert(room, 'rooms')
+            if self._free_space is not None:
+                self._block_room(self._free_space, room)
+            self._placed_bottom = max(self._placed_bottom, room.y + room.height)
+            self.floor_plan.update_element(room)
+
+        self._placing_in_bulk = False
+        self._free_space = None
+        self._report_unplaced(unplaced)
+
+    def _worker_count(self):
+        """
+        Get the number of processes used to lay out clusters of rooms
+
+        Returns:
+            max_workers, or the CPU count if it is None
+        """
+        return self.max_workers if self.max_workers is not None else (os.cpu_count() or 1)
+
+    def _room_clusters(self, rooms):
+        """
+        Partition rooms into clusters that cannot push each other
+
+        Rooms whose bounding boxes, grown by the room gap, touch are joined
+        with a union-find; rooms of different clusters never overlap, so
+        placing one cluster never moves a room of another.
+
+        Args:
+            rooms: Rooms of the floor plan
+
+        Returns:
+            (clusters, index): list of room lists, each in the order of
+            `rooms` and ordered by their first room, and the SpatialIndex of
+            the rooms used to find them
+        """
+        gap = self.room_gap
+        index = SpatialIndex(SpatialIndex.suggest_cell_size(rooms))
+        for room in rooms:
+            index.insert(room, 'rooms')
+        rows = {id(room): row for row, room in enumerate(rooms)}
+
+        parent = list(range(len(rooms)))
+
+        def find(row):
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        for row, room in enumerate(rooms):
+            x, y, right, bottom = element_bounds(room)
+            for other in index.query_rect(x - gap, y - gap, right + gap, bottom + gap, kind='rooms'):
+                first, second = find(row), find(rows[id(other)])
+                if first != second:
+                    # The smaller row becomes the root, so clusters do not
+                    # depend on the order the pairs are found in
+                    parent[max(first, second)] = min(first, second)
+
+        clusters = {}
+        for row, room in enumerate(rooms):
+            clusters.setdefault(find(row), []).append(room)
+        return list(clusters.values()), index
+
+    def _layout_clusters(self, clusters, index):
+        """
+        Lay out clusters of rooms in a process pool and merge the results
+
+        Each worker places detached copies of its clusters' rooms with the
+        serial algorithm and returns their positions, which are applied in
+        cluster order, so the result does not depend on scheduling. Pushes
+        can still carry a room into another cluster: clusters that end up
+        overlapping are merged, put back where they started and laid out
+        again, until no cluster overlaps another.
+
+        Args:
+            clusters: Clusters returned by _room_clusters()
+            index: SpatialIndex of the rooms at their original positions
+
+        Returns:
+            True if the rooms were placed, False if the process pool is not
+            available (the rooms are then unchanged)
+        """
+        settings = {
+            'max_width': self.max_width,
+            'max_height': self.max_height,
+            'max_push_iterations': self.max_push_iterations,
+            'room_gap': self.room_gap,
+        }
+        clusters = list(clusters)
+        rows = {id(room): row for row, room in enumerate(self.floor_plan.rooms)}
+        origins = {id(room): (room.x, room.y) for cluster in clusters for room in cluster}
+        cluster_of = {id(room): number for number, cluster in enumerate(clusters) for room in cluster}
+
+        pending = list(range(len(clusters)))
+        try:
+            with ProcessPoolExecutor(max_workers=self._worker_count()) as pool:
+                while pending:
+                    positions = self._run_cluster_batches(pool, [clusters[number] for number in pending], settings)
+                    moved = []
+                    for number, cluster_positions in zip(pending, positions):
+                        for room, position in zip(clusters[number], cluster_positions):
+                            if self._move_room(room, position, index):
+                                moved.append(room)
+                    pending = self._merge_overlapping_clusters(clusters, cluster_of, moved, index, rows, origins)
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Parallel layout unavailable, placing rooms serially: {e}")
+            for cluster in clusters:
+                for room in cluster:
+                    self._move_room(room, origins[id(room)], index)
+            return False
+        return True
+
+    def _run_cluster_batches(self, pool, clusters, settings):
+        """
+        Lay out clusters in a process pool, in batches of similar size
+
+        Args:
+            pool: ProcessPoolExecutor
+            clusters: List of room lists
+            settings: LayoutManager attributes the workers copy
+
+        Returns:
+            List with, per cluster, the (x, y) position of each of its rooms
+        """
+        # Largest clusters first, each into the batch with the fewest rooms
+        batches = [[] for _ in range(min(len(clusters), 4 * self._worker_count()))]
+        loads = [0] * len(batches)
+        for number in sorted(range(len(clusters)), key=lambda n: -len(clusters[n])):
+            lightest = loads.index(min(loads))
+            batches[lightest].append(number)
+            loads[lightest] += len(clusters[number])
+
+        results = pool.map(_layout_cluster_batch, [self.grid] * len(batches), [settings] * len(batches),
+                           [[clusters[number] for number in batch] for batch in batches])
+
+        positions = [None] * len(clusters)
+        for batch, batch_positions in zip(batches, results):
+            for number, cluster_positions in zip(batch, batch_positions):
+                positions[number] = cluster_positions
+        return positions
+
+    def _move_room(self, room, position, index):
+        """
+        Move a room and keep the spatial indexes up to date
+
+        Args:
+            room: Room to move
+            position: New (x, y) position
+            index: SpatialIndex of the rooms
+
+        Returns:
+            True if the room moved
+        """
+        x, y = position
+        if x == room.x and y == room.y:
+            return False
+        room.x, room.y = x, y
+        index.update(room)
+        self.floor_plan.update_element(room)
+        return True
+
+    def _merge_overlapping_clusters(self, clusters, cluster_of, moved, index, rows, origins):
+        """
+        Merge the clusters whose rooms overlap after a parallel layout
+
+        The rooms of merged clusters go back to their original position, in
+        the lowest-numbered cluster of the group, in floor plan order.
+
+        Args:
+            clusters: List of room lists, updated in place
+            cluster_of: Dictionary of id(room) -> cluster number, updated in place
+            moved: Rooms moved by the last layout round
+            index: SpatialIndex of the rooms
+            rows: Dictionary of id(room) -> position in the floor plan
+            origins: Dictionary of id(room) -> original (x, y) position
+
+        Returns:
+            Sorted numbers of the merged clusters, to lay out again
+        """
+        parent = {}
+
+        def find(number):
+            while parent.get(number, number) != number:
+                number = parent[number]
+            return number
+
+        for room in moved:
+            for other in self._find_intersections(room, index):
+                first, second = find(cluster_of[id(room)]), find(cluster_of[id(other)])
+                if first != second:
+                    parent[max(first, second)] = min(first, second)
 
+        groups = {}
+        for number in parent:
+            groups.setdefault(find(number), set()).update((number, find(number)))
+
+        for root, numbers in groups.items():
+            rooms = sorted((room for number in numbers for room in clusters[number]), key=lambda r: rows[id(r)])
+            for number in numbers:
+                clusters[number] = []
+            clusters[root] = rooms
+            for room in rooms:
+                cluster_of[id(room)] = root
+                self._move_room(room, origins[id(room)], index)
+        return sorted(groups)
+
+    def _place_room(self, room, placed_rooms):
+        """
+        Move a room until it no longer overlaps the placed rooms
+
+        The room is pushed out of the first room it overlaps, one push per
+        broad-phase query. Pushing stops after `max_push_iterations` or as
+        soon as the room comes back to a position it already had (pushes
+        bouncing between neighbours); the room is then moved to the closest
+        free position instead. The pushes run on layout units and only the
+        final position is written to the room.
+
+        Args:
+            room: Room to place
+            placed_rooms: SpatialIndex of already placed rooms
+
+        Returns:
+            True if the room is inside the plan, False if no free space was
+            left for it and it went below the plan
+        """
+        origin = x, y = self._steps(room.x), self._steps(room.y)
+        visited = set()
+        for _ in range(self.max_push_iterations):
             # Make sure room is within floor plan boundaries
-            self._ensure_within_boundaries(room)
+            x, y = self._within_boundaries(room, x, y)
 
-            # Add to placed rooms
-            placed_rooms.append(room)
+            overlapping = self._find_intersections(room, placed_rooms, self._coordinate(x), self._coordinate(y))
+            if not overlapping:
+                room.x, room.y = self._coordinate(x), self._coordinate(y)
+                return True
 
-    def _has_intersection(self, room, other_rooms):
+            if (x, y) in visited:
+                break
+            visited.add((x, y))
+
+            # Resolve the intersection by moving the room
+            x, y = self._push_out(room, overlapping, x, y)
+
+        return self._move_to_free_space(room, placed_rooms, origin)
+
+    def _find_intersections(self, room, placed_rooms, x=None, y=None):
         """
-        Check if a room intersects with any other room
+        Find the placed rooms that overlap a room
 
         Args:
             room: The room to check
-            other_rooms: List of other rooms to check against
+            placed_rooms: SpatialIndex of already placed rooms
+            x, y: Position to test the room at (its current one by default)
 
         Returns:
-            True if there's an intersection, False otherwise
+            List of overlapping rooms in placement order
         """
-        for other in other_rooms:
-            # Check if rooms overlap
-            if (room.x < other.x + other.width and
-                    room.x + room.width > other.x and
-                    room.y < other.y + other.height and
-                    room.y + room.height > other.y):
-                return True
+        x = room.x if x is None else x
+        y = room.y if y is None else y
+        if self.grid is None:
+            candidates = placed_rooms.query_rect(x, y, x + room.width, y + room.height,
+                                                 kind='rooms', include_touching=False)
+        else:
+            # Sums of float grid coordinates are inexact (0.1 + 0.2 > 0.3), so
+            # rooms that only touch can overlap in plan units: the index only
+            # narrows the search, the overlap test compares grid steps
+            min_x, min_y = self._steps(x), self._steps(y)
+            max_x, max_y = min_x + self._steps(room.width), min_y + self._steps(room.height)
+            candidates = []
+            for other in placed_rooms.query_rect(x, y, x + room.width, y + room.height, kind='rooms'):
+                other_x, other_y, other_right, other_bottom = self._bounds(other)
+                if other_x < max_x and other_right > min_x and other_y < max_y and other_bottom > min_y:
+                    candidates.append(other)
 
-        return False
+        # Bounding boxes of polygon rooms overlap more often than the rooms do
+        return [other for other in candidates
+                if not (room.points or other.points) or
+                room.polygon.overlaps(other.polygon, other.x - x, other.y - y)]
 
-    def _resolve_intersection(self, room, other_rooms):
+    def _push_out(self, room, overlapping, x, y):
         """
-        Resolve room intersection by moving the room
+        Get the position that moves a room out of the rooms it overlaps
+
+        The direction is the one needing the least movement out of the first
+        overlapping room; the room is then moved past every overlapping room
+        in that direction, so one push clears the whole cluster.
 
         Args:
             room: Room to move
-            other_rooms: List of placed rooms
-        """
-        # Find the room that this room intersects with
-        for other in other_rooms:
-            # Check if rooms overlap
-            if (room.x < other.x + other.width and
-                    room.x + room.width > other.x and
-                    room.y < other.y + other.height and
-                    room.y + room.height > other.y):
-
-                # Calculate overlap in both directions
-                overlap_x = min(room.x + room.width, other.x + other.width) - max(room.x, other.x)
-                overlap_y = min(room.y + room.height, other.y + other.height) - max(room.y, other.y)
-
-                # Determine which direction requires less movement
-                if overlap_x < overlap_y:
-                    # Move horizontally
-                    if room.x < other.x:
-                        # Move left
-                        room.x = other.x - room.width - 1  # 1px gap
-                    else:
-                        # Move right
-                        room.x = other.x + other.width + 1  # 1px gap
-                else:
-                    # Move vertically
-                    if room.y < other.y:
-                        # Move up
-                        room.y = other.y - room.height - 1  # 1px gap
-                    else:
-                        # Move down
-                        room.y = other.y + other.height + 1  # 1px gap
-
-                # Only resolve one intersection at a time
-                break
+            overlapping: Placed rooms it overlaps, in placement order
+            x, y: Position of the room in layout units
+
+        Returns:
+            New (x, y) position in layout units
+        """
+        width, height = self._steps(room.width), self._steps(room.height)
+        right, bottom = x + width, y + height
+        other_x, other_y, other_right, other_bottom = self._bounds(overlapping[0])
+        gap = self._steps(self.room_gap)
+        others = [self._bounds(other) for other in overlapping]
+
+        # Calculate overlap in both directions
+        overlap_x = min(right, other_right) - max(x, other_x)
+        overlap_y = min(bottom, other_bottom) - max(y, other_y)
+
+        # Determine which direction requires less movement
+        if overlap_x < overlap_y:
+            # Move horizontally
+            if x < other_x:
+                # Move left
+                return min(bounds[0] for bounds in others) - width - gap, y
+            # Move right
+            return max(bounds[2] for bounds in others) + gap, y
+
+        # Move vertically
+        if y < other_y:
+            # Move up
+            return x, min(bounds[1] for bounds in others) - height - gap
+        # Move down
+        return x, max(bounds[3] for bounds in others) + gap
+
+    def _move_to_free_space(self, room, placed_rooms, origin):
+        """
+        Move a room to the free position closest to where it started
+
+        Free space is looked up in an OccupancyGrid of the placed rooms, each
+        grown by the room gap, so a search only looks at the cells around the
+        origin (see OccupancyGrid.nearest_free()) and its cost does not grow
+        with the number of rooms. Positions are cell corners and rooms count
+        as their bounding boxes. During a bulk placement the grid is kept and
+        each placed room is added to it; otherwise it is built from the index
+        for this search.
+
+        If the room fits nowhere in the plan it goes below all placed rooms,
+        which is always free, and the caller reports it.
+
+        Args:
+            room: Room to move
+            placed_rooms: SpatialIndex of already placed rooms
+            origin: (x, y) position of the room before it was pushed, in
+                layout units
+
+        Returns:
+            True if the room was moved to free space inside the plan
+        """
+        free_space = self._free_space
+        if free_space is None:
+            free_space = self._occupancy(placed_rooms)
+            if self._placing_in_bulk:
+                self._free_space = free_space
+
+        origin_x, origin_y = origin
+        width, height = self._steps(room.width), self._steps(room.height)
+        position = free_space.nearest_free(width, height, origin_x, origin_y)
+        if position is not None:
+            room.x, room.y = self._coordinate(position[0]), self._coordinate(position[1])
+            return True
+
+        # No free position inside the plan: stack the room below everything
+        if self._placed_bottom is None:
+            self._placed_bottom = max(other.y + other.height for other in self.floor_plan.rooms)
+        max_x = self._steps(self.max_width) - width
+        room.x = self._coordinate(min(max(origin_x, 0), max(0, max_x)))
+        room.y = self._coordinate(self._steps(self._placed_bottom) + self._steps(self.room_gap))
+        return False
+
+    def _occupancy(self, placed_rooms):
+        """
+        Build the OccupancyGrid of the placed rooms inside the plan
+
+        Cells are a power of two of layout units, about an eighth of the
+        smallest room side, or larger to keep the grid within a few million
+        cells (whole steps in integer geometry mode).
+
+        Args:
+            placed_rooms: SpatialIndex of already placed rooms
+
+        Returns:
+            OccupancyGrid in layout units
+        """
+        width, height = self._steps(self.max_width), self._steps(self.max_height)
+        extents = [min(self._steps(room.width), self._steps(room.height)) for room in self.floor_plan.rooms]
+        cell_size = OccupancyGrid.suggest_cell_size(min((e for e in extents if e > 0), default=1), width, height)
+        if self.grid is not None:
+            cell_size = max(1, int(cell_size))
+
+        free_space = OccupancyGrid(width, height, cell_size)
+        for room in placed_rooms.query_rect(0, 0, self.max_width, self.max_height, kind='rooms'):
+            self._block_room(free_space, room)
+        return free_space
+
+    def _block_room(self, free_space, room):
+        """
+        Mark a placed room, grown by the room gap, as taken
+
+        Args:
+            free_space: OccupancyGrid in layout units
+            room: Placed room
+        """
+        gap = self._steps(self.room_gap)
+        min_x, min_y, max_x, max_y = self._bounds(room)
+        free_space.block(min_x - gap, min_y - gap, max_x + gap, max_y + gap)
+
+    def _report_unplaced(self, rooms):
+        """
+        Warn about the rooms that found no free space inside the plan
+
+        Args:
+            rooms: Rooms that were placed below the plan
+        """
+        if not rooms:
+            return
+        names = ", ".join(str(room.id) for room in rooms[:10])
+        if len(rooms) > 10:
+            names += f" and {len(rooms) - 10} more"
+        print(f"Warning: {len(rooms)} room(s) do not fit inside the {self.max_width}x{self.max_height} plan "
+              f"without overlapping and were placed below it: {names}")
+
+    def _steps(self, value):
+        """
+        Convert a length to the units the layout math runs on
+
+        Args:
+            value: Length in plan units
+
+        Returns:
+            Int grid steps in integer geometry mode, the value itself otherwise
+        """
+        return self.grid.to_int(value) if self.grid is not None else value
+
+    def _coordinate(self, steps):
+        """
+        Convert a result of the layout math back to plan units
+
+        Args:
+            steps: Value returned by _steps() arithmetic
+
+        Returns:
+            Coordinate in plan units
+        """
+        return self.grid.from_int(steps) if self.grid is not None else steps
+
+    def _decimal_places(self, values, max_places=6):
+        """
+        Get the resolution of some float plan values
+
+        Args:
+            values: Lengths and coordinates in plan units
+            max_places: Largest number of decimal places to report
+
+        Returns:
+            The fewest decimal places that write every value exactly, at most
+            max_places
+        """
+        values = np.asarray(values, dtype=float)
+        for places in range(max_places):
+            scaled = values * 10 ** places
+            if np.all(np.abs(scaled - np.rint(scaled)) <= 1e-9 * np.maximum(1.0, np.abs(scaled))):
+                return places
+        return max_places
+
+    def _bounds(self, element):
+        """
+        Get the bounding box of an element in layout units
+
+        Args:
+            element: Element with x, y, width and height
+
+        Returns:
+            (min_x, min_y, max_x, max_y) tuple
+        """
+        x, y = self._steps(element.x), self._steps(element.y)
+        return x, y, x + self._steps(element.width), y + self._steps(element.height)
 
     def _ensure_within_boundaries(self, room):
         """
@@ -151,184 +1012,551 @@ class LayoutManager:
         Args:
             room: Room to check
         """
+        x, y = self._within_boundaries(room, self._steps(room.x), self._steps(room.y))
+        room.x, room.y = self._coordinate(x), self._coordinate(y)
+
+    def _within_boundaries(self, room, x, y):
+        """
+        Get the position closest to a given one that keeps a room within the
+        floor plan boundaries
+
+        Args:
+            room: Room to place
+            x, y: Position in layout units
+
+        Returns:
+            (x, y) position in layout units
+        """
         # Check and adjust x coordinate
-        if room.x < 0:
-            room.x = 0
-        elif room.x + room.width > self.max_width:
-            room.x = max(0, self.max_width - room.width)
+        max_x = self._steps(self.max_width) - self._steps(room.width)
+        if x < 0:
+            x = 0
+        elif x > max_x:
+            x = max(0, max_x)
 
         # Check and adjust y coordinate
-        if room.y < 0:
-            room.y = 0
-        elif room.y + room.height > self.max_height:
-            room.y = max(0, self.max_height - room.height)
+        max_y = self._steps(self.max_height) - self._steps(room.height)
+        if y < 0:
+            y = 0
+        elif y > max_y:
+            y = max(0, max_y)
+        return x, y
 
     def _place_windows_on_walls(self):
         """
         Place each window on a wall of the closest room
         """
-        for window in self.floor_plan.windows:
-            self._place_window_on_wall(window)
+        self._place_openings_on_walls('windows')
 
-    def _place_window_on_wall(self, window):
+    def _place_doors_on_walls(self):
         """
-        Place a window on a wall of the closest room
+        Place each door on a wall of the closest room
+        """
+        self._place_openings_on_walls('doors')
+
+    def _place_openings_on_walls(self, kind):
+        """
+        Place all doors or all windows on their walls at once
 
         Args:
-            window: Window object to place
+            kind: 'doors' or 'windows'
         """
-        # Find closest room to the window
-        closest_room = None
-        min_distance = float('inf')
+        self._place_openings(getattr(self.floor_plan, kind), kind == 'doors')
 
-        window_center_x = window.x + window.width / 2
-        window_center_y = window.y + window.height / 2
+    def _place_openings(self, elements, is_door):
+        """
+        Place a group of doors or windows on their walls
+
+        Openings anchored with `wall_id` are placed on that wall at
+        `distance_wall` from its start. The others go on a wall of their
+        closest room: the geometry of these openings and of the rooms is read
+        into arrays, so the closest room, closest wall and clamping of every
+        opening are array operations. Only the openings that moved are
+        written back.
 
+        Args:
+            elements: Doors or windows of the floor plan (all of one kind, or
+                a list of some of them)
+            is_door: Whether the openings are doors
+        """
+        if not len(elements):
+            return
+
+        openings = self._geometry_columns(elements)
+        directions = {}
+
+        if is_door:
+            # Ensure doors have valid dimensions
+            width, height = openings['width'], openings['height']
+            door_width = np.where(width > 0, np.maximum(width, self.min_door_width), self.min_door_width)
+            door_height = np.where(height > 0, np.maximum(height, self.min_door_height), self.min_door_height)
+            resized = np.flatnonzero((door_width != width) | (door_height != height))
+            self._write_openings(elements, openings, resized, {
+                'width': door_width[resized].tolist(), 'height': door_height[resized].tolist()})
+
+        anchored = self._place_anchored_openings(elements, openings, directions if is_door else None)
+
+        free = np.flatnonzero(~anchored)
+        if len(free) and len(self.floor_plan.rooms):
+            rooms = self._nearest_rooms(openings['x'][free] + openings['width'][free] / 2,
+                                        openings['y'][free] + openings['height'][free] / 2)
+
+            x, y = self._step_array(openings['x'][free]), self._step_array(openings['y'][free])
+            width, height = self._step_array(openings['width'][free]), self._step_array(openings['height'][free])
+            room_x, room_y = self._step_array(rooms['x']), self._step_array(rooms['y'])
+            room_right = room_x + self._step_array(rooms['width'])
+            room_bottom = room_y + self._step_array(rooms['height'])
+            thickness = self._steps(self.wall_thickness)
+
+            # Closest wall to twice the center (exact ints in integer geometry
+            # mode); ties go to the first wall, in left/right/top/bottom order
+            center_x2, center_y2 = 2 * x + width, 2 * y + height
+            wall = np.argmin(np.stack([
+                np.abs(center_x2 - 2 * room_x),
+                np.abs(center_x2 - 2 * room_right),
+                np.abs(center_y2 - 2 * room_y),
+                np.abs(center_y2 - 2 * room_bottom),
+            ]), axis=0)
+
+            # Flush against the wall, clamped along it to stay within the room
+            clamped_x = np.minimum(np.maximum(x, room_x + thickness), room_right - width - thickness)
+            clamped_y = np.minimum(np.maximum(y, room_y + thickness), room_bottom - height - thickness)
+            new_x = np.select([wall == 0, wall == 1], [room_x, room_right - width], clamped_x)
+            new_y = np.select([wall == 2, wall == 3], [room_y, room_bottom - height], clamped_y)
+
+            moved = np.flatnonzero((new_x != x) | (new_y != y))
+            self._write_openings(elements, openings, free[moved], {
+                'x': self._coordinate_array(new_x[moved]), 'y': self._coordinate_array(new_y[moved])})
+
+            # Doors open away from the wall they are on
+            if is_door:
+                names = ('right', 'left', 'down', 'up')
+                directions.update(zip(free.tolist(), (names[index] for index in wall.tolist())))
+
+        if directions:
+            self._write_directions(elements, directions)
+
+    def _wall_table(self):
+        """
+        Index the walls of the floor plan and of its rooms by ID
+
+        Returns:
+            Dictionary of wall ID -> Wall
+        """
+        walls = {}
         for room in self.floor_plan.rooms:
-            # Calculate room center
-            room_center_x = room.x + room.width / 2
-            room_center_y = room.y + room.height / 2
-
-            # Calculate distance between centers
-            distance = math.sqrt((room_center_x - window_center_x) ** 2 +
-                                 (room_center_y - window_center_y) ** 2)
-
-            if distance < min_distance:
-                min_distance = distance
-                closest_room = room
-
-        if not closest_room:
-            return  # No rooms to place window on
-
-        # Calculate distances to each wall
-        dist_to_left = abs(window_center_x - closest_room.x)
-        dist_to_right = abs(window_center_x - (closest_room.x + closest_room.width))
-        dist_to_top = abs(window_center_y - closest_room.y)
-        dist_to_bottom = abs(window_center_y - (closest_room.y + closest_room.height))
-
-        # Find the closest wall
-        min_dist = min(dist_to_left, dist_to_right, dist_to_top, dist_to_bottom)
-
-        # Simple offset for visibility
-        offset = 0  # Place directly on the wall
-
-        # Bounds for the other coordinate to keep window within room limits
-        min_x = closest_room.x + self.wall_thickness
-        max_x = closest_room.x + closest_room.width - window.width - self.wall_thickness
-        min_y = closest_room.y + self.wall_thickness
-        max_y = closest_room.y + closest_room.height - window.height - self.wall_thickness
-
-        if min_dist == dist_to_left:
-            # Left wall
-            window.x = closest_room.x + offset
-            # Keep y coordinate within room bounds
-            window.y = min(max(window.y, min_y), max_y)
-        elif min_dist == dist_to_right:
-            # Right wall
-            window.x = closest_room.x + closest_room.width - window.width - offset
-            # Keep y coordinate within room bounds
-            window.y = min(max(window.y, min_y), max_y)
-        elif min_dist == dist_to_top:
-            # Top wall
-            window.y = closest_room.y + offset
-            # Keep x coordinate within room bounds
-            window.x = min(max(window.x, min_x), max_x)
-        elif min_dist == dist_to_bottom:
-            # Bottom wall
-            window.y = closest_room.y + closest_room.height - window.height - offset
-            # Keep x coordinate within room bounds
-            window.x = min(max(window.x, min_x), max_x)
+            for wall in getattr(room, 'walls', None) or ():
+                if wall.id:
+                    walls[wall.id] = wall
+        for wall in self.floor_plan.walls:
+            if wall.id:
+                walls[wall.id] = wall
+        return walls
 
-    def _place_doors_on_walls(self):
+    def _place_anchored_openings(self, elements, openings, directions=None):
         """
-        Place each door on a wall of the closest room
+        Place the openings anchored to a wall by `wall_id`
+
+        An opening starts `distance_wall` along its wall and runs along it for
+        its longer side, centered on the wall line. Resolving the wall is a
+        dictionary lookup, so the pass needs no geometric search.
+
+        Args:
+            elements: Doors or windows of the floor plan
+            openings: Geometry arrays of the same elements
+            directions: Optional dictionary filled with row -> door direction
+
+        Returns:
+            Boolean array marking the anchored rows
+        """
+        anchored = np.zeros(len(elements), dtype=bool)
+        if isinstance(elements, ElementColumns):
+            candidates = np.flatnonzero(elements.column('wall_id') >= 0).tolist()
+        else:
+            candidates = [row for row, element in enumerate(elements) if element.wall_id]
+        if not candidates:
+            return anchored
+
+        walls = self._wall_table()
+
+        rows = []
+        values = {'x': [], 'y': [], 'width': [], 'height': []}
+        for row in candidates:
+            element = elements[row]
+            wall = walls.get(element.wall_id)
+            if wall is None or wall.length == 0:
+                continue
+            anchored[row] = True
+
+            width, height = float(openings['width'][row]), float(openings['height'][row])
+            along, across = max(width, height), min(width, height)
+            start_x, start_y = wall.point_at_distance(element.distance_wall)
+            end_x, end_y = wall.point_at_distance(element.distance_wall + along)
+            center_x, center_y = (start_x + end_x) / 2, (start_y + end_y) / 2
+
+            angle = math.radians(wall.angle)
+            horizontal = abs(math.cos(angle)) >= abs(math.sin(angle))
+            if horizontal:
+                width, height = along, across
+            else:
+                width, height = across, along
+            placed = {'x': center_x - width / 2, 'y': center_y - height / 2, 'width': width, 'height': height}
+
+            if any(placed[name] != openings[name][row] for name in placed):
+                rows.append(row)
+                for name, value in placed.items():
+                    values[name].append(self._coordinate(self._steps(value)))
+
+            if directions is not None:
+                directions[row] = self._anchored_direction(element, wall, horizontal, center_x, center_y)
+
+        self._write_openings(elements, openings, np.array(rows, dtype=np.intp), values)
+        return anchored
+
+    def _anchored_direction(self, door, wall, horizontal, x, y):
+        """
+        Get the direction of a door anchored to a wall
+
+        The door opens into the room the wall belongs to; without such a room
+        a direction along the right axis is kept.
+
+        Args:
+            door: Door object
+            wall: Wall the door is on
+            horizontal: Whether the wall runs horizontally
+            x: X coordinate of the door center
+            y: Y coordinate of the door center
+
+        Returns:
+            'left', 'right', 'up' or 'down'
         """
-        for door in self.floor_plan.doors:
-            self._place_door_on_wall(door)
+        room = None
+        for parent_id in (wall.parent_id, door.parent_id):
+            parent = self.floor_plan.get_element_by_id(parent_id) if parent_id else None
+            if isinstance(parent, Room):
+                room = parent
+                break
+
+        if horizontal:
+            if room is not None:
+                return 'down' if room.y + room.height / 2 >= y else 'up'
+            return door.direction if door.direction in ('up', 'down') else 'down'
+        if room is not None:
+            return 'right' if room.x + room.width / 2 >= x else 'left'
+        return door.direction if door.direction in ('left', 'right') else 'right'
 
-    def _place_door_on_wall(self, door):
+    def _write_directions(self, elements, directions):
         """
-        Place a door on a wall of the closest room
+        Write new directions into some doors
 
         Args:
-            door: Door object to place
+            elements: Doors of the floor plan
+            directions: Dictionary of row -> direction
         """
-        # Find closest room to the door
-        closest_room = None
-        min_distance = float('inf')
+        if isinstance(elements, ElementColumns):
+            column = elements.column('direction')
+            for row, direction in directions.items():
+                column[row] = elements.strings.intern(direction)
+            return
 
-        # Ensure door has valid dimensions
-        door_width = max(door.width, self.min_door_width) if door.width > 0 else self.min_door_width
-        door_height = max(door.height, self.min_door_height) if door.height > 0 else self.min_door_height
+        for row, direction in directions.items():
+            door = elements[row]
+            if door.direction != direction:
+                door.direction = direction
 
-        # Update door dimensions if needed
-        if door.width != door_width:
-            door.width = door_width
-        if door.height != door_height:
-            door.height = door_height
+    def _nearest_rooms(self, x, y):
+        """
+        Find the room whose bounding-box center is closest to each point
 
-        door_center_x = door.x + door.width / 2
-        door_center_y = door.y + door.height / 2
+        A few points are looked up in the spatial index of the floor plan, like
+        FloorPlan.nearest(). Many points are looked up together in a
+        PointGrid of the room centers, a batch of points at a time.
+
+        Args:
+            x: Array of point x coordinates
+            y: Array of point y coordinates
+
+        Returns:
+            Geometry arrays of the closest room of every point (the first
+            room on ties)
+        """
+        if len(x) <= self.max_indexed_openings:
+            nearest = [self.floor_plan.nearest(px, py, kind='rooms')[0] for px, py in zip(x.tolist(), y.tolist())]
+            return self._geometry_columns(nearest)
+
+        rooms = self._geometry_columns(self.floor_plan.rooms)
+        room_x = (rooms['x'] + (rooms['x'] + rooms['width'])) / 2
+        room_y = (rooms['y'] + (rooms['y'] + rooms['height'])) / 2
+        index = PointGrid(room_x, room_y).nearest(x, y, batch_size=self.distance_batch_size)
+        return {name: column[index] for name, column in rooms.items()}
+
+    def _geometry_columns(self, elements):
+        """
+        Get the x, y, width and height of some elements as arrays
+
+        Args:
+            elements: List of elements or ElementColumns
+
+        Returns:
+            Dictionary of field -> float array (views of the columns of
+            column-backed elements, so writing them moves the elements)
+        """
+        fields = ('x', 'y', 'width', 'height')
+        if isinstance(elements, ElementColumns):
+            return {name: elements.column(name) for name in fields}
+        return {name: np.fromiter((getattr(element, name) for element in elements),
+                                  dtype=float, count=len(elements))
+                for name in fields}
+
+    def _step_array(self, values):
+        """
+        Array version of _steps()
+
+        Args:
+            values: Array of lengths in plan units
+
+        Returns:
+            Int64 array of grid steps in integer geometry mode, the values otherwise
+        """
+        if self.grid is None:
+            return values
+        return np.rint(values * self.grid.resolution).astype(np.int64)
+
+    def _coordinate_array(self, steps):
+        """
+        Array version of _coordinate()
+
+        Args:
+            steps: Array returned by _step_array() arithmetic
+
+        Returns:
+            List of coordinates in plan units
+        """
+        if self.grid is None:
+            return steps.tolist()
+        return [self.grid.from_int(value) for value in steps.tolist()]
+
+    def _write_openings(self, elements, openings, rows, values):
+        """
+        Write new geometry into some doors or windows
+
+        Args:
+            elements: Doors or windows of the floor plan
+            openings: Geometry arrays of the same elements
+            rows: Array of the row indices to write
+            values: Dictionary of attribute -> list of values, one per row
+        """
+        if not len(rows):
+            return
+
+        for name, column in values.items():
+            openings[name][rows] = column
+
+        # Many elements move at once, so rebuilding is cheaper than updating
+        if isinstance(elements, ElementColumns) or len(rows) > self.max_indexed_openings:
+            self.floor_plan.spatial_index = None
+            if isinstance(elements, ElementColumns):
+                return
+
+        self.floor_plan.update_elements([elements[row] for row in rows.tolist()], values)
+
+    def _place_furniture(self):
+        """
+        Pack the furniture marked for automatic placement into its parent room
+
+        Each room is packed on its own, around the swing of its doors and the
+        furniture placed by hand, so rooms with much to furnish are packed in
+        parallel processes. Items that do not fit are put in the top-left
+        corner of their room with a warning.
+        """
+        furniture = self.floor_plan.furniture
+        if isinstance(furniture, ElementColumns):
+            # Furniture stored in columns has no auto_place flag
+            return
+
+        items_by_room = {}
+        for item in furniture:
+            if getattr(item, 'auto_place', False):
+                items_by_room.setdefault(item.parent_id, []).append(item)
+        if not items_by_room:
+            return
+
+        index = self.floor_plan.get_spatial_index()
+        rooms, room_items, problems = [], [], []
+        for room_id, items in items_by_room.items():
+            room = self.floor_plan.get_element_by_id(room_id)
+            if not isinstance(room, Room):
+                print(f"Warning: Cannot place furniture {[item.id for item in items]} in unknown room {room_id!r}")
+                continue
+            rooms.append(room)
+            room_items.append(items)
+            problems.append(self._packing_problem(room, items, index))
+
+        for room, items, problem, result in zip(rooms, room_items, problems, self._pack_rooms(problems)):
+            self._write_packing(room, items, problem, result)
+
+    def _packing_problem(self, room, items, index):
+        """
+        Describe the packing of some furniture into a room
+
+        The swing of a door is kept clear on both sides of its wall (the side
+        it opens to depends on how it is drawn): the door widened by its leaf
+        length in every direction. Furniture also keeps clear of the half of
+        the walls that lies inside the room (half of wall_thickness).
+
+        Args:
+            room: Room to furnish
+            items: Furniture to pack
+            index: SpatialIndex of the floor plan
+
+        Returns:
+            PackingProblem in layout units, relative to the room
+        """
+        min_x, min_y, max_x, max_y = self._bounds(room)
+        width, height = max_x - min_x, max_y - min_y
+
+        obstacles = []
+        for door in index.query_rect(room.x, room.y, room.x + room.width, room.y + room.height, kind='doors'):
+            door_min_x, door_min_y, door_max_x, door_max_y = self._bounds(door)
+            leaf = max(door_max_x - door_min_x, door_max_y - door_min_y)
+            obstacles.append((door_min_x - leaf - min_x, door_min_y - leaf - min_y,
+                              door_max_x + leaf - min_x, door_max_y + leaf - min_y))
+
+        for other in index.query_rect(room.x, room.y, room.x + room.width, room.y + room.height,
+                                      kind='furniture', include_touching=False):
+            if getattr(other, 'auto_place', False):
+                continue
+            other_width, other_height, _ = self._footprint(other)
+            other_x = self._steps(other.x) + self._half(self._steps(other.width) - other_width)
+            other_y = self._steps(other.y) + self._half(self._steps(other.height) - other_height)
+            obstacles.append((other_x - min_x, other_y - min_y,
+                              other_x + other_width - min_x, other_y + other_height - min_y))
+
+        footprints = [self._footprint(item) for item in items]
+        outline = tuple((self._steps(x), self._steps(y)) for x, y in room.points) if room.points else None
+        return PackingProblem(
+            width=width,
+            height=height,
+            outline=outline,
+            obstacles=obstacles,
+            widths=[footprint[0] for footprint in footprints],
+            heights=[footprint[1] for footprint in footprints],
+            rotatable=[footprint[2] for footprint in footprints],
+            clearance=self._half(self._steps(self.wall_thickness)),
+        )
+
+    def _footprint(self, item):
+        """
+        Get the axis-aligned box a furniture item covers, in layout units
+
+        Items are drawn rotated around their center. Quarter turns swap the
+        width and height and may be turned once more by the packer; other
+        angles cover their rotated bounding box. In integer geometry mode an
+        item whose width and height differ by an odd number of steps gets a
+        one-step larger footprint, so it can be centered on grid steps in
+        either orientation.
+
+        Args:
+            item: Furniture item
+
+        Returns:
+            (width, height, rotatable) tuple
+        """
+        width, height = self._steps(item.width), self._steps(item.height)
+        rotation = (item.rotation or 0) % 360
+        if rotation % 90 == 0:
+            padding = (width - height) % 2 if self.grid is not None else 0
+            if rotation % 180:
+                width, height = height, width
+            return width + padding, height + padding, True
+
+        angle = math.radians(rotation)
+        cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+        box_width, box_height = width * cos + height * sin, width * sin + height * cos
+        if self.grid is not None:
+            box_width, box_height = math.ceil(box_width), math.ceil(box_height)
+        return box_width, box_height, False
+
+    def _half(self, value):
+        """Halve a layout length, rounding down to whole steps in integer geometry mode"""
+        return value // 2 if self.grid is not None else value / 2
+
+    def _pack_rooms(self, problems):
+        """
+        Pack the furniture of several rooms, in a process pool if there are many
+
+        Args:
+            problems: List of PackingProblem
+
+        Returns:
+            List of PackingResult, one per problem
+        """
+        workers = self._worker_count()
+        if len(problems) >= self.parallel_min_furnished_rooms and workers > 1:
+            size = -(-len(problems) // (4 * workers))
+            chunks = [problems[start:start + size] for start in range(0, len(problems), size)]
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = pool.map(pack_rooms, chunks, [self.furniture_time_budget] * len(chunks))
+                    return [result for chunk in results for result in chunk]
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Parallel furniture packing unavailable, packing serially: {e}")
+
+        packer = FurniturePacker(self.furniture_time_budget)
+        return [packer.pack(problem) for problem in problems]
+
+    def _write_packing(self, room, items, problem, result):
+        """
+        Move packed furniture to its place in the room
+
+        Args:
+            room: Furnished room
+            items: Packed furniture
+            problem: PackingProblem of the room
+            result: PackingResult of the room
+        """
+        room_x, room_y = self._steps(room.x), self._steps(room.y)
+        unplaced = []
+        for row, item in enumerate(items):
+            position, turned = result.positions[row], result.turned[row]
+            if position is None:
+                unplaced.append(item.id)
+                position, turned = (0, 0), False
+            footprint_width, footprint_height = problem.widths[row], problem.heights[row]
+            if turned:
+                footprint_width, footprint_height = footprint_height, footprint_width
+                item.rotation = (item.rotation + 90) % 360
+
+            # The item is drawn around the center of its footprint
+            item.x = self._coordinate(room_x + position[0] + self._half(footprint_width - self._steps(item.width)))
+            item.y = self._coordinate(room_y + position[1] + self._half(footprint_height - self._steps(item.height)))
+
+        if unplaced:
+            print(f"Warning: Furniture {unplaced} does not fit in room {room.id!r}")
+
+
+def _layout_cluster_batch(grid, settings, clusters):
+    """
+    Lay out clusters of rooms in a worker process
+
+    Args:
+        grid: FixedPointGrid of the floor plan or None
+        settings: Dictionary of LayoutManager attributes to copy
+        clusters: List of clusters, each a list of detached room copies
+
+    Returns:
+        List with, per cluster, the (x, y) position of each of its rooms
+    """
+    positions = []
+    for rooms in clusters:
+        floor_plan = FloorPlan(grid=grid)
+        for room in rooms:
+            floor_plan.add_room(room)
+
+        manager = LayoutManager(floor_plan)
+        for name, value in settings.items():
+            setattr(manager, name, value)
+        manager._layout_rooms(rooms)
+        positions.append([(room.x, room.y) for room in rooms])
+    return positions
 
-        for room in self.floor_plan.rooms:
-            # Calculate room center
-            room_center_x = room.x + room.width / 2
-            room_center_y = room.y + room.height / 2
-
-            # Calculate distance between centers
-            distance = math.sqrt((room_center_x - door_center_x) ** 2 +
-                                 (room_center_y - door_center_y) ** 2)
-
-            if distance < min_distance:
-                min_distance = distance
-                closest_room = room
-
-        if not closest_room:
-            return  # No rooms to place door on
-
-        # Calculate distances to each wall
-        dist_to_left = abs(door_center_x - closest_room.x)
-        dist_to_right = abs(door_center_x - (closest_room.x + closest_room.width))
-        dist_to_top = abs(door_center_y - closest_room.y)
-        dist_to_bottom = abs(door_center_y - (closest_room.y + closest_room.height))
-
-        # Find the closest wall
-        min_dist = min(dist_to_left, dist_to_right, dist_to_top, dist_to_bottom)
-
-        # Offset for placement
-        offset = 0  # Place directly on the wall
-
-        # Bounds for the other coordinate to keep door within room limits
-        min_x = closest_room.x + self.wall_thickness
-        max_x = closest_room.x + closest_room.width - door.width - self.wall_thickness
-        min_y = closest_room.y + self.wall_thickness
-        max_y = closest_room.y + closest_room.height - door.height - self.wall_thickness
-
-        if min_dist == dist_to_left:
-            # Left wall
-            door.x = closest_room.x + offset
-            # Keep y coordinate within room bounds
-            door.y = min(max(door.y, min_y), max_y)
-            # Set door direction
-            door.direction = "right"
-        elif min_dist == dist_to_right:
-            # Right wall
-            door.x = closest_room.x + closest_room.width - door.width - offset
-            # Keep y coordinate within room bounds
-            door.y = min(max(door.y, min_y), max_y)
-            # Set door direction
-            door.direction = "left"
-        elif min_dist == dist_to_top:
-            # Top wall
-            door.y = closest_room.y + offset
-            # Keep x coordinate within room bounds
-            door.x = min(max(door.x, min_x), max_x)
-            # Set door direction
-            door.direction = "down"
-        elif min_dist == dist_to_bottom:
-            # Bottom wall
-            door.y = closest_room.y + closest_room.height - door.height - offset
-            # Keep x coordinate within room bounds
-            door.x = min(max(door.x, min_x), max_x)
-            # Set door direction
-            door.direction = "up"
\ No newline at end of file
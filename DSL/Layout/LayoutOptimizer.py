@@ -0,0 +1,406 @@
+import math
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Rooms to place, in layout units: declared positions, sizes, the plan they
+# must fit in, and the overlap-free layout the search improves on. Rooms must
+# stay `gap` apart; positions are whole steps in integer mode and are rounded
+# to `digits` decimal places otherwise (None to leave them unrounded)
+LayoutProblem = namedtuple('LayoutProblem', ['origin_x', 'origin_y', 'widths', 'heights',
+                                             'max_width', 'max_height', 'start_x', 'start_y', 'integer',
+                                             'gap', 'digits'], defaults=(0, None))
+
+# Best overlap-free layout found by one search: its cost, room positions, the
+# seed of the search and the number of moves it tried
+SearchResult = namedtuple('SearchResult', ['cost', 'xs', 'ys', 'seed', 'moves'])
+
+
+class LayoutOptimizer:
+    """
+    Global room layout by simulated annealing.
+
+    The cost of a layout is the total distance of the rooms from their
+    declared positions, plus a penalty for every unit a room sticks out below
+    the plan. Rooms closer than the gap of the problem count as overlapping.
+    Overlaps are allowed during the search but weighted more and more
+    heavily as it cools; only overlap-free layouts are kept. Several
+    seeded searches run in a process pool and the cheapest layout found
+    within the time budget wins.
+    """
+
+    def __init__(self, restarts=None, max_workers=None):
+        """
+        Create an optimizer
+
+        Args:
+            restarts: Number of seeded searches (None for one per worker)
+            max_workers: Processes to run them in (None for the CPU count)
+        """
+        self.restarts = restarts
+        self.max_workers = max_workers
+
+    def optimize(self, problem, time_budget, seed=0):
+        """
+        Search for a cheaper overlap-free layout than the start layout
+
+        Args:
+            problem: LayoutProblem
+            time_budget: Wall-clock seconds for the whole search
+            seed: Seed of the first search; search k uses seed + k
+
+        Returns:
+            SearchResult of the cheapest layout found, or None if no layout
+            is cheaper than the start layout
+        """
+        deadline = time.time() + time_budget
+        workers = self.max_workers if self.max_workers is not None else (os.cpu_count() or 1)
+        restarts = max(1, self.restarts if self.restarts is not None else workers)
+        seeds = [seed + k for k in range(restarts)]
+
+        results = None
+        if workers > 1 and restarts > 1:
+            # Searches beyond the pool size wait for a worker, so each gets
+            # its share of the budget
+            duration = time_budget * min(1.0, workers / restarts)
+            try:
+                with ProcessPoolExecutor(max_workers=min(workers, restarts)) as pool:
+                    results = list(pool.map(_search, [problem] * restarts, seeds,
+                                            [duration] * restarts, [deadline] * restarts))
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Parallel layout search unavailable, searching serially: {e}")
+        if results is None:
+            results = [_search(problem, search_seed, (deadline - time.time()) / (len(seeds) - k), deadline)
+                       for k, search_seed in enumerate(seeds)]
+
+        start_cost = layout_cost(problem, problem.start_x, problem.start_y)
+        results = [result for result in results if result is not None and result.cost < start_cost]
+        if not results:
+            return None
+        return min(results, key=lambda result: (result.cost, result.seed))
+
+
+def layout_cost(problem, xs, ys):
+    """
+    Get the displacement cost of a layout
+
+    Args:
+        problem: LayoutProblem
+        xs, ys: Room positions
+
+    Returns:
+        Total distance from the declared positions plus the overflow penalty
+    """
+    return sum(_room_cost(problem, row, x, y) for row, (x, y) in enumerate(zip(xs, ys)))
+
+
+# Cost per unit a room sticks out below the plan
+_OVERFLOW_WEIGHT = 10.0
+
+
+def _room_cost(problem, row, x, y):
+    """Displacement and overflow cost of one room at (x, y)"""
+    overflow = y + problem.heights[row] - problem.max_height
+    cost = math.hypot(x - problem.origin_x[row], y - problem.origin_y[row])
+    return cost + _OVERFLOW_WEIGHT * overflow if overflow > 0 else cost
+
+
+def _search(problem, seed, duration, deadline):
+    """
+    Run one annealing search (in a worker process)
+
+    Args:
+        problem: LayoutProblem
+        seed: Random seed
+        duration: Seconds the search may run
+        deadline: Wall-clock time.time() the search must end by
+
+    Returns:
+        SearchResult, or None if the start layout has overlaps the search
+        could not remove
+    """
+    return _Annealer(problem, seed).run(min(time.time() + duration, deadline))
+
+
+class _Annealer:
+    """
+    State of one annealing search.
+
+    A move may not increase the overlap of the room it moves, so a search
+    started from an overlap-free layout only visits overlap-free layouts. A
+    move that reduces it is always taken, which works off the overlap of a
+    start layout with rooms closer than the gap.
+    Rooms live in a uniform grid of cells so the overlap of a moved room is
+    computed from its neighbours only; the cost and the total overlap are
+    updated incrementally. Overlaps are measured between rooms grown by the
+    gap on their right and bottom sides, so rooms closer than the gap overlap.
+    """
+
+    # Moves tried between clock reads
+    CHECK_INTERVAL = 256
+
+    # Bisection steps of a slide towards the declared position
+    SLIDE_STEPS = 6
+
+    def __init__(self, problem, seed):
+        self.problem = problem
+        self.seed = seed
+        self.random = random.Random(seed)
+        widths, heights = problem.widths, problem.heights
+        count = len(widths)
+
+        # Typical room size: scale of the temperature, and of the grid cells
+        sizes = sorted(math.sqrt(w * h) for w, h in zip(widths, heights))
+        self.scale = sizes[count // 2] or 1.0
+        self.cell = max(sorted(max(w, h) for w, h in zip(widths, heights))[count // 2], 1)
+
+        # Rooms stay inside the plan horizontally; vertically they may use the
+        # space the start layout overflowed into, at a cost
+        bottom = max([problem.max_height] + [y + h for y, h in zip(problem.start_y, heights)])
+        self.limit_x = [max(0, problem.max_width - w) for w in widths]
+        self.limit_y = [max(0, bottom - h) for h in heights]
+
+        # Room sizes including the gap, used for every overlap test
+        self.widths = [w + problem.gap for w in widths]
+        self.heights = [h + problem.gap for h in heights]
+
+        self.xs, self.ys = list(problem.start_x), list(problem.start_y)
+        self.cells = {}
+        for row in range(count):
+            self._insert(row)
+
+        self.cost = layout_cost(problem, self.xs, self.ys)
+        self.overlap_pairs = 0
+        for row in range(count):
+            self.overlap_pairs += self._overlap(row, self.xs[row], self.ys[row])[1]
+        self.overlap_pairs //= 2
+
+    def run(self, deadline):
+        """
+        Anneal until the deadline
+
+        Args:
+            deadline: Wall-clock time.time() to stop at
+
+        Returns:
+            SearchResult, or None if no overlap-free layout was found
+        """
+        best = None
+        if not self.overlap_pairs:
+            best = (self.cost, list(self.xs), list(self.ys))
+
+        start = time.time()
+        span = max(deadline - start, 1e-9)
+        moves = 0
+        while True:
+            progress = (time.time() - start) / span
+            if progress >= 1:
+                break
+            # Geometric cooling from half a room size to a thousandth of that
+            temperature = self.scale * 0.5 * 0.001 ** progress
+
+            for _ in range(self.CHECK_INTERVAL):
+                self._step(temperature)
+                if not self.overlap_pairs and (best is None or self.cost < best[0] - 1e-9):
+                    best = (self.cost, list(self.xs), list(self.ys))
+            moves += self.CHECK_INTERVAL
+
+        if best is None:
+            return None
+        # The running cost drifts with float rounding; report the exact one
+        return SearchResult(layout_cost(self.problem, best[1], best[2]), best[1], best[2], self.seed, moves)
+
+    def _step(self, temperature):
+        """Propose one move and accept it by the Metropolis rule"""
+        rng = self.random
+        row = rng.randrange(len(self.xs))
+        kind = rng.random()
+
+        if kind < 0.15:
+            other = self._neighbour(row)
+            if other is not None:
+                self._try_swap(row, other, temperature)
+                return
+
+        if kind < 0.6:
+            self._slide(row, temperature)
+            return
+
+        # Random step on the temperature's scale
+        new_x = self._clamp(self.xs[row] + rng.gauss(0.0, temperature), self.limit_x[row])
+        new_y = self._clamp(self.ys[row] + rng.gauss(0.0, temperature), self.limit_y[row])
+        self._try_move(row, new_x, new_y, temperature)
+
+    def _slide(self, row, temperature):
+        """
+        Slide a room towards its declared position, on both axes or one
+
+        The room goes as far as it can without overlapping more rooms, found
+        by bisection from the whole way back.
+        """
+        problem = self.problem
+        x, y = self.xs[row], self.ys[row]
+        axes = self.random.random()
+        target_x = problem.origin_x[row] if axes < 0.7 or axes >= 0.85 else x
+        target_y = problem.origin_y[row] if axes >= 0.7 else y
+        target_x = self._clamp(target_x, self.limit_x[row])
+        target_y = self._clamp(target_y, self.limit_y[row])
+        if target_x == x and target_y == y:
+            return
+
+        if self._try_move(row, target_x, target_y, temperature):
+            return
+        low, high = 0.0, 1.0
+        best = None
+        for _ in range(self.SLIDE_STEPS):
+            middle = (low + high) / 2
+            new_x = self._clamp(x + (target_x - x) * middle, self.limit_x[row])
+            new_y = self._clamp(y + (target_y - y) * middle, self.limit_y[row])
+            if self._overlap(row, new_x, new_y)[0] <= self._overlap(row, x, y)[0]:
+                low, best = middle, (new_x, new_y)
+            else:
+                high = middle
+        if best is not None and best != (x, y):
+            self._try_move(row, best[0], best[1], temperature)
+
+    def _try_move(self, row, new_x, new_y, temperature):
+        """
+        Move a room if that removes overlap, or adds none and the Metropolis
+        rule agrees
+
+        Returns:
+            True if the room moved
+        """
+        x, y = self.xs[row], self.ys[row]
+        if new_x == x and new_y == y:
+            return False
+        old_area, old_pairs = self._overlap(row, x, y)
+        new_area, new_pairs = self._overlap(row, new_x, new_y)
+        if new_area > old_area:
+            return False
+
+        problem = self.problem
+        cost_change = _room_cost(problem, row, new_x, new_y) - _room_cost(problem, row, x, y)
+        if new_area == old_area and not self._accept(cost_change, temperature):
+            return False
+        self._move(row, new_x, new_y)
+        self.cost += cost_change
+        self.overlap_pairs += new_pairs - old_pairs
+        return True
+
+    def _try_swap(self, first, second, temperature):
+        """Exchange the positions of two rooms, clamped to their limits"""
+        problem = self.problem
+        old = ((first, self.xs[first], self.ys[first]), (second, self.xs[second], self.ys[second]))
+        new = ((first, self._clamp(old[1][1], self.limit_x[first]), self._clamp(old[1][2], self.limit_y[first])),
+               (second, self._clamp(old[0][1], self.limit_x[second]), self._clamp(old[0][2], self.limit_y[second])))
+
+        skip = (first, second)
+        old_area, old_pairs = self._pair_overlap(old)
+        new_area, new_pairs = self._pair_overlap(new)
+        cost_change = 0.0
+        for (row, x, y), (_, new_x, new_y) in zip(old, new):
+            area, pairs = self._overlap(row, x, y, skip)
+            old_area, old_pairs = old_area + area, old_pairs + pairs
+            area, pairs = self._overlap(row, new_x, new_y, skip)
+            new_area, new_pairs = new_area + area, new_pairs + pairs
+            cost_change += _room_cost(problem, row, new_x, new_y) - _room_cost(problem, row, x, y)
+
+        if new_area > old_area or (new_area == old_area and not self._accept(cost_change, temperature)):
+            return
+        for row, x, y in new:
+            self._move(row, x, y)
+        self.cost += cost_change
+        self.overlap_pairs += new_pairs - old_pairs
+
+    def _accept(self, change, temperature):
+        """Metropolis acceptance of a cost change"""
+        return change <= 0 or self.random.random() < math.exp(-change / temperature)
+
+    def _clamp(self, value, limit):
+        """Keep a coordinate in [0, limit], on whole steps or the problem's decimal places"""
+        if self.problem.integer:
+            value = round(value)
+        elif self.problem.digits is not None:
+            value = round(value, self.problem.digits)
+        return min(max(value, 0), limit)
+
+    def _cell_range(self, row, x, y):
+        """Cells covered by a room at (x, y)"""
+        cell = self.cell
+        return (range(int(x // cell), int((x + self.widths[row]) // cell) + 1),
+                range(int(y // cell), int((y + self.heights[row]) // cell) + 1))
+
+    def _insert(self, row):
+        columns, rows = self._cell_range(row, self.xs[row], self.ys[row])
+        for column in columns:
+            for cell_row in rows:
+                self.cells.setdefault((column, cell_row), set()).add(row)
+
+    def _remove(self, row):
+        columns, rows = self._cell_range(row, self.xs[row], self.ys[row])
+        for column in columns:
+            for cell_row in rows:
+                self.cells[(column, cell_row)].discard(row)
+
+    def _move(self, row, x, y):
+        self._remove(row)
+        self.xs[row], self.ys[row] = x, y
+        self._insert(row)
+
+    def _overlap(self, row, x, y, skip=()):
+        """
+        Overlap of a room at (x, y) with the other rooms
+
+        Args:
+            row: Room number
+            x, y: Position to test
+            skip: Other room numbers to leave out
+
+        Returns:
+            (total overlap area, number of rooms overlapped)
+        """
+        width, height = self.widths[row], self.heights[row]
+        widths, heights, xs, ys = self.widths, self.heights, self.xs, self.ys
+        right, bottom = x + width, y + height
+        seen = set(skip)
+        seen.add(row)
+        area = 0.0
+        pairs = 0
+        columns, rows = self._cell_range(row, x, y)
+        for column in columns:
+            for cell_row in rows:
+                for other in self.cells.get((column, cell_row), ()):
+                    if other in seen:
+                        continue
+                    seen.add(other)
+                    overlap_x = min(right, xs[other] + widths[other]) - max(x, xs[other])
+                    if overlap_x <= 0:
+                        continue
+                    overlap_y = min(bottom, ys[other] + heights[other]) - max(y, ys[other])
+                    if overlap_y <= 0:
+                        continue
+                    area += overlap_x * overlap_y
+                    pairs += 1
+        return area, pairs
+
+    def _pair_overlap(self, placements):
+        """Overlap between the two rooms of a swap, as (area, 0 or 1)"""
+        (first, x1, y1), (second, x2, y2) = placements
+        widths, heights = self.widths, self.heights
+        overlap_x = min(x1 + widths[first], x2 + widths[second]) - max(x1, x2)
+        overlap_y = min(y1 + heights[first], y2 + heights[second]) - max(y1, y2)
+        if overlap_x <= 0 or overlap_y <= 0:
+            return 0.0, 0
+        return overlap_x * overlap_y, 1
+
+    def _neighbour(self, row):
+        """A room sharing a cell with the given room, or None"""
+        columns, rows = self._cell_range(row, self.xs[row], self.ys[row])
+        candidates = sorted({other for column in columns for cell_row in rows
+                             for other in self.cells.get((column, cell_row), ()) if other != row})
+        return self.random.choice(candidates) if candidates else None
@@ -1 +1,7 @@
-from .LayoutManager import LayoutManager
\ No newline at end of file
+from .LayoutManager import LayoutManager
+from .LayoutOptimizer import LayoutOptimizer, LayoutProblem, SearchResult, layout_cost
+from .LayoutCache import LayoutCache, LayoutEntry, prune_directory
+from .ConstraintSolver import (ConstraintSolver, LinearConstraint, Variable, UnsatisfiableConstraintError,
+                               WEAK, MEDIUM, STRONG, REQUIRED)
+from .ConstraintLayout import ConstraintLayout
+from .FurniturePacker import FurniturePacker, PackingProblem, PackingResult, pack_rooms
@@ -0,0 +1,259 @@
+import heapq
+import math
+
+from DSL.Models.Room import Room
+from DSL.Models.Door import Door
+from DSL.Geometry.SpatialIndex import element_bounds
+
+
+# Furniture types that count as a way out of the floor
+EXIT_TYPES = ('stairs', 'elevator')
+
+
+class ConnectivityGraph:
+    """
+    Graph of rooms connected through doors.
+
+    Two rooms are connected when a door sits on a wall segment they share.
+    Walking distances run from room center to door center to room center,
+    and shortest-path results are cached until a room, door or exit changes.
+    """
+
+    def __init__(self, floor_plan, tolerance=1.0):
+        """
+        Build the graph of a floor plan
+
+        Args:
+            floor_plan: FloorPlan object
+            tolerance: Maximum gap between a door and the walls it connects
+        """
+        self.floor_plan = floor_plan
+        self.tolerance = tolerance
+        self.version = floor_plan.version
+
+        self.rooms = list(floor_plan.rooms)
+        self.order = {id(room): index for index, room in enumerate(self.rooms)}
+
+        # id(room) -> {id(neighbour) -> (weight, door)}
+        self.edges = {id(room): {} for room in self.rooms}
+
+        # Exit room -> distance from its center to the nearest exit inside it
+        self.exits = {}
+
+        # Elements whose changes invalidate the graph
+        self._members = set(self.order)
+
+        self._egress = None
+        self._paths = {}
+
+        self._connect_doors()
+        self._find_exits()
+
+    def _connect_doors(self):
+        """Add an edge for every door sitting on a wall shared by two rooms"""
+        wall_graph = self.floor_plan.get_wall_graph(self.tolerance)
+        index = self.floor_plan.get_spatial_index()
+        tolerance = self.tolerance
+
+        for door in self.floor_plan.doors:
+            self._members.add(id(door))
+            min_x, min_y, max_x, max_y = element_bounds(door)
+            door_x = (min_x + max_x) / 2
+            door_y = (min_y + max_y) / 2
+
+            candidates = [room for room in index.query_rect(min_x - tolerance, min_y - tolerance,
+                                                            max_x + tolerance, max_y + tolerance,
+                                                            kind='rooms')
+                          if id(room) in self.order]
+
+            for i, room_a in enumerate(candidates):
+                for room_b in candidates[i + 1:]:
+                    for segment in wall_graph.shared_segments(room_a, room_b):
+                        if segment.orientation == 'horizontal':
+                            along_min, along_max, across_min, across_max = min_x, max_x, min_y, max_y
+                        else:
+                            along_min, along_max, across_min, across_max = min_y, max_y, min_x, max_x
+
+                        if (segment.start <= along_max and segment.end >= along_min and
+                                across_min - tolerance <= segment.coordinate <= across_max + tolerance):
+                            weight = (self._distance(room_a, door_x, door_y) +
+                                      self._distance(room_b, door_x, door_y))
+                            self._add_edge(room_a, room_b, weight, door)
+                            break
+
+    def _find_exits(self):
+        """Mark the rooms that contain stairs or an elevator"""
+        tree = self.floor_plan.get_containment_tree()
+        for furniture in self.floor_plan.furniture:
+            furniture_type = (furniture.furniture_type or '').lower()
+            if furniture_type not in EXIT_TYPES:
+                continue
+            self._members.add(id(furniture))
+
+            # Walk up to the closest enclosing room
+            room = tree.get_parent(furniture)
+            while room is not None and id(room) not in self.order:
+                room = tree.get_parent(room)
+            if room is None:
+                continue
+
+            min_x, min_y, max_x, max_y = element_bounds(furniture)
+            distance = self._distance(room, (min_x + max_x) / 2, (min_y + max_y) / 2)
+            self.exits[room] = min(distance, self.exits.get(room, math.inf))
+
+    def _add_edge(self, room_a, room_b, weight, door):
+        """Connect two rooms, keeping the shortest door between them"""
+        current = self.edges[id(room_a)].get(id(room_b))
+        if current is None or weight < current[0]:
+            self.edges[id(room_a)][id(room_b)] = (weight, door)
+            self.edges[id(room_b)][id(room_a)] = (weight, door)
+
+    @staticmethod
+    def _distance(room, x, y):
+        """Distance from the center of a room (its centroid for polygon rooms) to a point"""
+        center_x, center_y = room.centroid
+        return math.hypot(center_x - x, center_y - y)
+
+    def is_current(self):
+        """
+        Check whether the graph still matches its floor plan
+
+        Changes that do not touch rooms, doors or exits only move the
+        version stamp forward, so the cached results stay valid.
+
+        Returns:
+            True if the graph can be reused
+        """
+        floor_plan = self.floor_plan
+        if self.version == floor_plan.version:
+            return True
+        if not floor_plan.tracks_changes_since(self.version):
+            return False
+
+        for change in floor_plan.changes_since(self.version):
+            element = change.element
+            if id(element) in self._members:
+                return False
+            if isinstance(element, (Room, Door)):
+                return False
+            if (getattr(element, 'furniture_type', None) or '').lower() in EXIT_TYPES:
+                return False
+
+        self.version = floor_plan.version
+        return True
+
+    def neighbors(self, room):
+        """
+        Get the rooms reachable through one door
+
+        Args:
+            room: Room object
+
+        Returns:
+            List of (room, door, distance) tuples
+        """
+        return [(self.rooms[self.order[key]], door, weight)
+                for key, (weight, door) in self.edges.get(id(room), {}).items()]
+
+    def _dijkstra(self, sources):
+        """
+        Run Dijkstra's algorithm from one or more sources
+
+        Args:
+            sources: List of (room, initial distance) tuples
+
+        Returns:
+            (distances, previous) dictionaries keyed by id(room)
+        """
+        distances = {}
+        previous = {}
+        heap = []
+        for room, distance in sources:
+            key = id(room)
+            if distance < distances.get(key, math.inf):
+                distances[key] = distance
+                previous[key] = None
+                heapq.heappush(heap, (distance, self.order[key], key))
+
+        while heap:
+            distance, _, key = heapq.heappop(heap)
+            if distance > distances[key]:
+                continue
+            for neighbour, (weight, door) in self.edges[key].items():
+                candidate = distance + weight
+                if candidate < distances.get(neighbour, math.inf):
+                    distances[neighbour] = candidate
+                    previous[neighbour] = (key, door)
+                    heapq.heappush(heap, (candidate, self.order[neighbour], neighbour))
+
+        return distances, previous
+
+    def egress_distances(self):
+        """
+        Get the walking distance from every room to its nearest exit
+
+        All exits are searched at once (multi-source Dijkstra) and the
+        result is cached on the graph.
+
+        Returns:
+            Dictionary of room -> distance (math.inf when no exit is reachable)
+        """
+        if self._egress is None:
+            self._egress = self._dijkstra(list(self.exits.items()))
+
+        distances = self._egress[0]
+        return {room: distances.get(id(room), math.inf) for room in self.rooms}
+
+    def egress_route(self, room):
+        """
+        Get the route from a room to its nearest exit
+
+        Args:
+            room: Room object
+
+        Returns:
+            List of rooms and doors from the room to the exit room,
+            or an empty list when no exit is reachable
+        """
+        self.egress_distances()
+        distances, previous = self._egress
+        key = id(room)
+        if key not in distances:
+            return []
+
+        # Predecessors point towards the exits, so walking them leads outwards
+        route = [room]
+        while previous[key] is not None:
+            key, door = previous[key]
+            route.append(door)
+            route.append(self.rooms[self.order[key]])
+        return route
+
+    def shortest_path(self, start, goal):
+        """
+        Get the shortest walking route between two rooms
+
+        Args:
+            start: Room object
+            goal: Room object
+
+        Returns:
+            (distance, route) tuple; route alternates rooms and doors and is
+            empty (with an infinite distance) when the rooms are not connected
+        """
+        key = id(start)
+        if key not in self._paths:
+            self._paths[key] = self._dijkstra([(start, 0)])
+        distances, previous = self._paths[key]
+
+        goal_key = id(goal)
+        if goal_key not in distances:
+            return math.inf, []
+
+        route = [goal]
+        while previous[goal_key] is not None:
+            goal_key, door = previous[goal_key]
+            route.append(door)
+            route.append(self.rooms[self.order[goal_key]])
+        route.reverse()
+        return distances[id(goal)], route
\ No newline at end of file
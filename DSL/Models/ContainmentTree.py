@@ -0,0 +1,335 @@
+from DSL.Geometry.SpatialIndex import element_bounds
+
+
+# Attributes besides the geometry that decide where an element sits in the tree
+LINK_FIELDS = ('id', 'parent_id')
+
+class ContainmentTree:
+    """
+    Parent/child hierarchy of the elements in a floor plan.
+
+    Explicit `parent_id` values are used first. Elements without a declared
+    parent are assigned to the smallest room that contains them, found with
+    one spatial-index lookup per element.
+    """
+
+    def __init__(self, floor_plan, parent_indices=None):
+        """
+        Build the hierarchy of a floor plan
+
+        Args:
+            floor_plan: FloorPlan object
+            parent_indices: Optional stored hierarchy: a NumPy array with, for
+                every element of `floor_plan.get_all_elements()`, the index of
+                its parent in that list or -1 (skips the spatial join)
+        """
+        self.floor_plan = floor_plan
+        self.version = floor_plan.version
+
+        self.elements = {}  # id(element) -> element
+        self.kinds = {}  # id(element) -> kind
+        self.parents = {}  # id(element) -> parent element
+        self.children = {}  # id(element) -> list of child elements
+        self.roots = []
+
+        self._subtree_bounds = {}
+
+        if parent_indices is not None:
+            self._load(parent_indices)
+        else:
+            self._build()
+
+    def is_current(self):
+        """
+        Check whether the hierarchy still matches its floor plan
+
+        Writes that leave the geometry and the parent links alone (labels,
+        colors, ...) only move the version stamp forward; adds, removes and
+        bulk updates always count as changes.
+
+        Returns:
+            True if the tree can be reused
+        """
+        floor_plan = self.floor_plan
+        if self.version == floor_plan.version:
+            return True
+        if not floor_plan.tracks_changes_since(self.version):
+            return False
+
+        for change in floor_plan.changes_since(self.version):
+            if change.action != 'update' or change.attribute is None or change.attribute in LINK_FIELDS:
+                return False
+            if change.attribute in getattr(change.element, 'GEOMETRY_FIELDS', ()):
+                return False
+
+        self.version = floor_plan.version
+        return True
+
+    def _load(self, parent_indices):
+        """
+        Link every element to a parent given by its index
+
+        Args:
+            parent_indices: Array with the parent index of each element, -1 for top-level elements
+        """
+        elements = []
+        for kind, kind_elements in self.floor_plan.get_elements_by_kind().items():
+            for element in kind_elements:
+                self.elements[id(element)] = element
+                self.kinds[id(element)] = kind
+                elements.append(element)
+
+        if len(parent_indices) != len(elements):
+            raise ValueError("Parent index does not match the floor plan elements")
+
+        for element, parent_index in zip(elements, parent_indices.tolist()):
+            if parent_index < 0:
+                self.roots.append(element)
+            else:
+                parent = elements[parent_index]
+                self.parents[id(element)] = parent
+                self.children.setdefault(id(parent), []).append(element)
+
+    def _build(self):
+        """Link every element to its explicit or inferred parent"""
+        elements_by_kind = self.floor_plan.get_elements_by_kind()
+        for kind, elements in elements_by_kind.items():
+            for element in elements:
+                self.elements[id(element)] = element
+                self.kinds[id(element)] = kind
+
+        # Explicit parents first, so inferred links never override them
+        unparented = []
+        for element in self.elements.values():
+            parent_id = getattr(element, 'parent_id', None)
+            parent = self.floor_plan.get_element_by_id(parent_id) if parent_id else None
+            if parent is None or id(parent) not in self.elements or not self._link(element, parent):
+                unparented.append(element)
+
+        # Bulk spatial join of the remaining elements against the rooms
+        index = self.floor_plan.get_spatial_index()
+        for element in unparented:
+            parent = self._find_container(element, index)
+            if parent is None or not self._link(element, parent):
+                self.roots.append(element)
+
+    def _find_container(self, element, index):
+        """
+        Find the smallest room that geometrically contains an element
+
+        Args:
+            element: Element to place in the hierarchy
+            index: SpatialIndex of the floor plan
+
+        Returns:
+            Room object or None
+        """
+        kind = self.kinds[id(element)]
+        min_x, min_y, max_x, max_y = element_bounds(element)
+
+        if kind in ('doors', 'windows'):
+            # Openings sit on a wall, so only their center has to be inside
+            center_x = (min_x + max_x) / 2
+            center_y = (min_y + max_y) / 2
+            candidates = [room for room in index.query_point(center_x, center_y, kind='rooms')
+                          if room.contains_point(center_x, center_y)]
+        else:
+            candidates = []
+            for room in index.query_rect(min_x, min_y, max_x, max_y, kind='rooms'):
+                if room is element:
+                    continue
+                room_bounds = element_bounds(room)
+                if not (room_bounds[0] <= min_x and room_bounds[1] <= min_y and
+                        room_bounds[2] >= max_x and room_bounds[3] >= max_y):
+                    continue
+                if not (room.contains_point(min_x, min_y) and room.contains_point(max_x, max_y)):
+                    continue
+                # A room only nests inside a strictly larger one, which rules out cycles
+                if kind == 'rooms' and room.width * room.height <= element.width * element.height:
+                    continue
+                candidates.append(room)
+
+        if not candidates:
+            return None
+        return min(candidates, key=lambda room: room.width * room.height)
+
+    def _link(self, element, parent):
+        """
+        Attach an element to a parent unless that would create a cycle
+
+        Args:
+            element: Child element
+            parent: Parent element
+
+        Returns:
+            True if the link was made
+        """
+        ancestor = parent
+        while ancestor is not None:
+            if ancestor is element:
+                return False
+            ancestor = self.parents.get(id(ancestor))
+
+        self.parents[id(element)] = parent
+        self.children.setdefault(id(parent), []).append(element)
+        return True
+
+    def _resolve(self, element):
+        """Accept either an element or its id"""
+        if isinstance(element, str):
+            return self.floor_plan.get_element_by_id(element)
+        return element
+
+    def get_parent(self, element):
+        """
+        Get the parent of an element
+
+        Args:
+            element: Element or element ID
+
+        Returns:
+            Parent element or None for top-level elements
+        """
+        element = self._resolve(element)
+        return self.parents.get(id(element)) if element is not None else None
+
+    def get_children(self, element, kind=None):
+        """
+        Get the direct children of an element
+
+        Args:
+            element: Element or element ID
+            kind: Optional kind filter ('rooms', 'walls', 'doors', 'windows', 'furniture')
+
+        Returns:
+            List of child elements
+        """
+        element = self._resolve(element)
+        if element is None:
+            return []
+        children = self.children.get(id(element), [])
+        if kind is None:
+            return list(children)
+        return [child for child in children if self.kinds.get(id(child)) == kind]
+
+    def iter_subtree(self, element):
+        """
+        Iterate over an element and all of its descendants (depth first)
+
+        Args:
+            element: Element or element ID
+
+        Yields:
+            Elements of the subtree, parents before children
+        """
+        element = self._resolve(element)
+        if element is None:
+            return
+
+        stack = [element]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(self.children.get(id(current), [])))
+
+    def get_descendants(self, element, kind=None):
+        """
+        Get all descendants of an element
+
+        Args:
+            element: Element or element ID
+            kind: Optional kind filter
+
+        Returns:
+            List of elements (the element itself is not included)
+        """
+        descendants = list(self.iter_subtree(element))[1:]
+        if kind is None:
+            return descendants
+        return [item for item in descendants if self.kinds.get(id(item)) == kind]
+
+    def subtree_bounds(self, element):
+        """
+        Get the bounding box of an element and all of its descendants
+
+        Args:
+            element: Element or element ID
+
+        Returns:
+            (min_x, min_y, max_x, max_y) tuple
+        """
+        element = self._resolve(element)
+        key = id(element)
+        if key in self._subtree_bounds:
+            return self._subtree_bounds[key]
+
+        # Iterative post-order so deep hierarchies do not hit the recursion limit
+        order = list(self.iter_subtree(element))
+        for item in reversed(order):
+            if id(item) in self._subtree_bounds:
+                continue
+            min_x, min_y, max_x, max_y = element_bounds(item)
+            for child in self.children.get(id(item), []):
+                child_bounds = self._subtree_bounds[id(child)]
+                min_x = min(min_x, child_bounds[0])
+                min_y = min(min_y, child_bounds[1])
+                max_x = max(max_x, child_bounds[2])
+                max_y = max(max_y, child_bounds[3])
+            self._subtree_bounds[id(item)] = (min_x, min_y, max_x, max_y)
+
+        return self._subtree_bounds[key]
+
+    def cull(self, min_x, min_y, max_x, max_y):
+        """
+        Find the elements visible in a viewport, skipping whole subtrees
+        whose bounding box lies outside of it
+
+        Args:
+            min_x, min_y, max_x, max_y: Viewport rectangle
+
+        Returns:
+            List of visible elements
+        """
+        visible = []
+        stack = list(reversed(self.roots))
+        while stack:
+            element = stack.pop()
+            bounds = self.subtree_bounds(element)
+            if bounds[0] > max_x or bounds[2] < min_x or bounds[1] > max_y or bounds[3] < min_y:
+                continue
+
+            own = element_bounds(element)
+            if not (own[0] > max_x or own[2] < min_x or own[1] > max_y or own[3] < min_y):
+                visible.append(element)
+            stack.extend(reversed(self.children.get(id(element), [])))
+        return visible
+
+    def move_subtree(self, element, dx, dy):
+        """
+        Move an element together with everything it contains
+
+        Args:
+            element: Element or element ID
+            dx: X offset
+            dy: Y offset
+        """
+        for item in list(self.iter_subtree(element)):
+            if hasattr(item, 'start_x'):
+                item.set_start_point(item.start_x + dx, item.start_y + dy)
+                item.set_end_point(item.end_x + dx, item.end_y + dy)
+            else:
+                item.set_position(item.x + dx, item.y + dy)
+
+    def delete_subtree(self, element):
+        """
+        Remove an element and everything it contains from the floor plan
+
+        Args:
+            element: Element or element ID
+
+        Returns:
+            List of removed elements
+        """
+        removed = list(self.iter_subtree(element))
+        self.floor_plan.remove_elements(removed)
+        return removed
\ No newline at end of file
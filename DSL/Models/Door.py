@@ -1,4 +1,7 @@
-class Door:
+from DSL.Models.TrackedElement import TrackedElement
+
+
+class Door(TrackedElement):
     """
     Represents a door in the floor plan
     """
@@ -0,0 +1,425 @@
+import sys
+import types
+
+import numpy as np
+
+from DSL.Models.Room import Room
+from DSL.Models.Door import Door
+from DSL.Models.Window import Window
+from DSL.Models.Furniture import Furniture
+
+
+# Numeric fields stored for every element kind
+NUMERIC_FIELDS = ('x', 'y', 'width', 'height', 'rotation', 'layer')
+
+# Numeric fields holding lengths, scaled along with the positions
+LENGTH_FIELDS = ('width', 'height', 'distance_wall')
+
+# Per-kind schema: model class, extra numeric fields, interned string fields
+KIND_SCHEMAS = {
+    'rooms': (Room, (), ('id', 'label', 'parent_id')),
+    'doors': (Door, ('distance_wall',), ('id', 'parent_id', 'wall_id', 'direction')),
+    'windows': (Window, ('distance_wall',), ('id', 'parent_id', 'wall_id')),
+    'furniture': (Furniture, (), ('id', 'label', 'parent_id', 'furniture_type')),
+}
+
+
+class StringTable:
+    """
+    Interns strings (ids, labels, types) and hands out integer codes for them
+    """
+
+    def __init__(self):
+        """Initialize an empty string table"""
+        self.strings = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, value):
+        """
+        Get the code for a string, adding it to the table if needed
+
+        Args:
+            value: String to intern (None is encoded as -1)
+
+        Returns:
+            Integer code of the string
+        """
+        if value is None:
+            return -1
+
+        code = self.codes.get(value)
+        if code is None:
+            value = sys.intern(str(value))
+            code = len(self.strings)
+            self.strings.append(value)
+            self.codes[value] = code
+        return code
+
+    def lookup(self, code):
+        """
+        Get the string for a code
+
+        Args:
+            code: Integer code returned by intern()
+
+        Returns:
+            The interned string or None for -1
+        """
+        code = int(code)
+        return self.strings[code] if code >= 0 else None
+
+
+class ElementColumns:
+    """
+    Columnar (struct-of-arrays) storage for one kind of floor plan element.
+
+    Geometry lives in contiguous NumPy arrays so bulk operations such as
+    bounding boxes, areas and scaling are single vectorized expressions.
+    String fields are stored as codes into a shared StringTable.
+    """
+
+    def __init__(self, kind, strings=None, capacity=64):
+        """
+        Initialize empty columns
+
+        Args:
+            kind: Element kind ('rooms', 'doors', 'windows' or 'furniture')
+            strings: StringTable shared with other columns (created if None)
+            capacity: Initial number of rows to allocate
+        """
+        if kind not in KIND_SCHEMAS:
+            raise ValueError(f"Unknown element kind: {kind}")
+
+        self.kind = kind
+        self.model_class, extra_fields, self.string_fields = KIND_SCHEMAS[kind]
+        self.numeric_fields = NUMERIC_FIELDS + extra_fields
+        self.strings = strings if strings is not None else StringTable()
+        self.size = 0
+        self.capacity = 0
+        self.arrays = {}
+
+        # Defaults for attributes that are not stored in columns
+        self._defaults = {name: value for name, value in vars(self.model_class()).items()
+                          if not name.startswith('_')}
+
+        self._reserve(max(1, capacity))
+
+    @classmethod
+    def from_elements(cls, kind, elements, strings=None):
+        """
+        Build columns from a list of model objects
+
+        Args:
+            kind: Element kind
+            elements: List of model objects of that kind
+            strings: Optional shared StringTable
+
+        Returns:
+            ElementColumns object
+        """
+        columns = cls(kind, strings, capacity=len(elements))
+        columns.extend(elements)
+        return columns
+
+    def _allocate(self, name, dtype, capacity):
+        """
+        Allocate the backing array of one column
+
+        Args:
+            name: Column name
+            dtype: NumPy dtype of the column
+            capacity: Number of rows
+
+        Returns:
+            Zero-filled array
+        """
+        return np.zeros(capacity, dtype=dtype)
+
+    def _dtype(self, name):
+        """Get the dtype used for a column"""
+        if name in self.string_fields:
+            return np.int32
+        if name == 'layer':
+            return np.int32
+        return np.float64
+
+    def _reserve(self, capacity):
+        """
+        Make sure the columns can hold at least `capacity` rows
+
+        Args:
+            capacity: Required number of rows
+        """
+        if capacity <= self.capacity:
+            return
+
+        new_capacity = max(capacity, self.capacity * 2)
+        for name in self.numeric_fields + self.string_fields:
+            array = self._allocate(name, self._dtype(name), new_capacity)
+            if name in self.string_fields:
+                array[:] = -1
+            if name in self.arrays:
+                array[:self.size] = self.arrays[name][:self.size]
+            self.arrays[name] = array
+        self.capacity = new_capacity
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield ElementView(self, index)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("element index out of range")
+        return ElementView(self, index)
+
+    def column(self, name):
+        """
+        Get the live array of a column (only the used rows)
+
+        Args:
+            name: Column name
+
+        Returns:
+            NumPy array view of the column
+        """
+        return self.arrays[name][:self.size]
+
+    @property
+    def x(self):
+        return self.column('x')
+
+    @property
+    def y(self):
+        return self.column('y')
+
+    @property
+    def width(self):
+        return self.column('width')
+
+    @property
+    def height(self):
+        return self.column('height')
+
+    @property
+    def rotation(self):
+        return self.column('rotation')
+
+    @property
+    def layer(self):
+        return self.column('layer')
+
+    def append(self, element):
+        """
+        Append a model object as a new row
+
+        Args:
+            element: Model object of this kind
+
+        Returns:
+            Row index of the element
+        """
+        index = self.size
+        self._reserve(index + 1)
+        for name in self.numeric_fields:
+            self.arrays[name][index] = getattr(element, name, 0) or 0
+        for name in self.string_fields:
+            self.arrays[name][index] = self.strings.intern(getattr(element, name, None))
+        self.size += 1
+        return index
+
+    def extend(self, elements):
+        """
+        Append many model objects at once
+
+        Args:
+            elements: List of model objects of this kind
+        """
+        start = self.size
+        end = start + len(elements)
+        self._reserve(end)
+        for name in self.numeric_fields:
+            self.arrays[name][start:end] = [getattr(e, name, 0) or 0 for e in elements]
+        intern = self.strings.intern
+        for name in self.string_fields:
+            self.arrays[name][start:end] = [intern(getattr(e, name, None)) for e in elements]
+        self.size = end
+
+    def get_value(self, index, name):
+        """
+        Read one field of one row
+
+        Args:
+            index: Row index
+            name: Field name
+
+        Returns:
+            Field value as a Python object
+        """
+        if name in self.arrays:
+            value = self.arrays[name][index]
+            if name in self.string_fields:
+                return self.strings.lookup(value)
+            return value.item()
+        if name in self._defaults:
+            value = self._defaults[name]
+            return list(value) if isinstance(value, list) else value
+        raise AttributeError(f"'{self.kind}' columns have no field '{name}'")
+
+    def set_value(self, index, name, value):
+        """
+        Write one field of one row
+
+        Args:
+            index: Row index
+            name: Field name
+            value: New value
+        """
+        if name in self.string_fields:
+            self.arrays[name][index] = self.strings.intern(value)
+        elif name in self.arrays:
+            self.arrays[name][index] = value
+        else:
+            raise AttributeError(f"'{self.kind}' columns cannot store field '{name}'")
+
+    def bounding_box(self):
+        """
+        Get the axis-aligned bounding box of all rows (rotation is ignored)
+
+        Returns:
+            (min_x, min_y, max_x, max_y) tuple or None if empty
+        """
+        if self.size == 0:
+            return None
+        x, y = self.x, self.y
+        return (float(x.min()), float(y.min()),
+                float((x + self.width).max()), float((y + self.height).max()))
+
+    def areas(self):
+        """
+        Get the footprint of every row
+
+        Returns:
+            Array of width * height values
+        """
+        return self.width * self.height
+
+    def centers(self):
+        """
+        Get the center point of every row
+
+        Returns:
+            (cx, cy) tuple of arrays
+        """
+        return self.x + self.width / 2, self.y + self.height / 2
+
+    def translate(self, dx, dy):
+        """
+        Move every row by an offset
+
+        Args:
+            dx: X offset
+            dy: Y offset
+        """
+        self.x[:] += dx
+        self.y[:] += dy
+
+    def scale(self, factor, origin_x=0, origin_y=0):
+        """
+        Scale every row around an origin point
+
+        Args:
+            factor: Scale factor
+            origin_x: X coordinate of the origin
+            origin_y: Y coordinate of the origin
+        """
+        self.x[:] = origin_x + (self.x - origin_x) * factor
+        self.y[:] = origin_y + (self.y - origin_y) * factor
+        for name in self.length_fields():
+            self.column(name)[:] *= factor
+
+    def length_fields(self):
+        """
+        Get the numeric fields of this kind that hold lengths
+
+        Returns:
+            Tuple of field names
+        """
+        return tuple(name for name in self.numeric_fields if name in LENGTH_FIELDS)
+
+    def write_back(self, elements):
+        """
+        Copy the numeric columns back into model objects
+
+        Args:
+            elements: Model objects in the same order as the rows
+        """
+        for name in self.numeric_fields:
+            for element, value in zip(elements, self.column(name).tolist()):
+                if name in ('rotation', 'layer') and not hasattr(element, name):
+                    continue
+                setattr(element, name, value)
+
+    def views(self):
+        """
+        Get lightweight object views of all rows
+
+        Returns:
+            List of ElementView objects
+        """
+        return [ElementView(self, index) for index in range(self.size)]
+
+    def to_elements(self):
+        """
+        Materialize the rows as model objects
+
+        Returns:
+            List of model objects
+        """
+        elements = []
+        for index in range(self.size):
+            element = self.model_class()
+            for name in self.numeric_fields + self.string_fields:
+                if name in ('rotation', 'layer') and not hasattr(element, name):
+                    continue
+                setattr(element, name, self.get_value(index, name))
+            elements.append(element)
+        return elements
+
+
+class ElementView:
+    """
+    Lightweight stand-in for a model object whose fields live in ElementColumns.
+
+    Column fields read and write the arrays directly, properties and methods
+    of the model class (e.g. Room.area, Room.contains_point) work unchanged,
+    and other attributes read as the model's defaults.
+    """
+
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns, index):
+        object.__setattr__(self, '_columns', columns)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, name):
+        columns = self._columns
+        attribute = getattr(columns.model_class, name, None)
+        if isinstance(attribute, property):
+            return attribute.fget(self)
+        if isinstance(attribute, types.FunctionType):
+            return types.MethodType(attribute, self)
+        return columns.get_value(self._index, name)
+
+    def __setattr__(self, name, value):
+        self._columns.set_value(self._index, name, value)
+
+    def __repr__(self):
+        return f"<{self._columns.model_class.__name__} view {self._columns.kind}[{self._index}]>"
\ No newline at end of file
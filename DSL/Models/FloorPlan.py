@@ -1,10 +1,49 @@
+from DSL.Models.ElementColumns import ElementColumns, ElementView, StringTable, KIND_SCHEMAS
+from DSL.Models.MappedColumns import MappedElementColumns, MappedStringTable
+from DSL.Models.TrackedElement import TrackedElement, Change
+from DSL.Models.ContainmentTree import ContainmentTree
+from DSL.Models.ConnectivityGraph import ConnectivityGraph
+from DSL.Models.FloorPlanSnapshot import FloorPlanSnapshot, record_element, restore_element
+from DSL.Models.PersistentMap import PersistentMap
+from DSL.Geometry.SpatialIndex import SpatialIndex
+from DSL.Geometry.SharedWalls import WallAdjacencyGraph
+from DSL.Geometry.SnapIndex import SnapIndex
+from DSL.Geometry.Coverage import Footprint, shape_coverage
+from DSL.Geometry.FixedPoint import FixedPointGrid, DEFAULT_FINGERPRINT_RESOLUTION
+import bisect
+import os
+
+
+# Element kinds that can be stored in memory-mapped columns
+MAPPABLE_KINDS = ('doors', 'windows', 'furniture')
+
+# Element kind of each model class, used to file elements restored from snapshots
+KINDS_BY_CLASS = {
+    'Room': 'rooms',
+    'Wall': 'walls',
+    'Door': 'doors',
+    'Window': 'windows',
+    'Furniture': 'furniture'
+}
+
+
 class FloorPlan:
     """
     Container for all elements in a floor plan
     """
 
-    def __init__(self):
-        """Initialize an empty floor plan"""
+    def __init__(self, storage_dir=None, mapped_kinds=('furniture',), grid=None):
+        """
+        Initialize an empty floor plan
+
+        Args:
+            storage_dir: Directory for out-of-core storage; when set, the
+                `mapped_kinds` element lists are replaced by memory-mapped
+                columns so their size is bounded by disk rather than memory
+            mapped_kinds: Element kinds stored out of core ('doors', 'windows', 'furniture')
+            grid: Optional FixedPointGrid; element geometry is then rounded to
+                the grid when elements are added and whenever it is written
+        """
         self.rooms = []
         self.walls = []
         self.doors = []
@@ -12,9 +51,63 @@ class FloorPlan:
         self.furniture = []
         self.header = None
 
+        # Relations between rooms, solved by the layout
+        self.constraints = []
+
+        # Integer geometry mode
+        self.grid = grid
+
         # Store elements by ID for quick lookup
         self.elements_by_id = {}
 
+        # Interned ids/labels shared by the columnar views of this plan
+        self.strings = StringTable()
+
+        # Out-of-core mode: append-only memory-mapped columns
+        self.storage_dir = storage_dir
+        if storage_dir is not None:
+            os.makedirs(storage_dir, exist_ok=True)
+            self.strings = MappedStringTable(os.path.join(storage_dir, 'strings'))
+            for kind in mapped_kinds:
+                if kind not in MAPPABLE_KINDS:
+                    raise ValueError(f"Element kind cannot be stored out of core: {kind}")
+                setattr(self, kind, MappedElementColumns(kind, storage_dir, self.strings))
+
+        # Spatial index over all elements, built on first query
+        self.spatial_index = None
+
+        # Change tracking: every add and attribute write bumps the version.
+        # The log keeps at most max_change_log entries; older ones are
+        # dropped, and with them the elements they hold
+        self.version = 0
+        self.change_log = []
+        self.max_change_log = 1 << 16
+        self._log_floor = 0
+        self._dirty_elements = {}
+
+        # Columns built from the element lists, rebuilt when the version moves on
+        self._columns = {}
+        self._columns_version = None
+
+        # Parent/child hierarchy, rebuilt when the geometry or parent links change
+        self._containment_tree = None
+
+        # Room-to-room shared walls, rebuilt when the version moves on
+        self._wall_graph = None
+        self._wall_graph_key = None
+
+        # Rooms connected through doors, rebuilt when rooms, doors or exits change
+        self._connectivity_graph = None
+
+        # Sorted room and wall coordinates for snapping, rebuilt when the version moves on
+        self._snap_index = None
+        self._snap_index_version = None
+
+        # Snapshot keys: every element gets a key on add, kept across undo/redo
+        self._next_element_key = 0
+        self._elements_by_key = {}
+        self._snapshot = None
+
     def add_room(self, room):
         """
         Add a room to the floor plan
@@ -22,9 +115,13 @@ class FloorPlan:
         Args:
             room: Room object
         """
+        self._quantize(room)
         self.rooms.append(room)
         if room.id:
             self.elements_by_id[room.id] = room
+        if self.spatial_index is not None:
+            self.spatial_index.insert(room, 'rooms')
+        self._track(room)
 
     def add_wall(self, wall):
         """
@@ -33,9 +130,13 @@ class FloorPlan:
         Args:
             wall: Wall object
         """
+        self._quantize(wall)
         self.walls.append(wall)
         if wall.id:
             self.elements_by_id[wall.id] = wall
+        if self.spatial_index is not None:
+            self.spatial_index.insert(wall, 'walls')
+        self._track(wall)
 
     def add_door(self, door):
         """
@@ -44,9 +145,15 @@ class FloorPlan:
         Args:
             door: Door object
         """
+        self._quantize(door)
+        if self._append_mapped('doors', door):
+            return
         self.doors.append(door)
         if door.id:
             self.elements_by_id[door.id] = door
+        if self.spatial_index is not None:
+            self.spatial_index.insert(door, 'doors')
+        self._track(door)
 
     def add_window(self, window):
         """
@@ -55,9 +162,15 @@ class FloorPlan:
         Args:
             window: Window object
         """
+        self._quantize(window)
+        if self._append_mapped('windows', window):
+            return
         self.windows.append(window)
         if window.id:
             self.elements_by_id[window.id] = window
+        if self.spatial_index is not None:
+            self.spatial_index.insert(window, 'windows')
+        self._track(window)
 
     def add_furniture(self, furniture):
         """
@@ -66,9 +179,400 @@ class FloorPlan:
         Args:
             furniture: Furniture object
         """
+        self._quantize(furniture)
+        if self._append_mapped('furniture', furniture):
+            return
         self.furniture.append(furniture)
         if furniture.id:
             self.elements_by_id[furniture.id] = furniture
+        if self.spatial_index is not None:
+            self.spatial_index.insert(furniture, 'furniture')
+        self._track(furniture)
+
+    def add_constraint(self, constraint):
+        """
+        Add a relation between rooms to the floor plan
+
+        Args:
+            constraint: LayoutConstraint object
+        """
+        self.constraints.append(constraint)
+
+    def _quantize(self, element):
+        """
+        Round the geometry of a new element to the grid, in integer geometry mode
+
+        Args:
+            element: Element about to be added
+        """
+        if self.grid is not None:
+            self.grid.snap_element(element)
+
+    def _append_mapped(self, kind, element):
+        """
+        Append an element to memory-mapped columns, if its kind is stored out of core
+
+        Mapped rows are not indexed by ID and their additions are not kept in
+        the change log, which would otherwise grow with the element count.
+
+        Args:
+            kind: Element kind
+            element: Model object to copy into the columns
+
+        Returns:
+            True if the element was stored in mapped columns
+        """
+        columns = getattr(self, kind)
+        if not isinstance(columns, MappedElementColumns):
+            return False
+
+        index = columns.append(element)
+        if self.spatial_index is not None:
+            self.spatial_index.insert(columns[index], kind)
+        self.version += 1
+
+        # Not in the change log, so the derived graphs cannot notice the add
+        self._connectivity_graph = None
+        self._containment_tree = None
+        return True
+
+    def is_out_of_core(self):
+        """
+        Check whether some elements are stored in memory-mapped columns
+
+        Returns:
+            True if the plan was created with a storage directory
+        """
+        return self.storage_dir is not None
+
+    def flush(self):
+        """Write pending changes of the memory-mapped columns to disk"""
+        for elements in self.get_elements_by_kind().values():
+            if isinstance(elements, MappedElementColumns):
+                elements.flush()
+
+    def remove_element(self, element):
+        """
+        Remove an element from the floor plan
+
+        Args:
+            element: Element to remove
+        """
+        self.remove_elements([element])
+
+    def remove_elements(self, elements):
+        """
+        Remove several elements from the floor plan in one pass
+
+        Args:
+            elements: List of elements to remove
+        """
+        removed = {id(element): element for element in elements}
+        if not removed:
+            return
+
+        for kind, kind_elements in self.get_elements_by_kind().items():
+            if isinstance(kind_elements, MappedElementColumns):
+                continue  # Mapped columns are append-only
+            if any(id(element) in removed for element in kind_elements):
+                kind_elements[:] = [element for element in kind_elements if id(element) not in removed]
+
+        for element in removed.values():
+            element_id = getattr(element, 'id', None)
+            if element_id and self.elements_by_id.get(element_id) is element:
+                del self.elements_by_id[element_id]
+            key = getattr(element, '_snapshot_key', None)
+            if key is not None and self._elements_by_key.get(key) is element:
+                del self._elements_by_key[key]
+            if self.spatial_index is not None:
+                self.spatial_index.remove(element)
+            if isinstance(element, TrackedElement):
+                element.attach(None)
+            self._dirty_elements.pop(id(element), None)
+
+            self.version += 1
+            self._log(Change(self.version, 'remove', element, None, None, None))
+
+    def _track(self, element):
+        """
+        Start recording changes of a newly added element
+
+        Args:
+            element: Element that was just added
+        """
+        if isinstance(element, TrackedElement):
+            element.attach(self)
+        self._assign_key(element)
+        self.version += 1
+        self._log(Change(self.version, 'add', element, None, None, None))
+        self._dirty_elements[id(element)] = element
+
+    def _assign_key(self, element):
+        """
+        Give a newly added element the key it is stored under in snapshots
+
+        Args:
+            element: Element of the plan (elements restored from a snapshot are
+                registered under their old key beforehand)
+        """
+        key = getattr(element, '_snapshot_key', None)
+        if key is not None and self._elements_by_key.get(key) is element:
+            return
+        key = self._next_element_key
+        self._next_element_key += 1
+        if isinstance(element, TrackedElement):
+            element._snapshot_key = key
+        self._elements_by_key[key] = element
+
+    def _record_change(self, element, attribute, old_value, new_value):
+        """
+        Record an attribute write on one of the plan's elements
+
+        Args:
+            element: Element that changed
+            attribute: Name of the attribute
+            old_value: Value before the write
+            new_value: Value after the write
+        """
+        self.version += 1
+        self._log(Change(self.version, 'update', element, attribute, old_value, new_value))
+        self._dirty_elements[id(element)] = element
+
+        if attribute in element.GEOMETRY_FIELDS:
+            self.update_element(element)
+
+    def _log(self, change):
+        """
+        Append an entry to the change log, dropping the oldest half when it is full
+
+        Args:
+            change: Change entry
+        """
+        log = self.change_log
+        log.append(change)
+        if len(log) > self.max_change_log:
+            drop = len(log) - self.max_change_log // 2
+            self._log_floor = log[drop - 1].version
+            del log[:drop]
+
+    def update_elements(self, elements, values):
+        """
+        Write new attribute values to many elements at once
+
+        The writes are not recorded attribute by attribute: the version moves
+        on once, and the log gets one 'update' entry (with no attribute) per
+        element that changed. Geometry is still rounded to the grid in integer
+        geometry mode, and the spatial index follows the moved elements.
+
+        Args:
+            elements: List of elements of the plan
+            values: Dictionary of attribute name -> list of new values, one per element
+
+        Returns:
+            List of the elements that changed
+        """
+        grid = self.grid
+        changed = []
+        for index, element in enumerate(elements):
+            if not isinstance(element, TrackedElement):
+                for name, column in values.items():
+                    setattr(element, name, column[index])
+                self.update_element(element)
+                continue
+
+            state = element.__dict__
+            geometry_fields = element.GEOMETRY_FIELDS
+            moved = updated = False
+            for name, column in values.items():
+                value = column[index]
+                if grid is not None and name in geometry_fields:
+                    value = grid.snap_value(name, value)
+                old_value = state.get(name)
+                if old_value is value or old_value == value:
+                    continue
+                state[name] = value
+                updated = True
+                moved = moved or name in geometry_fields
+            if not updated:
+                continue
+
+            if moved:
+                state.pop('_cache', None)
+                self.update_element(element)
+            state['_dirty'] = True
+            self._dirty_elements[id(element)] = element
+            changed.append(element)
+
+        if changed:
+            self.version += 1
+            for element in changed:
+                self._log(Change(self.version, 'update', element, None, None, None))
+        return changed
+
+    def tracks_changes_since(self, version):
+        """
+        Check whether the change log still holds every change after a version
+
+        Args:
+            version: Version returned earlier by `floor_plan.version`
+
+        Returns:
+            False if entries after the version were dropped from the log
+        """
+        return version >= self._log_floor
+
+    def changes_since(self, version):
+        """
+        Get the change log entries recorded after a version
+
+        Args:
+            version: Version returned earlier by `floor_plan.version`
+
+        Returns:
+            List of Change entries, oldest first (only the retained ones, see
+            tracks_changes_since())
+        """
+        start = bisect.bisect_right(self.change_log, version, key=lambda change: change.version)
+        return self.change_log[start:]
+
+    def changed_elements_since(self, version):
+        """
+        Get the distinct elements added or modified after a version
+
+        Args:
+            version: Version returned earlier by `floor_plan.version`
+
+        Returns:
+            List of elements in order of their first change, or every element
+            of the plan if the log no longer goes back to the version
+        """
+        if not self.tracks_changes_since(version):
+            return self.get_all_elements()
+        elements = {}
+        for change in self.changes_since(version):
+            elements.setdefault(id(change.element), change.element)
+        return list(elements.values())
+
+    def dirty_elements(self):
+        """
+        Get the elements that changed since the plan was last marked clean
+
+        Returns:
+            List of elements
+        """
+        return list(self._dirty_elements.values())
+
+    def mark_clean(self):
+        """
+        Clear all dirty flags
+
+        Returns:
+            Current version, to pass to changes_since() later
+        """
+        for element in self._dirty_elements.values():
+            if isinstance(element, TrackedElement):
+                element.mark_clean()
+        self._dirty_elements = {}
+        return self.version
+
+    def snapshot(self):
+        """
+        Get an immutable snapshot of the floor plan
+
+        The snapshot is derived from the previous one by re-recording only the
+        elements changed since then, so it shares every other element with
+        older snapshots and its cost grows with the edit rather than the plan.
+
+        Returns:
+            FloorPlanSnapshot of the current version
+        """
+        if self.is_out_of_core():
+            raise ValueError("Snapshots are not supported for out-of-core floor plans")
+
+        base = self._snapshot
+        if base is not None and base.version == self.version and base.header == self.header:
+            return base
+
+        if base is None or not self.tracks_changes_since(base.version):
+            elements = PersistentMap()
+            changed = self.get_all_elements()
+        else:
+            elements = base.elements
+            changed = self.changed_elements_since(base.version)
+
+        for element in changed:
+            key = getattr(element, '_snapshot_key', None)
+            if key is None:
+                raise ValueError(f"Element cannot be stored in a snapshot: {element!r}")
+            if self._elements_by_key.get(key) is element:
+                elements = elements.set(key, record_element(self._element_kind(element), element))
+            else:
+                elements = elements.delete(key)
+
+        self._snapshot = FloorPlanSnapshot(self.version, elements, self.header)
+        return self._snapshot
+
+    def restore(self, snapshot):
+        """
+        Bring the floor plan back to the state of a snapshot
+
+        Only the elements that differ from the current state are touched:
+        changed elements are updated in place, and elements missing from the
+        plan are recreated as new objects under their old keys. The restore is
+        itself recorded as a set of changes, so the version keeps increasing.
+
+        Args:
+            snapshot: FloorPlanSnapshot taken from this floor plan
+        """
+        current = self.snapshot()
+
+        removed = []
+        added = []
+        for key, own, target in current.changes_to(snapshot):
+            element = self._elements_by_key.get(key)
+            if target is None:
+                removed.append(element)
+            elif own is None:
+                added.append((key, target))
+            elif own.kind != target.kind or own.model_class is not target.model_class:
+                removed.append(element)
+                added.append((key, target))
+            else:
+                for name, value in restore_element(target).__dict__.items():
+                    if getattr(element, name, None) != value:
+                        setattr(element, name, value)
+
+        self.remove_elements(removed)
+        for key, record in sorted(added, key=lambda item: item[0]):
+            element = restore_element(record)
+            element._snapshot_key = key
+            self._elements_by_key[key] = element
+            elements = getattr(self, record.kind)
+            bisect.insort(elements, element, key=lambda item: item._snapshot_key)
+            if element.id:
+                self.elements_by_id[element.id] = element
+            if self.spatial_index is not None:
+                self.spatial_index.insert(element, record.kind)
+            self._track(element)
+
+        self.header = dict(snapshot.header) if snapshot.header else snapshot.header
+        self._snapshot = FloorPlanSnapshot(self.version, snapshot.elements, snapshot.header)
+
+    @staticmethod
+    def _element_kind(element):
+        """
+        Get the kind of list an element is stored in
+
+        Args:
+            element: Model object
+
+        Returns:
+            Element kind ('rooms', 'walls', 'doors', 'windows', 'furniture') or None
+        """
+        for cls in type(element).__mro__:
+            if cls.__name__ in KINDS_BY_CLASS:
+                return KINDS_BY_CLASS[cls.__name__]
+        return None
 
     def get_element_by_id(self, element_id):
         """
@@ -82,6 +586,196 @@ class FloorPlan:
         """
         return self.elements_by_id.get(element_id, None)
 
+    def get_spatial_index(self):
+        """
+        Get the spatial index of the floor plan, building it if needed
+
+        Returns:
+            SpatialIndex covering rooms, walls, doors, windows and furniture
+        """
+        if self.spatial_index is None:
+            self.spatial_index = SpatialIndex.build(self.get_elements_by_kind())
+        return self.spatial_index
+
+    def update_element(self, element):
+        """
+        Refresh the spatial index after an element was moved or resized
+
+        Args:
+            element: Element whose geometry changed
+        """
+        if self.spatial_index is not None:
+            self.spatial_index.update(element)
+
+    def query_point(self, x, y, kind=None):
+        """
+        Find the elements whose bounding box contains a point
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            kind: Optional element kind ('rooms', 'walls', 'doors', 'windows', 'furniture')
+
+        Returns:
+            List of elements
+        """
+        return self.get_spatial_index().query_point(x, y, kind)
+
+    def query_rect(self, min_x, min_y, max_x, max_y, kind=None, include_touching=True):
+        """
+        Find the elements whose bounding box overlaps a rectangle
+
+        Args:
+            min_x, min_y, max_x, max_y: Query rectangle
+            kind: Optional element kind
+            include_touching: Whether elements that only share an edge are included
+
+        Returns:
+            List of elements
+        """
+        return self.get_spatial_index().query_rect(min_x, min_y, max_x, max_y, kind, include_touching)
+
+    def nearest(self, x, y, k=1, kind=None):
+        """
+        Find the k elements whose centers are closest to a point
+
+        Args:
+            x: X coordinate
+            y: Y coordinate
+            k: Number of elements to return
+            kind: Optional element kind
+
+        Returns:
+            List of elements, closest first
+        """
+        return self.get_spatial_index().nearest(x, y, k, kind)
+
+    def get_containment_tree(self):
+        """
+        Get the parent/child hierarchy of the floor plan elements
+
+        Returns:
+            ContainmentTree, rebuilt only if an element was added, removed,
+            moved, resized or given another parent since the last call
+        """
+        tree = self._containment_tree
+        if tree is None or not tree.is_current():
+            tree = self._containment_tree = ContainmentTree(self)
+        return tree
+
+    def get_children(self, element, kind=None):
+        """
+        Get the elements directly contained in an element
+
+        Args:
+            element: Element or element ID
+            kind: Optional element kind ('rooms', 'walls', 'doors', 'windows', 'furniture')
+
+        Returns:
+            List of child elements
+        """
+        return self.get_containment_tree().get_children(element, kind)
+
+    def get_wall_graph(self, tolerance=1.0):
+        """
+        Get the graph of wall segments shared between rooms
+
+        Args:
+            tolerance: Maximum gap between two room edges of the same wall
+
+        Returns:
+            WallAdjacencyGraph, rebuilt only if the plan changed since the last call
+        """
+        key = (self.version, tolerance)
+        if self._wall_graph is None or self._wall_graph_key != key:
+            self._wall_graph = WallAdjacencyGraph(self.rooms, tolerance)
+            self._wall_graph_key = key
+        return self._wall_graph
+
+    def get_snap_index(self):
+        """
+        Get the index of room and wall coordinates that dragged elements snap to
+
+        Returns:
+            SnapIndex, rebuilt only if the plan changed since the last call
+        """
+        if self._snap_index is None or self._snap_index_version != self.version:
+            self._snap_index = SnapIndex(self.rooms, self.walls)
+            self._snap_index_version = self.version
+        return self._snap_index
+
+    def get_connectivity_graph(self):
+        """
+        Get the graph of rooms connected through doors
+
+        Returns:
+            ConnectivityGraph, reused (with its cached paths) until a room,
+            door or exit changes
+        """
+        graph = self._connectivity_graph
+        if graph is None or not graph.is_current():
+            graph = self._connectivity_graph = ConnectivityGraph(self)
+        return graph
+
+    def egress_distances(self):
+        """
+        Get the walking distance from every room to the nearest stairs or elevator
+
+        Returns:
+            Dictionary of room -> distance (math.inf when no exit is reachable)
+        """
+        return self.get_connectivity_graph().egress_distances()
+
+    def fingerprint(self):
+        """
+        Get a digest of the plan geometry that is stable across runs
+
+        Returns:
+            Hexadecimal digest computed on the plan's grid (or on a fine
+            default grid when the plan has none)
+        """
+        grid = self.grid or FixedPointGrid(DEFAULT_FINGERPRINT_RESOLUTION)
+        return grid.fingerprint(self.get_elements_by_kind(), self.header)
+
+    def footprint(self):
+        """
+        Get the exact area covered by the rooms, the area where rooms overlap
+        and the free area of the plan
+
+        Returns:
+            Footprint in plan units; the free area is measured against the
+            header size, or against the rooms' bounding box without a header
+        """
+        shapes = [room.get_corners() if room.points else
+                  (room.x, room.y, room.x + room.width, room.y + room.height)
+                  for room in self.rooms]
+        coverage = shape_coverage(shapes)
+
+        if self.header:
+            plan_area = self.header['width'] * self.header['height']
+        else:
+            box = self.to_columns('rooms').bounding_box()
+            plan_area = (box[2] - box[0]) * (box[3] - box[1]) if box else 0.0
+
+        return Footprint(coverage.union_area, coverage.overlap_area,
+                         max(0.0, plan_area - coverage.union_area),
+                         dict(zip(self.rooms, coverage.overlaps)))
+
+    def get_elements_by_kind(self):
+        """
+        Get all elements grouped by kind
+
+        Returns:
+            Dictionary of kind -> list of elements
+        """
+        return {
+            'rooms': self.rooms,
+            'walls': self.walls,
+            'doors': self.doors,
+            'windows': self.windows,
+            'furniture': self.furniture
+        }
+
     def get_all_elements(self):
         """
         Get all elements in the floor plan
@@ -89,7 +783,7 @@ class FloorPlan:
         Returns:
             List of all elements
         """
-        return self.rooms + self.walls + self.doors + self.windows + self.furniture
+        return [element for elements in self.get_elements_by_kind().values() for element in elements]
 
     def set_header(self, width, height):
         """
@@ -102,4 +796,143 @@ class FloorPlan:
         self.header = {
             'width': width,
             'height': height
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def from_columns(cls, columns_by_kind, walls=None, header=None):
+        """
+        Create a floor plan whose elements are views over columnar storage
+
+        Args:
+            columns_by_kind: Dictionary of kind -> ElementColumns
+            walls: Optional list of Wall objects
+            header: Optional header dictionary
+
+        Returns:
+            FloorPlan object
+        """
+        floor_plan = cls()
+        floor_plan.header = header
+        for kind, columns in columns_by_kind.items():
+            floor_plan.strings = columns.strings
+            views = columns.views()
+            setattr(floor_plan, kind, views)
+            for view in views:
+                element_id = view.id
+                if element_id:
+                    floor_plan.elements_by_id[element_id] = view
+        for wall in walls or []:
+            floor_plan.add_wall(wall)
+        return floor_plan
+
+    def to_columns(self, kind):
+        """
+        Get columnar storage for one kind of element
+
+        Column-backed kinds return their storage. Columns built from model
+        objects are cached until the version moves on, so they must be
+        treated as read-only.
+
+        Args:
+            kind: 'rooms', 'doors', 'windows' or 'furniture'
+
+        Returns:
+            ElementColumns object with one row per element
+        """
+        elements = getattr(self, kind)
+        columns = self._storage_columns(elements)
+        if columns is not None:
+            return columns
+
+        # Views written through write their columns without moving the version
+        if elements and isinstance(elements[0], ElementView):
+            return ElementColumns.from_elements(kind, elements, self.strings)
+
+        if self._columns_version != self.version:
+            self._columns = {}
+            self._columns_version = self.version
+        columns = self._columns.get(kind)
+        if columns is None:
+            columns = self._columns[kind] = ElementColumns.from_elements(kind, elements, self.strings)
+        return columns
+
+    @staticmethod
+    def _storage_columns(elements):
+        """
+        Get the columns an element list is stored in
+
+        Args:
+            elements: Element list of one kind
+
+        Returns:
+            The ElementColumns holding the elements in order (the list itself,
+            or the columns of a list of views made by from_columns()), or None
+        """
+        if isinstance(elements, ElementColumns):
+            return elements
+        if not elements or not isinstance(elements[0], ElementView):
+            return None
+        columns = elements[0]._columns
+        if len(columns) == len(elements) and all(
+                view._columns is columns and view._index == index for index, view in enumerate(elements)):
+            return columns
+        return None
+
+    def bounding_box(self):
+        """
+        Get the bounding box of all rectangular elements
+
+        Returns:
+            (min_x, min_y, max_x, max_y) tuple or None if the plan is empty
+        """
+        boxes = [self.to_columns(kind).bounding_box() for kind in KIND_SCHEMAS]
+        boxes = [box for box in boxes if box is not None]
+        if not boxes:
+            return None
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def total_room_area(self):
+        """
+        Get the summed footprint of all rooms in plan units
+
+        Returns:
+            Total room area
+        """
+        return float(self.to_columns('rooms').areas().sum())
+
+    def scale(self, factor):
+        """
+        Scale every element of the floor plan around the origin
+
+        Positions and every length scale: sizes, the distance of openings
+        along their wall, polygon outlines and wall ends and thickness.
+
+        Args:
+            factor: Scale factor
+        """
+        # Every element moves, so rebuilding the index is cheaper than updating it
+        self.spatial_index = None
+
+        for kind in KIND_SCHEMAS:
+            elements = getattr(self, kind)
+            columns = self._storage_columns(elements)
+            if columns is not None:
+                columns.scale(factor)
+                continue
+            scaled = ElementColumns.from_elements(kind, elements, self.strings)
+            scaled.scale(factor)
+            self.update_elements(elements, {name: scaled.column(name).tolist()
+                                            for name in ('x', 'y') + scaled.length_fields()})
+
+        polygon_rooms = [room for room in self.rooms if isinstance(room, TrackedElement) and room.points]
+        self.update_elements(polygon_rooms, {'points': [
+            tuple((x * factor, y * factor) for x, y in room.points) for room in polygon_rooms]})
+
+        walls = {id(wall): wall for wall in self.walls}
+        for room in self.rooms:
+            for wall in getattr(room, 'walls', None) or ():
+                walls.setdefault(id(wall), wall)
+        walls = list(walls.values())
+        self.update_elements(walls, {name: [getattr(wall, name) * factor for wall in walls]
+                                     for name in ('start_x', 'start_y', 'end_x', 'end_y', 'thickness')})
\ No newline at end of file
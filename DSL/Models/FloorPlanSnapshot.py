@@ -0,0 +1,208 @@
+import copy
+from collections import namedtuple
+
+from DSL.Models.PersistentMap import PersistentMap
+
+
+# Frozen state of one element: its kind, model class and public attributes
+ElementRecord = namedtuple('ElementRecord', ['kind', 'model_class', 'state'])
+
+# Attribute values that are copied so later in-place edits cannot leak into a record
+_MUTABLE_TYPES = (list, dict, set)
+
+
+def record_element(kind, element):
+    """
+    Capture the public attributes of an element
+
+    Args:
+        kind: Element kind ('rooms', 'walls', 'doors', 'windows', 'furniture')
+        element: Model object
+
+    Returns:
+        ElementRecord with the attributes as a sorted tuple of (name, value) pairs
+    """
+    state = tuple(sorted(
+        (name, copy.deepcopy(value) if isinstance(value, _MUTABLE_TYPES) else value)
+        for name, value in vars(element).items() if not name.startswith('_')))
+    return ElementRecord(kind, type(element), state)
+
+
+def restore_element(record):
+    """
+    Create a new model object from a record
+
+    Args:
+        record: ElementRecord
+
+    Returns:
+        Model object (not yet attached to a floor plan)
+    """
+    element = record.model_class.__new__(record.model_class)
+    for name, value in record.state:
+        object.__setattr__(element, name, copy.deepcopy(value) if isinstance(value, _MUTABLE_TYPES) else value)
+    return element
+
+
+class FloorPlanSnapshot:
+    """
+    Immutable state of a floor plan at one version.
+
+    Elements are stored in a PersistentMap keyed by the element key the plan
+    assigns on add, so consecutive snapshots share every element record and
+    trie node an edit did not touch.
+    """
+
+    __slots__ = ('version', 'elements', 'header')
+
+    def __init__(self, version, elements=None, header=None):
+        """
+        Create a snapshot
+
+        Args:
+            version: Floor plan version the snapshot was taken at
+            elements: PersistentMap of element key -> ElementRecord
+            header: Header dictionary or None
+        """
+        self.version = version
+        self.elements = elements if elements is not None else PersistentMap()
+        self.header = dict(header) if header else header
+
+    def __len__(self):
+        return len(self.elements)
+
+    def same_state(self, other):
+        """
+        Check whether two snapshots hold the same plan
+
+        Args:
+            other: FloorPlanSnapshot
+
+        Returns:
+            True if no element differs and the headers match
+        """
+        if self.header != other.header:
+            return False
+        if self.elements is other.elements:
+            return True
+        return next(self.elements.diff(other.elements), None) is None
+
+    def get_elements(self, kind=None):
+        """
+        Get the element records of the snapshot, in the order they were added
+
+        Args:
+            kind: Optional element kind
+
+        Returns:
+            List of ElementRecord objects
+        """
+        return [record for _, record in sorted(self.elements.items(), key=lambda item: item[0])
+                if kind is None or record.kind == kind]
+
+    def changes_to(self, other):
+        """
+        Get the elements that differ between this snapshot and another
+
+        Args:
+            other: FloorPlanSnapshot of the same plan
+
+        Returns:
+            List of (key, own record, other record) tuples, with None for an
+            element missing on one side
+        """
+        return list(self.elements.diff(other.elements))
+
+
+class FloorPlanHistory:
+    """
+    Undo/redo history of a floor plan.
+
+    Each committed step is a FloorPlanSnapshot, so keeping many versions only
+    costs the elements each edit touched. Moving through the history restores
+    the plan by applying the differences between two snapshots.
+    """
+
+    def __init__(self, floor_plan, limit=None):
+        """
+        Start recording the history of a floor plan
+
+        Args:
+            floor_plan: FloorPlan object
+            limit: Maximum number of snapshots kept (None for no limit)
+        """
+        self.floor_plan = floor_plan
+        self.limit = limit
+        self.snapshots = [floor_plan.snapshot()]
+        self.position = 0
+
+    @property
+    def current(self):
+        """Snapshot the plan was last committed or restored to"""
+        return self.snapshots[self.position]
+
+    def can_undo(self):
+        """Whether there is an earlier snapshot to go back to"""
+        return self.position > 0
+
+    def can_redo(self):
+        """Whether there is an undone snapshot to go forward to"""
+        return self.position < len(self.snapshots) - 1
+
+    def commit(self):
+        """
+        Record the current state of the plan as a new step
+
+        Undone steps are discarded. Nothing is recorded if the plan did not
+        change since the current step.
+
+        Returns:
+            FloorPlanSnapshot of the current state
+        """
+        snapshot = self.floor_plan.snapshot()
+        if snapshot.same_state(self.current):
+            return self.current
+
+        del self.snapshots[self.position + 1:]
+        self.snapshots.append(snapshot)
+        if self.limit is not None and len(self.snapshots) > self.limit:
+            del self.snapshots[:len(self.snapshots) - self.limit]
+        self.position = len(self.snapshots) - 1
+        return snapshot
+
+    def undo(self):
+        """
+        Go back one step, discarding uncommitted edits
+
+        Returns:
+            FloorPlanSnapshot restored, or None if there is nothing to undo
+        """
+        if not self.can_undo():
+            return None
+        return self.go_to(self.position - 1)
+
+    def redo(self):
+        """
+        Go forward one undone step
+
+        Returns:
+            FloorPlanSnapshot restored, or None if there is nothing to redo
+        """
+        if not self.can_redo():
+            return None
+        return self.go_to(self.position + 1)
+
+    def go_to(self, position):
+        """
+        Restore the plan to one of the recorded steps
+
+        Args:
+            position: Index into `snapshots`
+
+        Returns:
+            FloorPlanSnapshot restored
+        """
+        snapshot = self.snapshots[position]
+        self.floor_plan.restore(snapshot)
+        self.position = position
+        return snapshot
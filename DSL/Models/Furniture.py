@@ -1,4 +1,7 @@
-class Furniture:
+from DSL.Models.TrackedElement import TrackedElement
+
+
+class Furniture(TrackedElement):
     """
     Base class for furniture items in the floor plan
     """
@@ -28,6 +31,7 @@ class Furniture:
         self.rotation = 0  # Rotation in degrees
         self.parent_id = None  # ID of the parent room
         self.layer = 0  # Layer for rendering order
+        self.auto_place = False  # Packed into the parent room by the layout
 
     def set_position(self, x, y):
         """
@@ -77,6 +81,8 @@ class Furniture:
         if debug:
             print(f"Creating furniture of type: {self.furniture_type}")
 
+        position_given = False
+
         # Process each property
         for prop in structure_node.properties:
             # Get the literal token value (the property name as it appears in the DSL)
@@ -102,6 +108,7 @@ class Furniture:
                     try:
                         self.x = float(prop.value.elements[0].value)
                         self.y = float(prop.value.elements[1].value)
+                        position_given = True
                         if debug:
                             print(f"Furniture position: ({self.x}, {self.y})")
                     except (ValueError, AttributeError) as e:
@@ -160,6 +167,8 @@ class Furniture:
                     if debug:
                         print(f"Furniture color: {self.color}")
 
+        # Furniture without a position is placed in its room by the layout
+        self.auto_place = not position_given and self.parent_id is not None
         return self
 
     @classmethod
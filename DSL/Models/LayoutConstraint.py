@@ -0,0 +1,121 @@
+class LayoutConstraint:
+    """
+    Relation between rooms, solved by the layout instead of hand-computed
+    coordinates (e.g. "kitchen is right of living, aligned top")
+    """
+
+    # Placement of a room next to the one after it, `gap` apart
+    DIRECTIONS = ('left_of', 'right_of', 'above', 'below')
+
+    # Edges or centers of the rooms that line up
+    ALIGNMENTS = ('align_left', 'align_right', 'align_top', 'align_bottom',
+                  'align_center_x', 'align_center_y')
+
+    # Dimensions the rooms share
+    SIZES = ('same_width', 'same_height', 'same_size')
+
+    RELATIONS = DIRECTIONS + ALIGNMENTS + SIZES
+
+    # Strengths, strongest first; room positions written in the code are weaker
+    STRENGTHS = ('required', 'strong', 'medium', 'weak')
+
+    def __init__(self, id=None, relation=None, rooms=None, gap=0, strength='required'):
+        """
+        Initialize a constraint
+
+        Args:
+            id: Unique identifier (used to edit or remove the constraint)
+            relation: One of RELATIONS
+            rooms: IDs of the related rooms; each room is related to the next
+                one (e.g. ["kitchen", "living"] with "right_of" puts the
+                kitchen right of the living room)
+            gap: Distance between rooms placed next to each other
+            strength: One of STRENGTHS
+        """
+        self.id = id
+        self.relation = relation
+        self.rooms = list(rooms or [])
+        self.gap = gap
+        self.strength = strength
+
+    def pairs(self):
+        """
+        Get the related rooms two by two
+
+        Returns:
+            List of (room ID, next room ID) tuples
+        """
+        return list(zip(self.rooms, self.rooms[1:]))
+
+    def is_valid(self):
+        """Check that the relation and strength are known and at least two rooms are related"""
+        return self.relation in self.RELATIONS and self.strength in self.STRENGTHS and len(self.rooms) >= 2
+
+    def key(self):
+        """
+        Get the values that define the constraint
+
+        Returns:
+            Tuple usable in hashes and comparisons
+        """
+        return (self.id, self.relation, tuple(self.rooms), self.gap, self.strength)
+
+    def from_dsl_structure(self, structure_node):
+        """
+        Create a LayoutConstraint from a DSL structure node
+
+        Args:
+            structure_node: StructureStatementNode from the AST
+
+        Returns:
+            Self for chaining
+        """
+        debug = True  # Enable debug output
+
+        # Process each property
+        for prop in structure_node.properties:
+            # Get the literal token value (the property name as it appears in the DSL)
+            prop_literal = prop.token.literal.lower() if hasattr(prop.token, 'literal') else ""
+
+            if debug:
+                print(f"Processing constraint property: {prop_literal}")
+
+            if prop_literal == "id":
+                if hasattr(prop.value, 'value'):
+                    self.id = prop.value.value.strip('"\'')
+
+            elif prop_literal == "relation":
+                if hasattr(prop.value, 'value'):
+                    self.relation = str(prop.value.value).strip('"\'').lower()
+                    if debug:
+                        print(f"Constraint relation: {self.relation}")
+
+            elif prop_literal == "rooms":
+                if hasattr(prop.value, 'elements') and prop.value.elements:
+                    self.rooms = [str(element.value).strip('"\'') for element in prop.value.elements
+                                  if hasattr(element, 'value')]
+                    if debug:
+                        print(f"Constraint rooms: {self.rooms}")
+
+            elif prop_literal == "gap":
+                if hasattr(prop.value, 'value'):
+                    try:
+                        self.gap = float(prop.value.value)
+                    except (ValueError, TypeError) as e:
+                        if debug:
+                            print(f"Error parsing constraint gap: {e}")
+                elif hasattr(prop.value, 'value_expr'):
+                    try:
+                        self.gap = float(prop.value.value_expr.value)
+                    except (ValueError, TypeError, AttributeError) as e:
+                        if debug:
+                            print(f"Error parsing constraint gap: {e}")
+
+            elif prop_literal == "strength":
+                if hasattr(prop.value, 'value'):
+                    self.strength = str(prop.value.value).strip('"\'').lower()
+
+        if not self.is_valid():
+            print(f"Warning: Ignoring invalid constraint {self.id!r}: relation {self.relation!r}, "
+                  f"rooms {self.rooms}, strength {self.strength!r}")
+        return self
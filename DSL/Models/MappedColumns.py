@@ -0,0 +1,283 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from DSL.Models.ElementColumns import ElementColumns, ElementView, StringTable
+
+
+def _map_file(path, dtype, capacity):
+    """
+    Map a file as a writable array, growing the file if needed
+
+    Args:
+        path: File path
+        dtype: NumPy dtype of the array
+        capacity: Number of items
+
+    Returns:
+        numpy.memmap of `capacity` items (new bytes read as zero)
+    """
+    size = np.dtype(dtype).itemsize * capacity
+    with open(path, 'ab') as f:
+        if f.tell() < size:
+            f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode='r+', shape=(capacity,))
+
+
+def _spread_bits(values):
+    """Insert a zero bit between each of the low 32 bits of every value"""
+    values = values.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    values = (values | (values << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    values = (values | (values << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    values = (values | (values << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    values = (values | (values << np.uint64(2))) & np.uint64(0x3333333333333333)
+    values = (values | (values << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return values
+
+
+class MappedStringTable(StringTable):
+    """
+    String table whose strings live in a file instead of a Python list.
+
+    Strings are appended to a data file and located through a memory-mapped
+    offset array. Only the most recently used strings are kept in memory, so
+    repeated values (types, labels) are still interned once while unique ids
+    cost disk space rather than memory.
+    """
+
+    def __init__(self, path, cache_size=4096):
+        """
+        Initialize an empty mapped string table
+
+        Args:
+            path: Path prefix of the table files
+            cache_size: Number of strings kept in memory
+        """
+        self.path = path
+        self.cache_size = cache_size
+        self.size = 0
+        self.capacity = 0
+        self.offsets = None
+
+        # Bounded LRU caches: string -> code and code -> string
+        self.codes = OrderedDict()
+        self._recent = OrderedDict()
+
+        self._data = open(path + '.data', 'w+b')
+        self._data_size = 0
+        self._unflushed = False
+        self._reserve(1024)
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, capacity):
+        """Make sure the offset array can hold `capacity` strings"""
+        if capacity <= self.capacity:
+            return
+        self.capacity = max(capacity, self.capacity * 2)
+        self.offsets = _map_file(self.path + '.offsets', np.int64, self.capacity + 1)
+
+    def _remember(self, value, code):
+        """Put a string in the in-memory caches"""
+        for cache, key, item in ((self.codes, value, code), (self._recent, code, value)):
+            cache[key] = item
+            cache.move_to_end(key)
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+
+    def intern(self, value):
+        """
+        Get the code for a string, adding it to the table if needed
+
+        Args:
+            value: String to intern (None is encoded as -1)
+
+        Returns:
+            Integer code of the string
+        """
+        if value is None:
+            return -1
+
+        value = str(value)
+        code = self.codes.get(value)
+        if code is None:
+            encoded = value.encode('utf-8')
+            code = self.size
+            self._reserve(code + 2)
+            self._data.write(encoded)
+            self._data_size += len(encoded)
+            self._unflushed = True
+            self.offsets[code + 1] = self._data_size
+            self.size += 1
+        self._remember(value, code)
+        return code
+
+    def lookup(self, code):
+        """
+        Get the string for a code
+
+        Args:
+            code: Integer code returned by intern()
+
+        Returns:
+            The string or None for -1
+        """
+        code = int(code)
+        if code < 0:
+            return None
+
+        value = self._recent.get(code)
+        if value is None:
+            if self._unflushed:
+                self._data.flush()
+                self._unflushed = False
+            start, end = int(self.offsets[code]), int(self.offsets[code + 1])
+            value = os.pread(self._data.fileno(), end - start, start).decode('utf-8')
+        self._remember(value, code)
+        return value
+
+    def close(self):
+        """Close the data file"""
+        self._data.close()
+
+
+class MappedElementColumns(ElementColumns):
+    """
+    Element columns stored in memory-mapped files.
+
+    Every column is a numpy.memmap over its own file in a storage directory,
+    so the operating system pages rows in and out as they are used and the
+    resident memory does not grow with the number of elements. Growing the
+    columns extends the files in place instead of copying the arrays.
+    """
+
+    def __init__(self, kind, storage_dir, strings=None, capacity=4096):
+        """
+        Initialize empty mapped columns
+
+        Args:
+            kind: Element kind ('doors', 'windows' or 'furniture')
+            storage_dir: Directory holding the column files (created if needed)
+            strings: Shared string table (a MappedStringTable is created if None)
+            capacity: Initial number of rows to allocate
+        """
+        os.makedirs(storage_dir, exist_ok=True)
+        self.storage_dir = storage_dir
+        if strings is None:
+            strings = MappedStringTable(os.path.join(storage_dir, f'{kind}.strings'))
+        super().__init__(kind, strings, capacity)
+
+    def _path(self, name):
+        """Get the file path of a column"""
+        return os.path.join(self.storage_dir, f'{self.kind}.{name}.bin')
+
+    def _allocate(self, name, dtype, capacity):
+        """
+        Map the backing file of one column
+
+        Args:
+            name: Column name
+            dtype: NumPy dtype of the column
+            capacity: Number of rows
+
+        Returns:
+            numpy.memmap over the column file
+        """
+        return _map_file(self._path(name), dtype, capacity)
+
+    def _reserve(self, capacity):
+        """
+        Make sure the columns can hold at least `capacity` rows
+
+        Args:
+            capacity: Required number of rows
+        """
+        if capacity <= self.capacity:
+            return
+
+        new_capacity = max(capacity, self.capacity * 2)
+        for name in self.numeric_fields + self.string_fields:
+            # The file keeps the existing rows; only the mapping is enlarged
+            old = self.arrays.pop(name, None)
+            if old is not None:
+                old.flush()
+            array = self._allocate(name, self._dtype(name), new_capacity)
+            if name in self.string_fields:
+                array[self.capacity:] = -1
+            self.arrays[name] = array
+        self.capacity = new_capacity
+
+    def extend(self, elements, chunk_size=65536):
+        """
+        Append many model objects, a chunk at a time
+
+        Args:
+            elements: Iterable of model objects of this kind
+            chunk_size: Number of objects converted per batch
+        """
+        chunk = []
+        for element in elements:
+            chunk.append(element)
+            if len(chunk) == chunk_size:
+                super().extend(chunk)
+                chunk = []
+        if chunk:
+            super().extend(chunk)
+
+    def spatial_order(self, chunk_size=65536):
+        """
+        Sort the rows along a Z-order (Morton) curve of their centers
+
+        Keys are computed a chunk at a time into a mapped file and sorted in
+        place there, so elements that are close on the plan end up close in
+        the result without holding all keys in memory.
+
+        Args:
+            chunk_size: Number of rows processed per batch
+
+        Returns:
+            numpy.memmap of row indices in spatial order
+        """
+        order_dtype = np.dtype([('key', np.uint64), ('index', np.int64)])
+        order = np.memmap(os.path.join(self.storage_dir, f'{self.kind}.order.bin'),
+                          dtype=order_dtype, mode='w+', shape=(max(1, self.size),))[:self.size]
+        if self.size == 0:
+            return order['index']
+
+        min_x, min_y, max_x, max_y = self.bounding_box()
+        span_x = max(max_x - min_x, 1e-9)
+        span_y = max(max_y - min_y, 1e-9)
+
+        for start in range(0, self.size, chunk_size):
+            end = min(start + chunk_size, self.size)
+            center_x = self.arrays['x'][start:end] + self.arrays['width'][start:end] / 2
+            center_y = self.arrays['y'][start:end] + self.arrays['height'][start:end] / 2
+            cell_x = ((center_x - min_x) / span_x * 0xFFFF).astype(np.uint64)
+            cell_y = ((center_y - min_y) / span_y * 0xFFFF).astype(np.uint64)
+            order['key'][start:end] = _spread_bits(cell_x) | (_spread_bits(cell_y) << np.uint64(1))
+            order['index'][start:end] = np.arange(start, end)
+
+        order.sort(order=['key', 'index'])
+        return order['index']
+
+    def iter_spatial(self, chunk_size=65536):
+        """
+        Iterate over the rows in spatial order
+
+        Args:
+            chunk_size: Number of indices read from the order file at a time
+
+        Yields:
+            ElementView objects
+        """
+        order = self.spatial_order(chunk_size)
+        for start in range(0, len(order), chunk_size):
+            for index in order[start:start + chunk_size].tolist():
+                yield ElementView(self, index)
+
+    def flush(self):
+        """Write pending changes of every column to disk"""
+        for array in self.arrays.values():
+            array.flush()
\ No newline at end of file
@@ -0,0 +1,332 @@
+# Bits of the key hash consumed per trie level (32-way branching)
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+
+
+def _hash(key):
+    """Hash a key to an unsigned 64-bit integer"""
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+class _Leaf:
+    """One key/value pair stored in the trie"""
+
+    __slots__ = ('hash', 'key', 'value')
+
+    def __init__(self, key_hash, key, value):
+        self.hash = key_hash
+        self.key = key
+        self.value = value
+
+
+class _CollisionNode:
+    """Leaves whose keys share the full hash"""
+
+    __slots__ = ('hash', 'leaves')
+
+    def __init__(self, key_hash, leaves):
+        self.hash = key_hash
+        self.leaves = leaves
+
+    def find(self, key_hash, key, shift):
+        for leaf in self.leaves:
+            if leaf.key == key:
+                return leaf
+        return None
+
+    def assoc(self, leaf, shift):
+        """Return (node, added) with the leaf inserted or replaced"""
+        leaves = list(self.leaves)
+        for i, existing in enumerate(leaves):
+            if existing.key == leaf.key:
+                leaves[i] = leaf
+                return _CollisionNode(self.hash, tuple(leaves)), False
+        leaves.append(leaf)
+        return _CollisionNode(self.hash, tuple(leaves)), True
+
+    def without(self, key_hash, key, shift):
+        """Return the node with a key removed (None if it becomes empty)"""
+        leaves = tuple(leaf for leaf in self.leaves if leaf.key != key)
+        if len(leaves) == len(self.leaves):
+            return self
+        if len(leaves) == 1:
+            return leaves[0]
+        return _CollisionNode(self.hash, leaves) if leaves else None
+
+    def iter_leaves(self):
+        yield from self.leaves
+
+
+class _BitmapNode:
+    """Trie node holding up to 32 entries, indexed by a population bitmap"""
+
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def _position(self, bit):
+        return bin(self.bitmap & (bit - 1)).count('1')
+
+    def entry(self, fragment):
+        """Get the entry for a 5-bit hash fragment, or None"""
+        bit = 1 << fragment
+        if not self.bitmap & bit:
+            return None
+        return self.entries[self._position(bit)]
+
+    def find(self, key_hash, key, shift):
+        entry = self.entry((key_hash >> shift) & _MASK)
+        if entry is None:
+            return None
+        if isinstance(entry, _Leaf):
+            return entry if entry.key == key else None
+        return entry.find(key_hash, key, shift + _BITS)
+
+    def assoc(self, leaf, shift):
+        """Return (node, added) with the leaf inserted or replaced"""
+        bit = 1 << ((leaf.hash >> shift) & _MASK)
+        position = self._position(bit)
+
+        if not self.bitmap & bit:
+            entries = self.entries[:position] + (leaf,) + self.entries[position:]
+            return _BitmapNode(self.bitmap | bit, entries), True
+
+        entry = self.entries[position]
+        if isinstance(entry, _Leaf):
+            if entry.key == leaf.key:
+                replacement, added = leaf, False
+            else:
+                replacement, added = _merge_leaves(entry, leaf, shift + _BITS), True
+        else:
+            replacement, added = entry.assoc(leaf, shift + _BITS)
+
+        entries = self.entries[:position] + (replacement,) + self.entries[position + 1:]
+        return _BitmapNode(self.bitmap, entries), added
+
+    def without(self, key_hash, key, shift):
+        """Return the node with a key removed (None if it becomes empty)"""
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return self
+
+        position = self._position(bit)
+        entry = self.entries[position]
+        if isinstance(entry, _Leaf):
+            if entry.key != key:
+                return self
+            replacement = None
+        else:
+            replacement = entry.without(key_hash, key, shift + _BITS)
+            if replacement is entry:
+                return self
+
+        if replacement is None:
+            entries = self.entries[:position] + self.entries[position + 1:]
+            if not entries:
+                return None
+            # A single remaining leaf moves up to the parent
+            if len(entries) == 1 and isinstance(entries[0], _Leaf) and shift > 0:
+                return entries[0]
+            return _BitmapNode(self.bitmap & ~bit, entries)
+
+        entries = self.entries[:position] + (replacement,) + self.entries[position + 1:]
+        return _BitmapNode(self.bitmap, entries)
+
+    def iter_leaves(self):
+        for entry in self.entries:
+            if isinstance(entry, _Leaf):
+                yield entry
+            else:
+                yield from entry.iter_leaves()
+
+
+def _merge_leaves(first, second, shift):
+    """Build the smallest subtree holding two leaves with different keys"""
+    if first.hash == second.hash or shift >= _HASH_BITS:
+        return _CollisionNode(first.hash, (first, second))
+
+    first_fragment = (first.hash >> shift) & _MASK
+    second_fragment = (second.hash >> shift) & _MASK
+    if first_fragment == second_fragment:
+        return _BitmapNode(1 << first_fragment, (_merge_leaves(first, second, shift + _BITS),))
+
+    entries = (first, second) if first_fragment < second_fragment else (second, first)
+    return _BitmapNode((1 << first_fragment) | (1 << second_fragment), entries)
+
+
+def _leaves(entry):
+    """Iterate over the leaves below an entry"""
+    if entry is None:
+        return iter(())
+    if isinstance(entry, _Leaf):
+        return iter((entry,))
+    return entry.iter_leaves()
+
+
+class PersistentMap:
+    """
+    Immutable hash map with structural sharing (a hash array mapped trie).
+
+    Every update returns a new map that shares all untouched nodes with the
+    old one, so an update costs O(log32 n) time and memory and old versions
+    stay valid. Comparing two related maps only walks the nodes they do not
+    share.
+    """
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, items=None):
+        """
+        Create a map
+
+        Args:
+            items: Optional dictionary or iterable of (key, value) pairs
+        """
+        self._root = _BitmapNode(0, ())
+        self._size = 0
+        if items:
+            pairs = items.items() if isinstance(items, dict) else items
+            for key, value in pairs:
+                leaf = _Leaf(_hash(key), key, value)
+                self._root, added = self._root.assoc(leaf, 0)
+                self._size += added
+
+    @classmethod
+    def _make(cls, root, size):
+        result = cls.__new__(cls)
+        result._root = root
+        result._size = size
+        return result
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return self._root.find(_hash(key), key, 0) is not None
+
+    def __iter__(self):
+        for leaf in self._root.iter_leaves():
+            yield leaf.key
+
+    def __getitem__(self, key):
+        leaf = self._root.find(_hash(key), key, 0)
+        if leaf is None:
+            raise KeyError(key)
+        return leaf.value
+
+    def get(self, key, default=None):
+        """
+        Get the value of a key
+
+        Args:
+            key: Key to look up
+            default: Value returned when the key is missing
+
+        Returns:
+            The stored value or `default`
+        """
+        leaf = self._root.find(_hash(key), key, 0)
+        return leaf.value if leaf is not None else default
+
+    def items(self):
+        """Iterate over (key, value) pairs"""
+        for leaf in self._root.iter_leaves():
+            yield leaf.key, leaf.value
+
+    def values(self):
+        """Iterate over the values"""
+        for leaf in self._root.iter_leaves():
+            yield leaf.value
+
+    def set(self, key, value):
+        """
+        Get a copy of the map with a key set
+
+        Args:
+            key: Key to set
+            value: New value
+
+        Returns:
+            New PersistentMap (the map itself if the value is already stored)
+        """
+        key_hash = _hash(key)
+        current = self._root.find(key_hash, key, 0)
+        if current is not None and current.value is value:
+            return self
+        root, added = self._root.assoc(_Leaf(key_hash, key, value), 0)
+        return PersistentMap._make(root, self._size + added)
+
+    def delete(self, key):
+        """
+        Get a copy of the map without a key
+
+        Args:
+            key: Key to remove
+
+        Returns:
+            New PersistentMap (the map itself if the key is missing)
+        """
+        root = self._root.without(_hash(key), key, 0)
+        if root is self._root:
+            return self
+        if root is None:
+            root = _BitmapNode(0, ())
+        elif isinstance(root, _Leaf):
+            root = _BitmapNode(1 << (root.hash & _MASK), (root,))
+        return PersistentMap._make(root, self._size - 1)
+
+    def diff(self, other):
+        """
+        Compare the map with another version of it
+
+        Subtrees the two maps share are skipped, so the cost depends on the
+        number of differences rather than the size of the maps. Values are
+        compared by identity.
+
+        Args:
+            other: PersistentMap to compare against
+
+        Yields:
+            (key, own value, other value) tuples, with None for a missing key
+        """
+        yield from _diff_entries(self._root, other._root, 0)
+
+
+def _diff_entries(first, second, shift):
+    """Yield the differences between two trie entries at the same depth"""
+    if first is second:
+        return
+
+    if isinstance(first, _BitmapNode) and isinstance(second, _BitmapNode):
+        bitmap = first.bitmap | second.bitmap
+        while bitmap:
+            bit = bitmap & -bitmap
+            bitmap ^= bit
+            fragment = bit.bit_length() - 1
+            first_entry = first.entry(fragment)
+            second_entry = second.entry(fragment)
+            if first_entry is second_entry:
+                continue
+            if isinstance(first_entry, _BitmapNode) and isinstance(second_entry, _BitmapNode):
+                yield from _diff_entries(first_entry, second_entry, shift + _BITS)
+            else:
+                yield from _diff_leaves(_leaves(first_entry), _leaves(second_entry))
+        return
+
+    yield from _diff_leaves(_leaves(first), _leaves(second))
+
+
+def _diff_leaves(first_leaves, second_leaves):
+    """Yield the differences between two small sets of leaves"""
+    first = {leaf.key: leaf.value for leaf in first_leaves}
+    second = {leaf.key: leaf.value for leaf in second_leaves}
+    for key, value in first.items():
+        other = second.get(key)
+        if other is not value or key not in second:
+            yield key, value, other
+    for key, value in second.items():
+        if key not in first:
+            yield key, None, value
\ No newline at end of file
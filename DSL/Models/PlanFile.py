@@ -0,0 +1,378 @@
+import math
+import mmap
+import struct
+
+import numpy as np
+
+from DSL.Models.ElementColumns import ElementColumns, StringTable, KIND_SCHEMAS
+from DSL.Models.ContainmentTree import ContainmentTree
+from DSL.Models.Wall import Wall
+
+
+# File signature and format version (bumped on incompatible layout changes)
+MAGIC = b'PLAN'
+FORMAT_VERSION = 1
+
+# Magic, version, flags, section count, plan width, plan height (NaN without a header)
+_HEADER = struct.Struct('<4sHHIdd4x')
+
+# Section name, NumPy dtype string, byte offset, item count
+_SECTION = struct.Struct('<32s8sQQ')
+
+# Sections start on 8-byte boundaries so every column can be viewed in place
+_ALIGNMENT = 8
+
+# Attributes stored next to the ElementColumns schema: nullable numbers, strings
+EXTRA_FIELDS = {
+    'rooms': (('border_width',), ('color', 'border_color')),
+    'doors': ((), ()),
+    'windows': ((), ()),
+    'furniture': ((), ('color',)),
+}
+
+# Wall columns: numeric fields, string fields
+WALL_FIELDS = (('start_x', 'start_y', 'end_x', 'end_y', 'thickness'), ('id', 'color', 'parent_id'))
+
+
+class BufferStringTable(StringTable):
+    """
+    String table read from a plan file.
+
+    Strings are decoded from the UTF-8 data section when first looked up, so
+    loading does not depend on the number of strings. The code dictionary
+    needed to intern new strings is built on first use.
+    """
+
+    def __init__(self, offsets, data):
+        """
+        Wrap the string sections of a plan file
+
+        Args:
+            offsets: Array of n + 1 byte offsets into `data`
+            data: Buffer holding the UTF-8 encoded strings
+        """
+        self.offsets = offsets
+        self.data = data
+        self.size = len(offsets) - 1
+        self._decoded = {}
+        self._strings = None
+        self._codes = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def strings(self):
+        """List of all strings (decoded on first access)"""
+        if self._strings is None:
+            self._strings = [self.lookup(code) for code in range(self.size)]
+        return self._strings
+
+    @property
+    def codes(self):
+        """Dictionary of string -> code (built on first access)"""
+        if self._codes is None:
+            self._codes = {value: code for code, value in enumerate(self.strings)}
+        return self._codes
+
+    def intern(self, value):
+        code = super().intern(value)
+        self.size = len(self._strings)
+        return code
+
+    def lookup(self, code):
+        code = int(code)
+        if code < 0:
+            return None
+        if self._strings is not None:
+            return self._strings[code]
+
+        value = self._decoded.get(code)
+        if value is None:
+            start, end = int(self.offsets[code]), int(self.offsets[code + 1])
+            value = self._decoded[code] = str(self.data[start:end], 'utf-8')
+        return value
+
+
+class BufferColumns(ElementColumns):
+    """
+    ElementColumns whose arrays are views into a plan file buffer.
+
+    Besides the schema columns it serves the extra attributes stored in the
+    file: nullable numbers (NaN reads as None) and variable-length fields
+    such as polygon points, read from offset/value array pairs. Appending
+    rows copies the arrays out of the buffer as usual.
+    """
+
+    def __init__(self, kind, strings, arrays, size, string_fields, nullable_fields=(), ragged=None):
+        """
+        Wrap the columns of one element kind
+
+        Args:
+            kind: Element kind
+            strings: StringTable the string codes refer to
+            arrays: Dictionary of column name -> array of `size` rows
+            size: Number of rows
+            string_fields: Columns holding string codes
+            nullable_fields: Numeric columns where NaN stands for None
+            ragged: Dictionary of name -> (offsets, values, convert) for
+                variable-length fields; `convert` turns a slice of `values`
+                into the attribute value
+        """
+        super().__init__(kind, strings, capacity=1)
+        self.string_fields = tuple(name for name in arrays if name in string_fields)
+        self.numeric_fields = tuple(name for name in arrays if name not in self.string_fields)
+        self.arrays = dict(arrays)
+        self.size = self.capacity = size
+        self.nullable_fields = nullable_fields
+        self.ragged = ragged or {}
+
+    def get_value(self, index, name):
+        if name in self.ragged:
+            offsets, values, convert = self.ragged[name]
+            if index + 1 < len(offsets) and offsets[index + 1] > offsets[index]:
+                return convert(values[offsets[index]:offsets[index + 1]])
+
+        value = super().get_value(index, name)
+        if name in self.nullable_fields and math.isnan(value):
+            return None
+        return value
+
+
+class _Writer:
+    """Collects the sections of a plan file"""
+
+    def __init__(self):
+        self.sections = []
+
+    def add(self, name, array):
+        """
+        Add one section
+
+        Args:
+            name: Section name (at most 32 ASCII characters)
+            array: One-dimensional NumPy array
+        """
+        array = np.ascontiguousarray(array)
+        self.sections.append((name, array.dtype.newbyteorder('<'), array))
+
+    def to_bytes(self, header):
+        """
+        Lay out the header, section table and sections
+
+        Args:
+            header: Header dictionary of the plan or None
+
+        Returns:
+            bytes of the whole file
+        """
+        width = header['width'] if header else math.nan
+        height = header['height'] if header else math.nan
+
+        offset = _HEADER.size + _SECTION.size * len(self.sections)
+        table = []
+        for name, dtype, array in self.sections:
+            offset += -offset % _ALIGNMENT
+            table.append(_SECTION.pack(name.encode('ascii'), dtype.str.encode('ascii'), offset, len(array)))
+            offset += array.nbytes
+
+        parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.sections), width, height)] + table
+        position = _HEADER.size + _SECTION.size * len(self.sections)
+        for name, dtype, array in self.sections:
+            padding = -position % _ALIGNMENT
+            parts.append(b'\0' * padding)
+            parts.append(array.astype(dtype, copy=False).tobytes())
+            position += padding + array.nbytes
+        return b''.join(parts)
+
+
+def _ragged(values_per_row, dtype):
+    """
+    Flatten variable-length rows into offsets and values
+
+    Args:
+        values_per_row: List of lists of values
+        dtype: dtype of the values
+
+    Returns:
+        (offsets, values) arrays
+    """
+    lengths = [len(values) for values in values_per_row]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    flat = [value for values in values_per_row for value in values]
+    return offsets, np.array(flat, dtype=dtype)
+
+
+def dump_floor_plan(floor_plan):
+    """
+    Serialize a floor plan to the binary plan format
+
+    The file holds a fixed header (magic, format version, plan size), a
+    section table and one typed array per section: geometry columns of every
+    element kind, interned string codes, the string table, variable-length
+    fields (polygon points, room walls) and the parent index of the
+    containment hierarchy.
+
+    Args:
+        floor_plan: FloorPlan object
+
+    Returns:
+        bytes of the file
+    """
+    writer = _Writer()
+    strings = StringTable()
+    elements_by_kind = floor_plan.get_elements_by_kind()
+    wall_indices = {id(wall): index for index, wall in enumerate(floor_plan.walls)}
+
+    for kind in KIND_SCHEMAS:
+        elements = list(elements_by_kind[kind])
+        columns = ElementColumns.from_elements(kind, elements, strings)
+        nullable_fields, extra_strings = EXTRA_FIELDS[kind]
+        for name in columns.numeric_fields + columns.string_fields:
+            writer.add(f'{kind}.{name}', columns.column(name))
+        for name in nullable_fields:
+            values = [getattr(element, name, None) for element in elements]
+            writer.add(f'{kind}.{name}', np.array([math.nan if value is None else value for value in values],
+                                                  dtype=np.float64))
+        for name in extra_strings:
+            writer.add(f'{kind}.{name}', np.array([strings.intern(getattr(element, name, None))
+                                                   for element in elements], dtype=np.int32))
+
+        if kind == 'rooms':
+            points = [[coordinate for point in (getattr(room, 'points', None) or ()) for coordinate in point]
+                      for room in elements]
+            offsets, values = _ragged(points, np.float64)
+            writer.add('rooms.points.offsets', offsets // 2)
+            writer.add('rooms.points', values)
+
+            walls = []
+            for room in elements:
+                try:
+                    walls.append([wall_indices[id(wall)] for wall in getattr(room, 'walls', None) or ()])
+                except KeyError:
+                    raise ValueError(f"Room {room.id} has walls that are not part of the floor plan")
+            offsets, values = _ragged(walls, np.int32)
+            writer.add('rooms.walls.offsets', offsets)
+            writer.add('rooms.walls', values)
+
+    numeric_fields, string_fields = WALL_FIELDS
+    for name in numeric_fields:
+        writer.add(f'walls.{name}', np.array([getattr(wall, name) for wall in floor_plan.walls], dtype=np.float64))
+    for name in string_fields:
+        writer.add(f'walls.{name}', np.array([strings.intern(getattr(wall, name)) for wall in floor_plan.walls],
+                                             dtype=np.int32))
+
+    # Parent of every element, as an index into get_all_elements()
+    all_elements = floor_plan.get_all_elements()
+    positions = {id(element): index for index, element in enumerate(all_elements)}
+    tree = floor_plan.get_containment_tree()
+    parents = [tree.parents.get(id(element)) for element in all_elements]
+    writer.add('parents', np.array([-1 if parent is None else positions[id(parent)] for parent in parents],
+                                   dtype=np.int32))
+
+    encoded = [value.encode('utf-8') for value in strings.strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    writer.add('strings.offsets', offsets)
+    writer.add('strings.data', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    return writer.to_bytes(floor_plan.header)
+
+
+def load_floor_plan(buffer):
+    """
+    Load a floor plan from a buffer in the binary plan format
+
+    Columns are NumPy views into the buffer, so no element is parsed or
+    copied; rooms, doors, windows and furniture become ElementView objects
+    over those columns. Only walls are built as Wall objects. The geometry
+    is writable when the buffer is (e.g. a bytearray or a copy-on-write map).
+
+    Args:
+        buffer: bytes, bytearray, memoryview or mmap object
+
+    Returns:
+        FloorPlan object
+    """
+    from DSL.Models.FloorPlan import FloorPlan
+
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+        raise ValueError("Not a floor plan file: too short")
+    magic, version, _, section_count, width, height = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a floor plan file: bad signature")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported floor plan format version: {version}")
+
+    sections = {}
+    for index in range(section_count):
+        name, dtype, offset, count = _SECTION.unpack_from(view, _HEADER.size + index * _SECTION.size)
+        dtype = np.dtype(dtype.rstrip(b'\0').decode('ascii'))
+        sections[name.rstrip(b'\0').decode('ascii')] = np.frombuffer(view, dtype=dtype, count=count, offset=offset)
+
+    strings = BufferStringTable(sections['strings.offsets'], sections['strings.data'])
+
+    numeric_fields, string_fields = WALL_FIELDS
+    wall_columns = [sections[f'walls.{name}'].tolist() for name in numeric_fields + string_fields]
+    walls = []
+    for row in zip(*wall_columns):
+        wall = Wall(None, *row[:4])
+        wall.thickness = row[4]
+        wall.id, wall.color, wall.parent_id = (strings.lookup(code) for code in row[5:])
+        walls.append(wall)
+
+    columns_by_kind = {}
+    for kind in KIND_SCHEMAS:
+        prefix = kind + '.'
+        arrays = {name[len(prefix):]: array for name, array in sections.items()
+                  if name.startswith(prefix) and name.count('.') == 1}
+        size = len(arrays['x'])
+        ragged = None
+        if kind == 'rooms':
+            ragged = {
+                'points': (sections['rooms.points.offsets'], sections['rooms.points'].reshape(-1, 2),
+                           lambda rows: tuple(map(tuple, rows.tolist()))),
+                'walls': (sections['rooms.walls.offsets'], sections['rooms.walls'],
+                          lambda rows: [walls[index] for index in rows.tolist()]),
+            }
+            del arrays['points'], arrays['walls']
+        nullable_fields, extra_strings = EXTRA_FIELDS[kind]
+        columns_by_kind[kind] = BufferColumns(kind, strings, arrays, size, KIND_SCHEMAS[kind][2] + extra_strings,
+                                              nullable_fields, ragged)
+
+    header = None if math.isnan(width) else {'width': width, 'height': height}
+    floor_plan = FloorPlan.from_columns(columns_by_kind, walls, header)
+    floor_plan._containment_tree = ContainmentTree(floor_plan, sections['parents'])
+    return floor_plan
+
+
+def write_floor_plan(floor_plan, path):
+    """
+    Save a floor plan to a file in the binary plan format
+
+    Args:
+        floor_plan: FloorPlan object
+        path: Output file path
+    """
+    with open(path, 'wb') as f:
+        f.write(dump_floor_plan(floor_plan))
+
+
+def read_floor_plan(path):
+    """
+    Open a floor plan saved with write_floor_plan()
+
+    The file is memory-mapped copy-on-write: pages are read on demand and
+    edits to the loaded plan never reach the file.
+
+    Args:
+        path: File path
+
+    Returns:
+        FloorPlan object
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    return load_floor_plan(mapped)
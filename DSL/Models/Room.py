@@ -1,8 +1,15 @@
-class Room:
+from DSL.Models.TrackedElement import TrackedElement
+from DSL.Geometry.Polygon import Polygon
+
+
+class Room(TrackedElement):
     """
     Represents a room in the floor plan
     """
 
+    # Attributes that define the room geometry
+    GEOMETRY_FIELDS = ('x', 'y', 'width', 'height', 'points')
+
     def __init__(self, id=None, x=0, y=0, width=0, height=0):
         """
         Initialize a room
@@ -26,6 +33,7 @@ class Room:
         self.border_color = None
         self.border_width = None
         self.walls = []  # Custom wall configurations
+        self.points = None  # Polygon outline relative to (x, y), None for rectangles
 
         # Parent room (for nested rooms)
         self.parent_id = None
@@ -36,7 +44,76 @@ class Room:
         # Apply a scaling factor to get realistic values
         # Assuming units are in meters but need to be scaled down
         scale_factor = 0.01  # Adjust this value to get realistic areas
-        return round(self.width * self.height * scale_factor, 2)
+        if self.points:
+            return self._cached('area', lambda: round(self.polygon.area * scale_factor, 2))
+        return self._cached('area', lambda: round(self.width * self.height * scale_factor, 2))
+
+    @property
+    def is_polygon(self):
+        """Whether the room has a polygon outline instead of a rectangle"""
+        return bool(self.points)
+
+    @property
+    def polygon(self):
+        """
+        Polygon of the room outline, relative to (x, y)
+
+        The polygon only depends on `points`, so moving the room keeps its
+        cached area and triangulation.
+        """
+        state = getattr(self, '__dict__', None)
+        if state is None:
+            return Polygon(self.points or self._rectangle_points())
+
+        points = state.get('points')
+        if state.get('_polygon_points') is not points or '_polygon' not in state:
+            state['_polygon'] = Polygon(points or self._rectangle_points())
+            state['_polygon_points'] = points
+        return state['_polygon']
+
+    @property
+    def centroid(self):
+        """Center of mass of the room outline as (x, y)"""
+        if self.points:
+            center_x, center_y = self.polygon.centroid
+            return (self.x + center_x, self.y + center_y)
+        return (self.x + self.width / 2, self.y + self.height / 2)
+
+    def _rectangle_points(self):
+        """Outline of a rectangular room relative to (x, y)"""
+        return [(0, 0), (self.width, 0), (self.width, self.height), (0, self.height)]
+
+    def set_points(self, points):
+        """
+        Give the room a polygon outline
+
+        The outline is shifted so its bounding box starts at (0, 0); the room
+        position moves by the same amount and the size becomes the bounding box.
+
+        Args:
+            points: List of (x, y) vertices relative to the room position
+        """
+        if not points or len(points) < 3:
+            self.points = None
+            return
+
+        min_x = min(point[0] for point in points)
+        min_y = min(point[1] for point in points)
+        self.points = tuple((float(x - min_x), float(y - min_y)) for x, y in points)
+        self.x = self.x + min_x
+        self.y = self.y + min_y
+        self.width = max(point[0] for point in self.points)
+        self.height = max(point[1] for point in self.points)
+
+    def triangulate(self):
+        """
+        Split the room outline into triangles
+
+        Returns:
+            List of triangles, each a list of three (x, y) points
+        """
+        points = self.get_corners()
+        return [[points[i], points[j], points[k]] for i, j, k in self.polygon.triangulate()]
 
     def set_size(self, width, height):
         """
@@ -71,11 +148,14 @@ class Room:
 
     def get_corners(self):
         """
-        Get the coordinates of the four corners of the room
+        Get the coordinates of the corners of the room
 
         Returns:
-            List of (x, y) tuples for the corners
+            List of (x, y) tuples for the corners (the polygon vertices for polygon rooms)
         """
+        if self.points:
+            return [(self.x + x, self.y + y) for x, y in self.points]
+
         return [
             (self.x, self.y),  # Top-left
             (self.x + self.width, self.y),  # Top-right
@@ -94,6 +174,12 @@ class Room:
         Returns:
             True if the point is inside the room, False otherwise
         """
+        if self.points:
+            # The bounding box rejects most points before the polygon test
+            if not (self.x <= x <= self.x + self.width and self.y <= y <= self.y + self.height):
+                return False
+            return self.polygon.contains_point(x - self.x, y - self.y)
+
         return (
                 self.x <= x <= self.x + self.width and
                 self.y <= y <= self.y + self.height
@@ -110,6 +196,7 @@ class Room:
             Self for chaining
         """
         debug = True  # Enable debug output
+        points = None
 
         # Process each property
         for prop in structure_node.properties:
@@ -167,6 +254,17 @@ class Room:
                         if debug:
                             print(f"Error parsing position: {e}")
 
+            elif prop_literal == "points":
+                if hasattr(prop.value, 'elements') and prop.value.elements:
+                    try:
+                        points = [(self._number(point.elements[0]), self._number(point.elements[1]))
+                                  for point in prop.value.elements]
+                        if debug:
+                            print(f"Room points: {points}")
+                    except (ValueError, AttributeError, IndexError, TypeError) as e:
+                        if debug:
+                            print(f"Error parsing points: {e}")
+
             elif prop_literal == "label":
                 if hasattr(prop.value, 'value'):
                     self.label = prop.value.value.strip('"\'')
@@ -185,4 +283,23 @@ class Room:
                     if debug:
                         print(f"Room color: {self.color}")
 
-        return self
\ No newline at end of file
+        # Apply the outline last so it is relative to the final position
+        if points is not None:
+            self.set_points(points)
+
+        return self
+
+    @staticmethod
+    def _number(node):
+        """
+        Read a numeric literal node, including negated ones
+
+        Args:
+            node: Expression node from the AST
+
+        Returns:
+            Float value
+        """
+        if hasattr(node, 'right') and getattr(node, 'op', None) == '-':
+            return -Room._number(node.right)
+        return float(node.value)
\ No newline at end of file
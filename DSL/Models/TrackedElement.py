@@ -0,0 +1,109 @@
+import weakref
+from collections import namedtuple
+
+from DSL.Geometry.SpatialIndex import element_bounds
+
+
+# One entry of a floor plan change log
+Change = namedtuple('Change', ['version', 'action', 'element', 'attribute', 'old_value', 'new_value'])
+
+_UNSET = object()
+
+
+class TrackedElement:
+    """
+    Base class for model objects that records attribute writes.
+
+    Writing a public attribute marks the element dirty, drops cached derived
+    values when the geometry changed, and appends an entry to the change log
+    of the floor plan the element belongs to.
+    """
+
+    # Attributes that define the element geometry
+    GEOMETRY_FIELDS = ('x', 'y', 'width', 'height')
+
+    def __setattr__(self, name, value):
+        if name[0] == '_':
+            object.__setattr__(self, name, value)
+            return
+
+        state = self.__dict__
+        floor_plan_ref = state.get('_floor_plan')
+        floor_plan = floor_plan_ref() if floor_plan_ref is not None else None
+
+        # Integer geometry mode: coordinates always stay on the plan's grid
+        if name in self.GEOMETRY_FIELDS and floor_plan is not None and floor_plan.grid is not None:
+            value = floor_plan.grid.snap_value(name, value)
+
+        old_value = state.get(name, _UNSET)
+        object.__setattr__(self, name, value)
+
+        # Attributes set for the first time (e.g. in __init__) are not changes
+        if old_value is _UNSET:
+            return
+
+        try:
+            if old_value is value or old_value == value:
+                return
+        except (TypeError, ValueError):
+            pass
+
+        if name in self.GEOMETRY_FIELDS:
+            state.pop('_cache', None)
+
+        state['_dirty'] = True
+
+        if floor_plan is not None:
+            floor_plan._record_change(self, name, old_value, value)
+
+    def __getstate__(self):
+        # Copies are detached from the floor plan and start with a cold cache
+        state = self.__dict__.copy()
+        state.pop('_floor_plan', None)
+        state.pop('_cache', None)
+        return state
+
+    @property
+    def dirty(self):
+        """Whether the element changed since it was last marked clean"""
+        return self.__dict__.get('_dirty', False)
+
+    def mark_clean(self):
+        """Clear the dirty flag of the element"""
+        self._dirty = False
+
+    def attach(self, floor_plan):
+        """
+        Register the floor plan whose change log records this element's writes
+
+        Args:
+            floor_plan: FloorPlan object (or None to detach)
+        """
+        self._floor_plan = weakref.ref(floor_plan) if floor_plan is not None else None
+
+    def _cached(self, key, compute):
+        """
+        Get a derived value, computing it once until the geometry changes
+
+        Args:
+            key: Cache key
+            compute: Function computing the value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        state = getattr(self, '__dict__', None)
+        if state is None:
+            return compute()
+
+        cache = state.get('_cache')
+        if cache is None:
+            cache = state['_cache'] = {}
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    @property
+    def bounds(self):
+        """Axis-aligned bounding box as (min_x, min_y, max_x, max_y)"""
+        return self._cached('bounds', lambda: element_bounds(self))
\ No newline at end of file
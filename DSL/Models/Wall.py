@@ -1,11 +1,16 @@
 import math
 
+from DSL.Models.TrackedElement import TrackedElement
 
-class Wall:
+
+class Wall(TrackedElement):
     """
     Represents a wall in the floor plan
     """
 
+    # Attributes that define the wall geometry
+    GEOMETRY_FIELDS = ('start_x', 'start_y', 'end_x', 'end_y')
+
     def __init__(self, id=None, start_x=0, start_y=0, end_x=0, end_y=0):
         """
         Initialize a wall
@@ -31,13 +36,21 @@ class Wall:
     @property
     def length(self):
         """Calculate length of the wall"""
-        dx = self.end_x - self.start_x
-        dy = self.end_y - self.start_y
-        return math.sqrt(dx * dx + dy * dy)
+        return self._cached('length', self._calculate_length)
 
     @property
     def angle(self):
         """Calculate angle of the wall in degrees from horizontal"""
+        return self._cached('angle', self._calculate_angle)
+
+    def _calculate_length(self):
+        """Compute the wall length from its end points"""
+        dx = self.end_x - self.start_x
+        dy = self.end_y - self.start_y
+        return math.sqrt(dx * dx + dy * dy)
+
+    def _calculate_angle(self):
+        """Compute the wall angle from its end points"""
         dx = self.end_x - self.start_x
         dy = self.end_y - self.start_y
         return math.degrees(math.atan2(dy, dx))
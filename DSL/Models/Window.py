@@ -1,4 +1,7 @@
-class Window:
+from DSL.Models.TrackedElement import TrackedElement
+
+
+class Window(TrackedElement):
     """
     Represents a window in the floor plan
     """
@@ -3,4 +3,12 @@ from .Room import Room
 from .Wall import Wall
 from .Door import Door
 from .Window import Window
-from .Furniture import Furniture
\ No newline at end of file
+from .Furniture import Furniture
+from .LayoutConstraint import LayoutConstraint
+from .ElementColumns import ElementColumns, ElementView, StringTable
+from .MappedColumns import MappedElementColumns, MappedStringTable
+from .ContainmentTree import ContainmentTree
+from .ConnectivityGraph import ConnectivityGraph
+from .PersistentMap import PersistentMap
+from .FloorPlanSnapshot import FloorPlanSnapshot, FloorPlanHistory
+from .PlanFile import dump_floor_plan, load_floor_plan, write_floor_plan, read_floor_plan
\ No newline at end of file
@@ -72,15 +72,17 @@ class Parser:
     def parse_program(self):
         """Parse the entire program"""
         program = ProgramNode(self.current_token)
+        program.statements.extend(self.iter_statements())
+        return program
 
+    def iter_statements(self):
+        """Parse statements one at a time, without keeping the whole AST"""
         while not self.current_token_is(TokenType.END):
             stmt = self.parse_statement()
             if stmt:
-                program.statements.append(stmt)
+                yield stmt
             self.next_token()
 
-        return program
-
     def parse_statement(self):
         """Parse a statement based on token type"""
         # Special case for header statement (starting with #)
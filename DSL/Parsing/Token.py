@@ -49,6 +49,7 @@ class TokenType:
     BED = "BED"
     TABLE = "TABLE"
     CHAIR = "CHAIR"
+    CONSTRAINT = "CONSTRAINT"
 
     # Properties
     ID_PROP = "ID_PROPERTY"
@@ -70,6 +71,7 @@ class TokenType:
     LAYER_PROP = "LAYER"
     ROTATION_PROP = "ROTATION"
     LABEL_PROP = "LABEL"
+    POINTS_PROP = "POINTS"
 
     VISIBILITY_PROP_VALUE = "VISIBILITY"
     HIDDEN_PROP_VALUE = "HIDDEN"
@@ -91,13 +93,13 @@ class TokenType:
     END = "END"
 
     dataTypes = {INT, STRING, MEASURE, COLOR, FLOAT, LIST}
-    structures = {ROOM, WINDOW, WALL, DOOR, ELEVATOR, STAIRS, BED, TABLE, CHAIR}
+    structures = {ROOM, WINDOW, WALL, DOOR, ELEVATOR, STAIRS, BED, TABLE, CHAIR, CONSTRAINT}
     roomProps = {
         ID_PROP, ID_PARENT_PROP, WALL_PROP, END_ON_WALL, SIZE_PROP,
         ANGLES_PROP, BORDER_PROP, POSITION_PROP, START_ON_WALL_PROP,
         LENGTH_PROP, DIRECTION_PROP, START_PROPERTY, END_PROP,
         WIDTH_PROP, HEIGHT_PROP, DISTANCE_WALL_PROP, LAYER_PROP,
-        ROTATION_PROP, LABEL_PROP
+        ROTATION_PROP, LABEL_PROP, POINTS_PROP
     }
     measureUnits = {MEASURE_UNIT_MM, MEASURE_UNIT_CM, MEASURE_UNIT_DM, MEASURE_UNIT_M, MEASURE_UNIT_KM}
 
@@ -118,6 +120,7 @@ keywords: Dict[str, str] = {
     "Bed": TokenType.BED,
     "Table": TokenType.TABLE,
     "Chair": TokenType.CHAIR,
+    "Constraint": TokenType.CONSTRAINT,
     "id": TokenType.ID_PROP,
     "id_parent": TokenType.ID_PARENT_PROP,
     "size": TokenType.SIZE_PROP,
@@ -137,6 +140,7 @@ keywords: Dict[str, str] = {
     "rotation": TokenType.ROTATION_PROP,
     "label": TokenType.LABEL_PROP,
     "layer": TokenType.LAYER_PROP,
+    "points": TokenType.POINTS_PROP,
     "hidden": TokenType.HIDDEN_PROP_VALUE,
     "visible": TokenType.VISIBILITY_PROP_VALUE,
     "mm": TokenType.MEASURE_UNIT_MM,
@@ -163,4 +167,4 @@ class Token:
 
 
 def look_up_ident(ident: str) -> str:
-    return keywords.get(ident, TokenType.IDENTIFIER)
+    return keywords.get(ident, TokenType.IDENTIFIER)
\ No newline at end of file
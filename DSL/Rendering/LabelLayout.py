@@ -0,0 +1,279 @@
+from collections import namedtuple
+
+from DSL.Geometry.SpatialIndex import SpatialIndex
+from DSL.Rendering.TextMetrics import TextMetrics
+
+
+# Text to place, in pixels: an identifier, the text, the anchor points it
+# may be centered on and the font sizes it may use (both preferred first),
+# the (min_x, min_y, max_x, max_y) rectangle it should stay inside and a
+# Polygon it should stay inside (None for no limit), and its rank in the
+# greedy pass (lower is placed first)
+LabelRequest = namedtuple('LabelRequest', ['key', 'text', 'positions', 'font_sizes',
+                                           'region', 'outline', 'priority'])
+
+# Where a label goes: its center, font size and box, and whether it still
+# overlaps an obstacle or another label (the best the layout could do)
+LabelPlacement = namedtuple('LabelPlacement', ['key', 'text', 'x', 'y', 'font_size', 'bounds', 'overlaps'])
+
+# Cost of moving one position or one font size down the preference lists
+POSITION_COST = 1.0
+SIZE_COST = 1.0
+
+# Cost of overlapping an obstacle or another label: a fixed part, so a
+# label moves rather than accepting a small overlap, plus a part
+# proportional to the fraction of the label covered
+OBSTACLE_COST = (8.0, 8.0)
+LABEL_COST = (12.0, 12.0)
+
+# Cost of leaving the region or outline of the label
+OUTSIDE_COST = 40.0
+
+
+class _Box:
+    """Box of a placed label or an obstacle in the spatial index"""
+
+    __slots__ = ('x', 'y', 'width', 'height')
+
+    def __init__(self, min_x, min_y, max_x, max_y):
+        self.x = min_x
+        self.y = min_y
+        self.width = max_x - min_x
+        self.height = max_y - min_y
+
+
+class LabelLayout:
+    """
+    Places text labels so they avoid obstacles and each other.
+
+    Every label has candidates: its anchor points crossed with its font
+    sizes, each with a preference cost (how far down either list it is).
+    A greedy pass places the labels in priority order, each on the cheapest
+    candidate given the obstacles and the labels placed before it, looked
+    up in spatial indexes. Candidates are tried in preference order and
+    the search stops once the preference cost alone exceeds the best total,
+    so a label with room to spare costs one lookup. A repair pass then
+    re-places the labels left overlapping another label, now that all
+    their neighbours are known, until nothing improves.
+    """
+
+    def __init__(self, metrics=None, margin=1.0, max_repair_passes=4):
+        """
+        Create a label layout
+
+        Args:
+            metrics: TextMetrics used to measure the labels (serif by default)
+            margin: Clearance in pixels kept around each label
+            max_repair_passes: Largest number of repair passes
+        """
+        self.metrics = metrics or TextMetrics()
+        self.margin = margin
+        self.max_repair_passes = max_repair_passes
+
+        # Candidate orders by (number of positions, number of font sizes)
+        self._orders = {}
+
+    @staticmethod
+    def spread_positions(x, y, reach_x, reach_y, steps=2):
+        """
+        Get anchor points around a point, closest first
+
+        Args:
+            x, y: Preferred point
+            reach_x, reach_y: Largest distance from the point along each axis
+            steps: Number of points on each side of the point along each axis
+
+        Returns:
+            List of (x, y) points starting with the preferred one
+        """
+        offsets = [(i, j) for i in range(-steps, steps + 1) for j in range(-steps, steps + 1)]
+        offsets.sort(key=lambda offset: (offset[0] ** 2 + offset[1] ** 2, abs(offset[0]), offset))
+        return [(x + i * reach_x / steps, y + j * reach_y / steps) for i, j in offsets]
+
+    def place(self, requests, obstacles=()):
+        """
+        Place labels
+
+        Args:
+            requests: List of LabelRequest
+            obstacles: Iterable of (min_x, min_y, max_x, max_y) rectangles to avoid
+
+        Returns:
+            List of LabelPlacement, in the order of the requests
+        """
+        if not requests:
+            return []
+
+        obstacle_index = SpatialIndex.build({'obstacles': [_Box(*bounds) for bounds in obstacles]})
+        first_boxes = [self._box(request, request.positions[0], request.font_sizes[0])
+                       for request in requests]
+        label_index = SpatialIndex(SpatialIndex.suggest_cell_size(first_boxes))
+
+        # Box and static cost (region, outline, obstacles) of the evaluated candidates, by label
+        static_costs = [{} for _ in requests]
+        chosen = [None] * len(requests)
+
+        order = sorted(range(len(requests)), key=lambda index: (requests[index].priority, index))
+        for index in order:
+            chosen[index] = self._choose(requests[index], static_costs[index],
+                                         obstacle_index, label_index)
+            label_index.insert(chosen[index][2], 'labels')
+
+        self._repair(requests, chosen, static_costs, obstacle_index, label_index, order)
+
+        placements = []
+        for index, request in enumerate(requests):
+            _, (position, size), box, _ = chosen[index]
+            overlaps = bool(self._label_cost(box, label_index)) or bool(obstacle_index.query_rect(
+                box.x, box.y, box.x + box.width, box.y + box.height, include_touching=False))
+            x, y = request.positions[position]
+            placements.append(LabelPlacement(request.key, request.text, x, y, request.font_sizes[size],
+                                             (box.x + self.margin, box.y + self.margin,
+                                              box.x + box.width - self.margin,
+                                              box.y + box.height - self.margin),
+                                             overlaps))
+        return placements
+
+    def _repair(self, requests, chosen, static_costs, obstacle_index, label_index, order):
+        """
+        Re-place the labels that overlap another label until none improves
+
+        Args:
+            requests: List of LabelRequest
+            chosen: Chosen candidate of each label, updated in place
+            static_costs: Static candidate costs of each label
+            obstacle_index: SpatialIndex of the obstacles
+            label_index: SpatialIndex of the placed labels
+            order: Label indexes in priority order
+        """
+        for _ in range(self.max_repair_passes):
+            improved = False
+            for index in order:
+                box = chosen[index][2]
+                if not self._label_cost(box, label_index):
+                    continue
+                label_index.remove(box)
+                candidate = self._choose(requests[index], static_costs[index],
+                                         obstacle_index, label_index)
+                if candidate[0] < self._total_cost(chosen[index], label_index) - 1e-9:
+                    chosen[index] = candidate
+                    improved = True
+                label_index.insert(chosen[index][2], 'labels')
+            if not improved:
+                return
+
+    def _total_cost(self, candidate, label_index):
+        """Get the cost of a chosen candidate given the other placed labels"""
+        _, (position, size), box, static_cost = candidate
+        return position * POSITION_COST + size * SIZE_COST + static_cost + self._label_cost(box, label_index)
+
+    def _choose(self, request, static_costs, obstacle_index, label_index):
+        """
+        Find the cheapest candidate of a label
+
+        Args:
+            request: LabelRequest
+            static_costs: Box and static cost (region, outline, obstacles) of the
+                label's evaluated candidates, by (position, size), updated
+            obstacle_index: SpatialIndex of the obstacles
+            label_index: SpatialIndex of the other placed labels
+
+        Returns:
+            (total cost, (position index, font size index), _Box, static cost)
+        """
+        best = None
+        for preference, position, size in self._order(len(request.positions), len(request.font_sizes)):
+            if best is not None and preference >= best[0]:
+                break
+            key = (position, size)
+            cached = static_costs.get(key)
+            if cached is None:
+                box = self._box(request, request.positions[position], request.font_sizes[size])
+                outside_cost = self._outside_cost(request, box)
+                # Most candidates of a crowded room leave it; skip their obstacle lookup
+                if best is not None and preference + outside_cost >= best[0]:
+                    continue
+                cached = static_costs[key] = (box, outside_cost + self._obstacle_cost(box, obstacle_index))
+            box, static_cost = cached
+            if best is not None and preference + static_cost >= best[0]:
+                continue
+            cost = preference + static_cost + self._label_cost(box, label_index)
+            if best is None or cost < best[0]:
+                best = (cost, key, box, static_cost)
+        return best
+
+    def _order(self, position_count, size_count):
+        """Get the candidates of a label as (preference cost, position, size), cheapest first"""
+        order = self._orders.get((position_count, size_count))
+        if order is None:
+            order = sorted((position * POSITION_COST + size * SIZE_COST, position, size)
+                           for position in range(position_count) for size in range(size_count))
+            self._orders[(position_count, size_count)] = order
+        return order
+
+    def _box(self, request, position, font_size):
+        """Get the box of a label centered on a point, margin included"""
+        width, height = self.metrics.measure(request.text, font_size)
+        margin = self.margin
+        x, y = position
+        return _Box(x - width / 2 - margin, y - height / 2 - margin,
+                    x + width / 2 + margin, y + height / 2 + margin)
+
+    def _outside_cost(self, request, box):
+        """
+        Get the cost of a candidate leaving the region or outline of its label
+
+        Args:
+            request: LabelRequest
+            box: _Box of the candidate
+
+        Returns:
+            OUTSIDE_COST or 0
+        """
+        min_x, min_y = box.x + self.margin, box.y + self.margin
+        max_x, max_y = box.x + box.width - self.margin, box.y + box.height - self.margin
+        region = request.region
+        if region is not None and (min_x < region[0] or min_y < region[1] or
+                                   max_x > region[2] or max_y > region[3]):
+            return OUTSIDE_COST
+        if request.outline is not None and not self._inside_outline(request.outline, min_x, min_y,
+                                                                    max_x, max_y):
+            return OUTSIDE_COST
+        return 0.0
+
+    def _obstacle_cost(self, box, obstacle_index):
+        """Get the cost of a box overlapping the obstacles (0 when it overlaps none)"""
+        covered = self._covered(box, obstacle_index.query_rect(
+            box.x, box.y, box.x + box.width, box.y + box.height, include_touching=False))
+        return OBSTACLE_COST[0] + OBSTACLE_COST[1] * covered if covered else 0.0
+
+    def _label_cost(self, box, label_index):
+        """Get the cost of a box overlapping the placed labels (0 when it overlaps none)"""
+        others = label_index.query_rect(box.x, box.y, box.x + box.width, box.y + box.height,
+                                        include_touching=False)
+        others = [other for other in others if other is not box]
+        if not others:
+            return 0.0
+        return len(others) * LABEL_COST[0] + LABEL_COST[1] * self._covered(box, others)
+
+    @staticmethod
+    def _covered(box, others):
+        """Get the fraction of a box other boxes cover (overlaps counted once per box)"""
+        if not others:
+            return 0.0
+        max_x, max_y = box.x + box.width, box.y + box.height
+        area = 0.0
+        for other in others:
+            width = min(max_x, other.x + other.width) - max(box.x, other.x)
+            height = min(max_y, other.y + other.height) - max(box.y, other.y)
+            if width > 0 and height > 0:
+                area += width * height
+        return min(1.0, area / (box.width * box.height)) if box.width * box.height > 0 else 0.0
+
+    @staticmethod
+    def _inside_outline(outline, min_x, min_y, max_x, max_y):
+        """Check if a rectangle lies inside a polygon: corners inside, no vertex poking in"""
+        if not outline.contains_points([min_x, max_x, min_x, max_x], [min_y, min_y, max_y, max_y]).all():
+            return False
+        return not any(min_x < px < max_x and min_y < py < max_y
+                       for px, py in zip(outline.xs.tolist(), outline.ys.tolist()))
@@ -1,7 +1,16 @@
 from DSL.Rendering.SVGExporter import SVGExporter
+from DSL.Rendering.StreamingSVGExporter import StreamingSVGExporter
 from DSL.Rendering.StyleManager import StyleManager
+from DSL.Rendering.TextMetrics import TextMetrics
+from DSL.Rendering.LabelLayout import LabelLayout, LabelRequest
 from DSL.Models.FloorPlan import FloorPlan
+from DSL.Models.ElementColumns import ElementColumns
+from DSL.Models.MappedColumns import MappedElementColumns
+from DSL.Geometry.WallUnion import merge_collinear_segments, cut_openings, segments_to_path
+from DSL.Geometry.Polygon import Polygon
+import itertools
 import math
+import numpy as np
 
 
 class Renderer:
@@ -29,6 +38,11 @@ class Renderer:
         self.grid_size = 100  # Grid size in pixels
         self.use_room_labels = True  # Whether to show room labels
         self.show_dimensions = True  # Whether to show room dimensions
+        self.merge_walls = True  # Whether to union shared wall edges into one path per style
+        self.wall_openings = True  # Whether doors and windows leave gaps in merged walls
+        self.label_layout = True  # Whether labels move and shrink to avoid furniture and each other
+        self.min_font_size = 6  # Smallest font size a room label shrinks to
+        self.text_metrics = TextMetrics()  # Glyph advances used to measure labels
 
         # Room color palette
         self.enhanced_colors = True  # Use enhanced color palette
@@ -51,11 +65,18 @@ class Renderer:
         # Calculate canvas size with padding
         width, height, min_x, min_y = self._calculate_canvas_size(floor_plan)
 
-        # Create SVG exporter
-        exporter = SVGExporter(
-            width + self.padding * 2,
-            height + self.padding * 2
-        )
+        # Create SVG exporter; out-of-core plans are written as they are drawn
+        if floor_plan.is_out_of_core():
+            exporter = StreamingSVGExporter(
+                width + self.padding * 2,
+                height + self.padding * 2,
+                output_file
+            )
+        else:
+            exporter = SVGExporter(
+                width + self.padding * 2,
+                height + self.padding * 2
+            )
 
         print(f"Created SVG canvas with dimensions {width + self.padding * 2}x{height + self.padding * 2}")
 
@@ -70,7 +91,9 @@ class Renderer:
             self._draw_grid(exporter, width, height, offset_x, offset_y)
 
         # Order elements by layer: first rooms, then walls, then doors and windows, lastly furniture
-        self._render_rooms(floor_plan.rooms, exporter, offset_x, offset_y)
+        openings = self._collect_openings(floor_plan) if self.wall_openings else []
+        self._render_rooms(floor_plan.rooms, exporter, offset_x, offset_y,
+                           walls=floor_plan.walls, openings=openings, furniture=floor_plan.furniture)
         self._render_doors(floor_plan.doors, exporter, offset_x, offset_y)
         self._render_windows(floor_plan.windows, exporter, offset_x, offset_y)
         self._render_furniture(floor_plan.furniture, exporter, offset_x, offset_y)
@@ -154,7 +177,8 @@ class Renderer:
                 stroke_width=0.5
             )
 
-    def _render_rooms(self, rooms, exporter, offset_x=0, offset_y=0):
+    def _render_rooms(self, rooms, exporter, offset_x=0, offset_y=0, walls=None, openings=None,
+                      furniture=None):
         """
         Render all rooms
 
@@ -163,6 +187,9 @@ class Renderer:
             exporter: SVGExporter
             offset_x: X offset
             offset_y: Y offset
+            walls: Optional list of free-standing Wall objects (merged wall rendering only)
+            openings: Optional list of opening segments cut out of the merged walls
+            furniture: Optional list of Furniture objects the labels keep clear of
         """
         # First render all room backgrounds
         for room in rooms:
@@ -173,14 +200,27 @@ class Renderer:
             self._render_room_background(room, exporter, offset_x, offset_y)
 
         # Then render all room walls (so walls are on top of backgrounds)
-        for room in rooms:
-            if room.width <= 0 or room.height <= 0:
-                continue
+        if self.merge_walls:
+            self._render_merged_walls(rooms, walls or [], exporter, offset_x, offset_y, openings or [])
+        else:
+            for room in rooms:
+                if room.width <= 0 or room.height <= 0:
+                    continue
 
-            self._render_room_walls(room, exporter, offset_x, offset_y)
+                self._render_room_walls(room, exporter, offset_x, offset_y)
 
         # Finally render room labels
         if self.use_room_labels:
+            # Out-of-core plans are labelled as they stream, without a layout
+            # pass: it would load every room and every piece of furniture
+            if (self.label_layout and not isinstance(rooms, MappedElementColumns) and
+                    not isinstance(furniture, MappedElementColumns)):
+                labelled = [room for room in rooms if room.width > 0 and room.height > 0]
+                placements = self._layout_room_labels(labelled, furniture or [], offset_x, offset_y)
+                for room, room_placements in zip(labelled, placements):
+                    self._render_room_label(room, exporter, offset_x, offset_y, room_placements)
+                return
+
             for room in rooms:
                 if room.width <= 0 or room.height <= 0:
                     continue
@@ -238,6 +278,13 @@ class Renderer:
 
         print(f"Rendering room '{room.id}' at ({x}, {y}) with size {width}x{height}")
 
+        # Polygon rooms are drawn as a closed path through their corners
+        if room.points:
+            path = ' '.join(f'{"M" if i == 0 else "L"} {px * self.scale + offset_x} {py * self.scale + offset_y}'
+                            for i, (px, py) in enumerate(room.get_corners())) + ' Z'
+            exporter.add_path(path, fill=style['fill'], stroke=style['stroke'], stroke_width=style['stroke_width'])
+            return
+
         # Add room rectangle with rounded corners for better visual appeal
         corner_radius = min(width, height) * 0.02  # 2% of smaller dimension
 
@@ -284,8 +331,18 @@ class Renderer:
         width = room.width * self.scale
         height = room.height * self.scale
 
+        # Polygon rooms get one wall per outline edge
+        if room.points and not room.walls:
+            for x1, y1, x2, y2 in room.polygon.edges():
+                exporter.add_line(
+                    (room.x + x1) * self.scale + offset_x, (room.y + y1) * self.scale + offset_y,
+                    (room.x + x2) * self.scale + offset_x, (room.y + y2) * self.scale + offset_y,
+                    stroke=style['stroke'],
+                    stroke_width=self.wall_thickness
+                )
+
         # If room has explicit walls, render those
-        if room.walls:
+        elif room.walls:
             for wall in room.walls:
                 # Convert to pixels with scaling
                 x1 = wall.start_x * self.scale + offset_x
@@ -333,15 +390,135 @@ class Renderer:
                 stroke_width=self.wall_thickness
             )
 
-    def _render_room_label(self, room, exporter, offset_x=0, offset_y=0):
+    def _collect_wall_segments(self, rooms, walls):
         """
-        Render a room's label with realistic area measurements
+        Collect the wall segments of all rooms and free-standing walls
 
         Args:
-            room: Room object
+            rooms: List of Room objects
+            walls: List of Wall objects
+
+        Returns:
+            Dictionary of (stroke, stroke_width) -> list of (x1, y1, x2, y2) in plan units
+        """
+        style = self.style_manager.get_wall_style()
+        segments = []
+        seen_walls = set()
+
+        for room in rooms:
+            if room.width <= 0 or room.height <= 0:
+                continue
+
+            if room.walls:
+                for wall in room.walls:
+                    seen_walls.add(id(wall))
+                    segments.append((wall.start_x, wall.start_y, wall.end_x, wall.end_y))
+            elif room.points:
+                for x1, y1, x2, y2 in room.polygon.edges():
+                    segments.append((room.x + x1, room.y + y1, room.x + x2, room.y + y2))
+            else:
+                x, y = room.x, room.y
+                right, bottom = x + room.width, y + room.height
+                segments.append((x, y, right, y))  # Top wall
+                segments.append((right, y, right, bottom))  # Right wall
+                segments.append((x, bottom, right, bottom))  # Bottom wall
+                segments.append((x, y, x, bottom))  # Left wall
+
+        for wall in walls:
+            if id(wall) not in seen_walls:
+                segments.append((wall.start_x, wall.start_y, wall.end_x, wall.end_y))
+
+        return {(style['stroke'], self.wall_thickness): segments}
+
+    def _collect_openings(self, floor_plan):
+        """
+        Collect the stretches of wall taken by doors and windows
+
+        Openings anchored with `wall_id` and `distance_wall` are measured along
+        that wall; the others cut the walls their bounding box lies on.
+
+        Args:
+            floor_plan: FloorPlan object
+
+        Returns:
+            List of (x1, y1, x2, y2, reach) tuples in plan units
+        """
+        openings = []
+        for element in itertools.chain(floor_plan.doors, floor_plan.windows):
+            if element.width <= 0 and element.height <= 0:
+                continue
+
+            wall = floor_plan.get_element_by_id(element.wall_id) if element.wall_id else None
+            if wall is not None and hasattr(wall, 'point_at_distance') and wall.length > 0:
+                size = max(element.width, element.height)
+                x1, y1 = wall.point_at_distance(element.distance_wall)
+                x2, y2 = wall.point_at_distance(element.distance_wall + size)
+                openings.append((x1, y1, x2, y2, 0))
+                continue
+
+            # Doors swinging left/right sit on vertical walls, windows follow their shape
+            if hasattr(element, 'direction'):
+                horizontal = element.direction not in ("left", "right")
+            else:
+                horizontal = element.width > element.height
+
+            if horizontal:
+                middle = element.y + element.height / 2
+                openings.append((element.x, middle, element.x + element.width, middle, element.height / 2))
+            else:
+                middle = element.x + element.width / 2
+                openings.append((middle, element.y, middle, element.y + element.height, element.width / 2))
+
+        return openings
+
+    def _render_merged_walls(self, rooms, walls, exporter, offset_x=0, offset_y=0, openings=None):
+        """
+        Render all walls as maximal segments, one path per stroke style
+
+        Interior walls shared by two rooms are drawn once instead of twice,
+        and door and window openings are left as gaps.
+
+        Args:
+            rooms: List of Room objects
+            walls: List of free-standing Wall objects
             exporter: SVGExporter
             offset_x: X offset
             offset_y: Y offset
+            openings: Optional list of opening segments from _collect_openings()
+        """
+        total_in = 0
+        total_out = 0
+        total_openings = 0
+        for (stroke, stroke_width), segments in self._collect_wall_segments(rooms, walls).items():
+            merged = merge_collinear_segments(segments)
+            if openings:
+                merged, count = cut_openings(merged, openings)
+                total_openings = max(total_openings, count)
+            total_in += len(segments)
+            total_out += len(merged)
+            if not merged:
+                continue
+
+            # Convert to pixels with scaling
+            pixels = [(x1 * self.scale + offset_x, y1 * self.scale + offset_y,
+                       x2 * self.scale + offset_x, y2 * self.scale + offset_y)
+                      for x1, y1, x2, y2 in merged]
+            exporter.add_path(segments_to_path(pixels), stroke=stroke, stroke_width=stroke_width)
+
+        print(f"Merged {total_in} wall segments into {total_out} ({total_openings} openings cut)")
+
+    def _room_labels(self, room, offset_x=0, offset_y=0):
+        """
+        Get the texts of a room's label at their default places
+
+        Args:
+            room: Room object
+            offset_x: X offset
+            offset_y: Y offset
+
+        Returns:
+            List of (kind, text, x, y, font_size) tuples, kind being 'name',
+            'width' or 'height' (the dimensions along the walls)
         """
         # Get room style
         style = self.style_manager.get_room_style(room)
@@ -353,53 +530,214 @@ class Renderer:
         height = room.height * self.scale
 
         # Add room label if provided
-        if room.label:
-            # Format area value based on size
-            area_value = room.area
-            area_unit = "m²"
-
-            # Select appropriate unit for the area
-            if area_value < 1:
-                area_value *= 10000  # Convert to cm²
-                area_unit = "cm²"
-            elif area_value > 1000:
-                area_value /= 1000  # Convert to km²
-                area_unit = "km²"
-
-            # Add room name with area information
-            area_text = f"({area_value:.1f} {area_unit})" if self.show_dimensions else ""
-            label_text = f"{room.label}" if not area_text else f"{room.label} {area_text}"
+        if not room.label:
+            return []
+
+        # Format area value based on size
+        area_value = room.area
+        area_unit = "m²"
+
+        # Select appropriate unit for the area
+        if area_value < 1:
+            area_value *= 10000  # Convert to cm²
+            area_unit = "cm²"
+        elif area_value > 1000:
+            area_value /= 1000  # Convert to km²
+            area_unit = "km²"
+
+        # Add room name with area information
+        area_text = f"({area_value:.1f} {area_unit})" if self.show_dimensions else ""
+        label_text = f"{room.label}" if not area_text else f"{room.label} {area_text}"
+
+        # Polygon rooms are labelled at their centroid
+        label_x, label_y = x + width / 2, y + height / 2
+        if room.points:
+            center_x, center_y = room.centroid
+            label_x = center_x * self.scale + offset_x
+            label_y = center_y * self.scale + offset_y
+
+        labels = [('name', label_text, label_x, label_y, style['font_size'])]
+
+        # If showing dimensions, add width and height labels along the walls
+        if self.show_dimensions and width > 100 and height > 100:
+            # Apply the same scale factor as used in area calculation
+            scale_factor = 0.01
+
+            # Width dimension on top, height dimension on left - using realistic measurements
+            labels.append(('width', f"{room.width * scale_factor:.1f}m", x + width / 2, y - 5,
+                           style['font_size'] * 0.8))
+            labels.append(('height', f"{room.height * scale_factor:.1f}m", x - 10, y + height / 2,
+                           style['font_size'] * 0.8))
+
+        return labels
+
+    def _render_room_label(self, room, exporter, offset_x=0, offset_y=0, placements=None):
+        """
+        Render a room's label with realistic area measurements
 
+        Args:
+            room: Room object
+            exporter: SVGExporter
+            offset_x: X offset
+            offset_y: Y offset
+            placements: Optional dictionary of kind -> LabelPlacement from the
+                label layout; texts without one go to their default places
+        """
+        style = self.style_manager.get_room_style(room)
+        for kind, text, x, y, font_size in self._room_labels(room, offset_x, offset_y):
+            placement = placements.get(kind) if placements else None
+            if placement is not None:
+                x, y, font_size = placement.x, placement.y, placement.font_size
             exporter.add_text(
-                label_text,
-                x + width / 2,
-                y + height / 2,
-                font_size=style['font_size'],
+                text,
+                x,
+                y,
+                font_size=font_size,
                 fill=style['text_color']
             )
 
-            # If showing dimensions, add width and height labels along the walls
-            if self.show_dimensions and width > 100 and height > 100:
-                # Apply the same scale factor as used in area calculation
-                scale_factor = 0.01
-
-                # Width dimension on top - using realistic measurements
-                exporter.add_text(
-                    f"{room.width * scale_factor:.1f}m",
-                    x + width / 2,
-                    y - 5,
-                    font_size=style['font_size'] * 0.8,
-                    fill=style['text_color']
-                )
+    def _layout_room_labels(self, rooms, furniture, offset_x=0, offset_y=0):
+        """
+        Choose where the room labels go and how large they are
 
-                # Height dimension on left - using realistic measurements
-                exporter.add_text(
-                    f"{room.height * scale_factor:.1f}m",
-                    x - 10,
-                    y + height / 2,
-                    font_size=style['font_size'] * 0.8,
-                    fill=style['text_color']
-                )
+        The name of a room may move within the room and shrink down to
+        min_font_size; the dimensions may slide along their wall or move to
+        its inner side. Labels keep clear of the furniture and of each other
+        where they can (see LabelLayout); the default places win whenever
+        they are free.
+
+        Args:
+            rooms: List of Room objects with a positive size
+            furniture: List of Furniture objects
+            offset_x: X offset
+            offset_y: Y offset
+
+        Returns:
+            List with a dictionary of kind -> LabelPlacement per room
+        """
+        requests = []
+        for index, room in enumerate(rooms):
+            x = room.x * self.scale + offset_x
+            y = room.y * self.scale + offset_y
+            width = room.width * self.scale
+            height = room.height * self.scale
+            for kind, text, label_x, label_y, font_size in self._room_labels(room, offset_x, offset_y):
+                key = (index, kind)
+                if kind == 'name':
+                    outline = None
+                    if room.points:
+                        outline = Polygon([(x + px * self.scale, y + py * self.scale)
+                                           for px, py in room.points])
+                    positions = LabelLayout.spread_positions(label_x, label_y, width / 4, height / 3)
+                    requests.append(LabelRequest(key, text, positions, self._label_font_sizes(font_size),
+                                                 (x, y, x + width, y + height), outline, (0, width * height)))
+                    continue
+
+                # Dimensions slide along their wall, outside first, then inside
+                if kind == 'width':
+                    inside_y = y + font_size / 2 + 5
+                    positions = [(label_x + shift, row) for row in (label_y, inside_y)
+                                 for shift in (0, -width / 4, width / 4)]
+                else:
+                    inside_x = x + self.text_metrics.width(text, font_size) / 2 + 5
+                    positions = [(column, label_y + shift) for column in (label_x, inside_x)
+                                 for shift in (0, -height / 4, height / 4)]
+                requests.append(LabelRequest(key, text, positions, [font_size, round(font_size * 0.8, 1)],
+                                             None, None, (1, width * height)))
+
+        layout = LabelLayout(self.text_metrics)
+        placements = [{} for _ in rooms]
+        for placement in layout.place(requests, self._furniture_bounds(furniture, offset_x, offset_y)):
+            index, kind = placement.key
+            placements[index][kind] = placement
+        return placements
+
+    def _label_font_sizes(self, font_size):
+        """Get the font sizes a room name may use, largest first"""
+        sizes = [font_size]
+        for factor in (0.85, 0.7, 0.55):
+            size = round(font_size * factor, 1)
+            if size < self.min_font_size:
+                break
+            sizes.append(size)
+        if sizes[-1] > self.min_font_size:
+            sizes.append(self.min_font_size)
+        return sizes
+
+    def _furniture_bounds(self, furniture_items, offset_x=0, offset_y=0):
+        """
+        Get the pixel bounding boxes of the furniture as drawn
+
+        Args:
+            furniture_items: List of Furniture objects or ElementColumns
+            offset_x: X offset
+            offset_y: Y offset
+
+        Returns:
+            List of (min_x, min_y, max_x, max_y) tuples
+        """
+        if isinstance(furniture_items, ElementColumns):
+            return self._column_furniture_bounds(furniture_items, offset_x, offset_y)
+
+        bounds = []
+        for furniture in furniture_items:
+            if furniture.width <= 0 or furniture.height <= 0:
+                continue
+            # Same size and rotation as _render_furniture
+            width = max(10, furniture.width * self.scale)
+            height = max(10, furniture.height * self.scale)
+            center_x = furniture.x * self.scale + offset_x + width / 2
+            center_y = furniture.y * self.scale + offset_y + height / 2
+            angle = math.radians(getattr(furniture, 'rotation', 0) or 0)
+            cos, sin = abs(math.cos(angle)), abs(math.sin(angle))
+            half_width = (width * cos + height * sin) / 2
+            half_height = (width * sin + height * cos) / 2
+            bounds.append((center_x - half_width, center_y - half_height,
+                           center_x + half_width, center_y + half_height))
+        return bounds
+
+    def _column_furniture_bounds(self, columns, offset_x=0, offset_y=0):
+        """
+        Array version of _furniture_bounds() for column-backed furniture
+
+        Args:
+            columns: ElementColumns of furniture
+            offset_x: X offset
+            offset_y: Y offset
+
+        Returns:
+            List of (min_x, min_y, max_x, max_y) tuples
+        """
+        x, y = columns.column('x'), columns.column('y')
+        width, height = columns.column('width'), columns.column('height')
+        drawn = (width > 0) & (height > 0)
+        x, y, width, height = x[drawn], y[drawn], width[drawn], height[drawn]
+        angle = np.radians(columns.column('rotation')[drawn])
+
+        width = np.maximum(10, width * self.scale)
+        height = np.maximum(10, height * self.scale)
+        center_x = x * self.scale + offset_x + width / 2
+        center_y = y * self.scale + offset_y + height / 2
+        cos, sin = np.abs(np.cos(angle)), np.abs(np.sin(angle))
+        half_width = (width * cos + height * sin) / 2
+        half_height = (width * sin + height * cos) / 2
+        return list(zip((center_x - half_width).tolist(), (center_y - half_height).tolist(),
+                        (center_x + half_width).tolist(), (center_y + half_height).tolist()))
+
+    @staticmethod
+    def _iter_elements(elements):
+        """
+        Iterate over elements, in spatial order for memory-mapped columns
+
+        Args:
+            elements: List of elements or MappedElementColumns
+
+        Returns:
+            Iterable of elements
+        """
+        if isinstance(elements, MappedElementColumns):
+            return elements.iter_spatial()
+        return elements
 
     def _render_doors(self, doors, exporter, offset_x=0, offset_y=0):
         """
@@ -411,7 +749,7 @@ class Renderer:
             offset_x: X offset
             offset_y: Y offset
         """
-        for door in doors:
+        for door in self._iter_elements(doors):
             if door.width <= 0 and door.height <= 0:
                 print(f"Warning: Door '{door.id}' has invalid dimensions: {door.width}x{door.height}")
                 continue
@@ -526,7 +864,7 @@ class Renderer:
             offset_x: X offset
             offset_y: Y offset
         """
-        for window in windows:
+        for window in self._iter_elements(windows):
             if window.width <= 0 and window.height <= 0:
                 print(f"Warning: Window '{window.id}' has invalid dimensions: {window.width}x{window.height}")
                 continue
@@ -650,8 +988,12 @@ class Renderer:
             offset_x: X-offset for positioning
             offset_y: Y-offset for positioning
         """
-        # Sort furniture by type for consistent rendering
-        sorted_furniture = sorted(furniture_items, key=lambda f: f.furniture_type)
+        # Sort furniture by type for consistent rendering; mapped columns are
+        # streamed in spatial order instead of being loaded for sorting
+        if isinstance(furniture_items, MappedElementColumns):
+            sorted_furniture = self._iter_elements(furniture_items)
+        else:
+            sorted_furniture = sorted(furniture_items, key=lambda f: f.furniture_type)
 
         for furniture in sorted_furniture:
             # Skip rendering if furniture has zero dimensions
@@ -51,6 +51,20 @@ class SVGExporter:
         element += f'stroke="{stroke}" stroke-width="{stroke_width}" />'
         self.elements.append(element)
 
+    def add_path(self, path_data, fill="none", stroke="#000000", stroke_width=1):
+        """
+        Add a path to the SVG
+
+        Args:
+            path_data: SVG path data (the "d" attribute)
+            fill: Fill color (hex code, name or "none")
+            stroke: Stroke color (hex code or name)
+            stroke_width: Stroke width in pixels
+        """
+        element = f'<path d="{path_data}" fill="{fill}" '
+        element += f'stroke="{stroke}" stroke-width="{stroke_width}" />'
+        self.elements.append(element)
+
     def add_text(self, text, x, y, font_size=12, fill="#000000", text_anchor="middle"):
         """
         Add text to the SVG
@@ -0,0 +1,65 @@
+from DSL.Rendering.SVGExporter import SVGExporter
+
+
+class _ElementWriter:
+    """
+    Write-through stand-in for the exporter's element list
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, element):
+        """Write one SVG element to the output file"""
+        self.stream.write(f'  {element}\n')
+        self.count += 1
+
+
+class StreamingSVGExporter(SVGExporter):
+    """
+    SVG exporter that writes every element to the output file as it is added.
+
+    The document header is written when the exporter is created and the
+    closing tag when it is saved, so the memory used does not depend on the
+    number of elements drawn. The output matches SVGExporter.save().
+    """
+
+    def __init__(self, width, height, filename):
+        """
+        Initialize the exporter and start the output file
+
+        Args:
+            width: Width of the SVG canvas in pixels
+            height: Height of the SVG canvas in pixels
+            filename: Output file path
+        """
+        super().__init__(width, height)
+        self.filename = filename
+        self.stream = open(filename, 'w')
+
+        # Same header as SVGExporter.save()
+        self.stream.write('<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n')
+        self.stream.write(f'<svg width="{self.width}" height="{self.height}" ')
+        self.stream.write('xmlns="http://www.w3.org/2000/svg" ')
+        self.stream.write('xmlns:svg="http://www.w3.org/2000/svg">\n')
+        self.stream.write(f'  <rect width="{self.width}" height="{self.height}" fill="white" />\n')
+
+        self.elements = _ElementWriter(self.stream)
+
+    def save(self, filename=None):
+        """
+        Finish the SVG file
+
+        Args:
+            filename: Ignored unless it differs from the file given at creation
+        """
+        if filename is not None and filename != self.filename:
+            raise ValueError(f"Streaming exporter writes to '{self.filename}', not '{filename}'")
+
+        if not self.stream.closed:
+            self.stream.write('</svg>')
+            self.stream.close()
\ No newline at end of file
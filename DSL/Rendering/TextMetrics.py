@@ -0,0 +1,141 @@
+from collections import namedtuple
+
+
+# Horizontal advance of the printable ASCII characters (space to tilde), in
+# thousandths of the font size, from the standard PostScript font metrics
+_ASCII_ADVANCES = {
+    # Times-Roman, the usual default font of SVG text
+    'serif': (
+        250, 333, 408, 500, 500, 833, 778, 180, 333, 333, 500, 564, 250, 333, 250, 278,
+        500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444,
+        921, 722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+        556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333, 278, 333, 469, 500,
+        333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+        500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+    ),
+    # Helvetica (Arial has the same advances)
+    'sans-serif': (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+}
+
+# Advances of the non-ASCII characters the renderer writes (area units)
+_EXTRA_ADVANCES = {
+    'serif': {'²': 300, '³': 300, 'µ': 500},
+    'sans-serif': {'²': 333, '³': 333, 'µ': 556},
+}
+
+# Advance of characters missing from a table: a digit, close to the average
+# width of text and on the wide side for the letters of most scripts
+_DEFAULT_ADVANCE = {'serif': 500, 'sans-serif': 556}
+
+# Distance from the top of the ascenders to the bottom of the descenders,
+# in font sizes
+LINE_HEIGHT = 1.0
+
+# Width and height of a piece of text, in pixels
+TextExtent = namedtuple('TextExtent', ['width', 'height'])
+
+
+class TextMetrics:
+    """
+    Estimates the size of text from a table of glyph advances.
+
+    The advances of a font are looked up per character code in a table
+    built once per font, and the width of each distinct string is cached
+    in font-size units, so measuring the same label at several sizes (or
+    the same dimension text in many rooms) costs one dictionary lookup.
+    Kerning and ligatures are ignored; the estimate is within a few
+    percent of what browsers lay out for the base fonts.
+    """
+
+    # Advance tables already built, by font (shared by all instances)
+    _tables = {}
+
+    def __init__(self, font='serif'):
+        """
+        Create the metrics of a font
+
+        Args:
+            font: 'serif' or 'sans-serif'; other fonts use the serif advances
+        """
+        self.font = font if font in _ASCII_ADVANCES else 'serif'
+        self.advances = self._table(self.font)
+        self.default_advance = _DEFAULT_ADVANCE[self.font] / 1000.0
+
+        # Width of each measured string in font sizes
+        self._widths = {}
+
+    @classmethod
+    def _table(cls, font):
+        """
+        Get the advance of every character of a font in font sizes
+
+        Args:
+            font: Font name
+
+        Returns:
+            Dictionary of character -> advance
+        """
+        table = cls._tables.get(font)
+        if table is None:
+            table = {chr(32 + code): advance / 1000.0
+                     for code, advance in enumerate(_ASCII_ADVANCES[font])}
+            table.update((char, advance / 1000.0) for char, advance in _EXTRA_ADVANCES[font].items())
+            cls._tables[font] = table
+        return table
+
+    def width(self, text, font_size):
+        """
+        Estimate the width of a line of text
+
+        Args:
+            text: Text to measure
+            font_size: Font size in pixels
+
+        Returns:
+            Width in pixels
+        """
+        width = self._widths.get(text)
+        if width is None:
+            advances, default = self.advances, self.default_advance
+            width = sum([advances.get(char, default) for char in text])
+            self._widths[text] = width
+        return width * font_size
+
+    def measure(self, text, font_size):
+        """
+        Estimate the size of a line of text
+
+        Args:
+            text: Text to measure
+            font_size: Font size in pixels
+
+        Returns:
+            TextExtent
+        """
+        return TextExtent(self.width(text, font_size), font_size * LINE_HEIGHT)
+
+    def fit_font_size(self, text, max_width, max_font_size, min_font_size=0.0):
+        """
+        Get the largest font size at which a line of text fits a width
+
+        Args:
+            text: Text to fit
+            max_width: Available width in pixels
+            max_font_size: Largest font size wanted
+            min_font_size: Smallest font size allowed
+
+        Returns:
+            Font size in pixels, or None if the text is too wide even at the smallest size
+        """
+        unit_width = self.width(text, 1.0)
+        if unit_width <= 0:
+            return max_font_size
+        font_size = min(max_font_size, max_width / unit_width)
+        return font_size if font_size >= min_font_size else None
@@ -1,4 +1,7 @@
 from .Renderer import Renderer
 from .SVGExporter import SVGExporter
+from .StreamingSVGExporter import StreamingSVGExporter
 from .StyleManager import StyleManager
-from .Elements import ElementType
\ No newline at end of file
+from .Elements import ElementType
+from .TextMetrics import TextMetrics, TextExtent
+from .LabelLayout import LabelLayout, LabelRequest, LabelPlacement
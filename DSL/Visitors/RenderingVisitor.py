@@ -4,6 +4,7 @@ from DSL.Models.Wall import Wall
 from DSL.Models.Door import Door
 from DSL.Models.Window import Window
 from DSL.Models.Furniture import Furniture
+from DSL.Models.LayoutConstraint import LayoutConstraint
 from DSL.Parsing.AST import AstNodeType
 
 
@@ -13,9 +14,16 @@ class RenderingVisitor:
     for rendering
     """
 
-    def __init__(self):
-        """Initialize the visitor"""
-        self.floor_plan = FloorPlan()
+    def __init__(self, storage_dir=None, grid=None):
+        """
+        Initialize the visitor
+
+        Args:
+            storage_dir: Optional directory for an out-of-core floor plan
+                (furniture is appended to memory-mapped columns there)
+            grid: Optional FixedPointGrid for integer geometry mode
+        """
+        self.floor_plan = FloorPlan(storage_dir, grid=grid)
         self.variables = {}  # Store variables for reference
         self.debug = True  # Enable debug output
 
@@ -32,7 +40,22 @@ class RenderingVisitor:
         if self.debug:
             print("Starting AST traversal...")
 
-        for statement in program_node.statements:
+        return self.visit_statements(program_node.statements)
+
+    def visit_statements(self, statements):
+        """
+        Visit statements one at a time
+
+        Together with Parser.iter_statements() this builds a floor plan
+        without holding the whole AST in memory.
+
+        Args:
+            statements: Iterable of StatementNode objects
+
+        Returns:
+            FloorPlan object
+        """
+        for statement in statements:
             self.visit_statement(statement)
 
         if self.debug:
@@ -139,6 +162,13 @@ class RenderingVisitor:
                 print(
                     f"Created furniture '{furniture.id}' of type {structure_type} at ({furniture.x}, {furniture.y}) with size {furniture.width}x{furniture.height}")
             self.floor_plan.add_furniture(furniture)
+
+        elif structure_type == "CONSTRAINT":
+            constraint = LayoutConstraint().from_dsl_structure(structure_node)
+            if constraint.is_valid():
+                if self.debug:
+                    print(f"Created constraint '{constraint.id}': {constraint.relation} {constraint.rooms}")
+                self.floor_plan.add_constraint(constraint)
         else:
             if self.debug:
                 print(f"Unknown structure type: {structure_type}")
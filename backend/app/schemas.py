@@ -11,6 +11,15 @@ class DSLCodeRequest(BaseModel):
     user_id: Optional[int] = Field(None, description="ID of the user creating the floor plan")
 
 
+class SnapRequest(BaseModel):
+    plan_id: str = Field(..., description="ID of the floor plan returned by /parse")
+    position: List[float] = Field(..., description="Position of the dragged element")
+    size: List[float] = Field(..., description="Width and height of the dragged element")
+    element_id: Optional[str] = Field(None, description="ID of the dragged element")
+    tolerance: float = Field(10.0, description="Largest distance a snap may move the element")
+    grid: Optional[float] = Field(None, description="Grid spacing to snap to")
+
+
 # Response models for individual elements
 class FloorPlanElement(BaseModel):
     id: str
@@ -24,9 +33,55 @@ class FloorPlanElement(BaseModel):
     wall: Optional[str] = None
     direction: Optional[str] = None
     label: Optional[str] = None
+    points: Optional[List[List[float]]] = None
 
 
 # Response model for the complete floor plan
 class FloorPlanResponse(BaseModel):
     elements: List[FloorPlanElement]
-    svg_url: Optional[str] = None
\ No newline at end of file
+    svg_url: Optional[str] = None
+    plan_id: Optional[str] = None
+
+
+# Response models for egress analysis
+class EgressRoom(BaseModel):
+    id: str
+    label: Optional[str] = None
+    distance: Optional[float] = None
+    reachable: bool
+    route: List[str] = []
+
+
+class EgressResponse(BaseModel):
+    exits: List[str]
+    rooms: List[EgressRoom]
+
+
+# Response models for footprint analysis
+class FootprintRoom(BaseModel):
+    id: str
+    label: Optional[str] = None
+    area: float
+    overlap: float
+
+
+class FootprintResponse(BaseModel):
+    covered_area: float
+    overlap_area: float
+    free_area: float
+    rooms: List[FootprintRoom]
+
+
+# Response models for snapping
+class SnapGuide(BaseModel):
+    axis: str
+    kind: str
+    anchor: str
+    target: float
+    element_id: Optional[str] = None
+
+
+class SnapResponse(BaseModel):
+    position: List[float]
+    offset: List[float]
+    guides: List[SnapGuide]
@@ -1,5 +1,8 @@
+import hashlib
+import math
 import os
 import uuid
+from collections import OrderedDict
 from typing import Dict, List, Any, Tuple
 
 # Import DSL components
@@ -7,7 +10,9 @@ from DSL.Parsing.Lexer import Lexer
 from DSL.Parsing.Parser import Parser
 from DSL.Visitors.RenderingVisitor import RenderingVisitor
 from DSL.Rendering.Renderer import Renderer
-from DSL.Layout.LayoutManager import LayoutManager
+from DSL.Layout.LayoutManager import LayoutManager, LAYOUT_VERSION
+from DSL.Layout.LayoutCache import LayoutCache, prune_directory
+from DSL.Models.PlanFile import read_floor_plan, write_floor_plan
 
 from ..config import SVG_OUTPUT_DIR
 
@@ -25,6 +30,24 @@ class DSLService:
         self.default_svg_filename = "floor_plan_current.svg"
         self.default_svg_path = os.path.join(self.SVG_OUTPUT_DIR, self.default_svg_filename)
 
+        # Laid-out plans in the binary plan format, keyed by a hash of the DSL
+        # code and the layout version; the least recently used plans are
+        # deleted once there are more than max_plan_files or max_plan_bytes
+        self.plan_cache_dir = os.path.join(self.SVG_OUTPUT_DIR, "plans")
+        os.makedirs(self.plan_cache_dir, exist_ok=True)
+        self.max_plan_files = 1024
+        self.max_plan_bytes = 256 << 20
+
+        # Layout results keyed by the plan geometry, so code changes that
+        # leave the geometry alone (labels, styles) skip the layout pass
+        self.layout_cache = LayoutCache(directory=os.path.join(self.SVG_OUTPUT_DIR, "layouts"))
+
+        # Snap indexes of the most recently built plans, keyed by plan ID, so
+        # snapping during a drag never rebuilds the plan; plans built by
+        # another worker or forgotten meanwhile are reopened from their file
+        self.snap_indexes = OrderedDict()
+        self.max_snap_indexes = 64
+
         print(f"DSL Service initialized with output directory: {self.SVG_OUTPUT_DIR}")
 
     def process_dsl_code(self, dsl_code: str, user_id: str = None) -> Tuple[List[Dict[str, Any]], str]:
@@ -42,25 +65,7 @@ class DSLService:
         """
         try:
             print("Processing DSL code...")
-            # Create the lexer and parser
-            lexer = Lexer(dsl_code)
-            parser = Parser(lexer)
-
-            # Parse the input into an AST
-            program = parser.parse()
-
-            # Check for parsing errors
-            if parser.errors:
-                error_msg = "\n".join(parser.errors)
-                raise ValueError(f"Parsing errors: {error_msg}")
-
-            # Create the visitor to build the model
-            visitor = RenderingVisitor()
-            floor_plan = visitor.visit_program(program)
-
-            # Apply layout optimization
-            layout_manager = LayoutManager(floor_plan)
-            optimized_floor_plan = layout_manager.optimize_layout()
+            optimized_floor_plan = self._build_floor_plan(dsl_code)
 
             # Use a consistent filename instead of generating a new one each time
             svg_filename = self.default_svg_filename
@@ -90,6 +95,242 @@ class DSLService:
             print(f"Error processing DSL code: {str(e)}")
             raise Exception(f"Error processing DSL code: {str(e)}")
 
+    def analyze_egress(self, dsl_code: str) -> Dict[str, Any]:
+        """
+        Compute the walking distance from every room to the nearest stairs or elevator
+
+        Args:
+            dsl_code: DSL code to parse
+
+        Returns:
+            Dictionary with the exit room IDs and one entry per room
+        """
+        try:
+            floor_plan = self._build_floor_plan(dsl_code)
+            graph = floor_plan.get_connectivity_graph()
+            distances = graph.egress_distances()
+
+            rooms = []
+            for index, room in enumerate(graph.rooms):
+                distance = distances[room]
+                reachable = distance != math.inf
+                rooms.append({
+                    "id": room.id or f"room_{index}",
+                    "label": room.label,
+                    "distance": distance if reachable else None,
+                    "reachable": reachable,
+                    "route": [element.id for element in graph.egress_route(room) if element.id]
+                })
+
+            return {
+                "exits": [room.id for room in graph.exits if room.id],
+                "rooms": rooms
+            }
+
+        except Exception as e:
+            print(f"Error analyzing egress: {str(e)}")
+            raise Exception(f"Error analyzing egress: {str(e)}")
+
+    def analyze_footprint(self, dsl_code: str) -> Dict[str, Any]:
+        """
+        Compute the exact area covered by the rooms, where they overlap and
+        how much of the plan is left free
+
+        Args:
+            dsl_code: DSL code to parse
+
+        Returns:
+            Dictionary with the plan totals and one entry per room, in plan units
+        """
+        try:
+            floor_plan = self._build_floor_plan(dsl_code)
+            footprint = floor_plan.footprint()
+
+            rooms = []
+            for index, room in enumerate(floor_plan.rooms):
+                rooms.append({
+                    "id": room.id or f"room_{index}",
+                    "label": room.label,
+                    "area": room.polygon.area if room.points else room.width * room.height,
+                    "overlap": footprint.room_overlaps[room]
+                })
+
+            return {
+                "covered_area": footprint.covered_area,
+                "overlap_area": footprint.overlap_area,
+                "free_area": footprint.free_area,
+                "rooms": rooms
+            }
+
+        except Exception as e:
+            print(f"Error analyzing footprint: {str(e)}")
+            raise Exception(f"Error analyzing footprint: {str(e)}")
+
+    def plan_id(self, dsl_code: str) -> str:
+        """
+        Get the ID of the floor plan built from some DSL code
+
+        Args:
+            dsl_code: DSL code
+
+        Returns:
+            Hexadecimal digest of the code
+        """
+        return hashlib.sha256(dsl_code.encode("utf-8")).hexdigest()
+
+    def snap_element(self, plan_id: str, position: List[float], size: List[float], element_id: str = None,
+                     tolerance: float = 10.0, grid: float = None) -> Dict[str, Any]:
+        """
+        Snap a dragged element to the rooms and walls of a floor plan
+
+        Args:
+            plan_id: ID of a plan built before (see plan_id())
+            position: Position of the dragged element
+            size: Width and height of the dragged element
+            element_id: ID of the dragged element, which is not snapped to
+            tolerance: Largest distance a snap may move the element
+            grid: Optional grid spacing
+
+        Returns:
+            Dictionary with the snapped position, the offset applied and the
+            guides to draw, one per snapped axis
+
+        Raises:
+            KeyError: If the plan was never built, or its saved file is gone
+        """
+        index = self._snap_index(plan_id)
+
+        x, y = position
+        width, height = size
+        result = index.snap(x, y, x + width, y + height, tolerance, grid,
+                            exclude=(element_id,) if element_id else ())
+        offset_x = result.x.offset if result.x else 0.0
+        offset_y = result.y.offset if result.y else 0.0
+
+        guides = []
+        for axis, candidate in (("x", result.x), ("y", result.y)):
+            if candidate:
+                guides.append({
+                    "axis": axis,
+                    "kind": candidate.kind,
+                    "anchor": candidate.anchor,
+                    "target": candidate.target,
+                    "element_id": candidate.element_id
+                })
+
+        return {
+            "position": [x + offset_x, y + offset_y],
+            "offset": [offset_x, offset_y],
+            "guides": guides
+        }
+
+    def _snap_index(self, plan_id: str):
+        """
+        Get the snap index of a built plan
+
+        Plans this process has not built recently (built by another worker,
+        or forgotten to make room) are reopened from their saved plan file.
+
+        Args:
+            plan_id: ID of the plan
+
+        Returns:
+            SnapIndex of the plan
+
+        Raises:
+            KeyError: If the plan was never built, or its saved file is gone
+        """
+        index = self.snap_indexes.get(plan_id)
+        if index is not None:
+            self.snap_indexes.move_to_end(plan_id)
+            return index
+
+        # Plan IDs come from clients: only hexadecimal digests name plan files
+        if len(plan_id) != 64 or any(char not in "0123456789abcdef" for char in plan_id):
+            raise KeyError(plan_id)
+        plan_path = os.path.join(self.plan_cache_dir, f"{plan_id}-{LAYOUT_VERSION}.plan")
+        try:
+            floor_plan = read_floor_plan(plan_path)
+        except (OSError, ValueError) as e:
+            raise KeyError(plan_id) from e
+
+        # Mark the plan as recently used for prune_directory()
+        try:
+            os.utime(plan_path)
+        except OSError:
+            pass
+        self._remember_snap_index(plan_id, floor_plan)
+        return self.snap_indexes[plan_id]
+
+    def _remember_snap_index(self, plan_id: str, floor_plan):
+        """
+        Keep the snap index of a built plan, forgetting the least recently used one
+
+        Args:
+            plan_id: ID of the plan
+            floor_plan: The laid-out FloorPlan
+        """
+        self.snap_indexes[plan_id] = floor_plan.get_snap_index()
+        self.snap_indexes.move_to_end(plan_id)
+        if len(self.snap_indexes) > self.max_snap_indexes:
+            self.snap_indexes.popitem(last=False)
+
+    def _build_floor_plan(self, dsl_code: str):
+        """
+        Parse DSL code and lay out the resulting floor plan
+
+        Plans built before by the same layout version are reopened from
+        their saved binary file, which skips lexing, parsing, the visitor and
+        the layout pass.
+
+        Args:
+            dsl_code: DSL code to parse
+
+        Returns:
+            FloorPlan object
+        """
+        digest = self.plan_id(dsl_code)
+        plan_path = os.path.join(self.plan_cache_dir, f"{digest}-{LAYOUT_VERSION}.plan")
+        if os.path.exists(plan_path):
+            try:
+                floor_plan = read_floor_plan(plan_path)
+                # Mark the plan as recently used for prune_directory()
+                os.utime(plan_path)
+                self._remember_snap_index(digest, floor_plan)
+                return floor_plan
+            except (OSError, ValueError) as e:
+                # Written by an older format version or deleted meanwhile: build it again
+                print(f"Ignoring saved floor plan {plan_path}: {str(e)}")
+
+        # Create the lexer and parser
+        lexer = Lexer(dsl_code)
+        parser = Parser(lexer)
+
+        # Parse the input into an AST
+        program = parser.parse()
+
+        # Check for parsing errors
+        if parser.errors:
+            error_msg = "\n".join(parser.errors)
+            raise ValueError(f"Parsing errors: {error_msg}")
+
+        # Create the visitor to build the model
+        visitor = RenderingVisitor()
+        floor_plan = visitor.visit_program(program)
+
+        # Apply layout optimization
+        layout_manager = LayoutManager(floor_plan)
+        layout_manager.cache = self.layout_cache
+        floor_plan = layout_manager.optimize_layout()
+
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = f"{plan_path}.{uuid.uuid4().hex}.tmp"
+        write_floor_plan(floor_plan, temp_path)
+        os.replace(temp_path, plan_path)
+        prune_directory(self.plan_cache_dir, ".plan", self.max_plan_files, self.max_plan_bytes)
+        self._remember_snap_index(digest, floor_plan)
+        return floor_plan
+
     def _floor_plan_to_json(self, floor_plan) -> List[Dict[str, Any]]:
         """
         Convert a floor plan object to JSON format for the frontend
@@ -112,6 +353,8 @@ class DSLService:
             }
             if hasattr(room, 'label') and room.label:
                 room_json["label"] = room.label
+            if getattr(room, 'points', None):
+                room_json["points"] = [list(point) for point in room.points]
             elements.append(room_json)
 
         # Add walls
@@ -4,16 +4,45 @@ import { useEffect, useRef, useState } from "react"
 import { Button } from "@/components/ui/button"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
 import { Input } from "@/components/ui/input"
-import type { FloorPlanData, FloorPlanElement } from "@/lib/types"
+import type { FloorPlanData, FloorPlanElement, SnapGuide } from "@/lib/types"
 import { Trash2, MousePointer, Plus, ZoomIn, ZoomOut, Maximize, Save, X, Download } from "lucide-react"
 import { Card, CardContent } from "@/components/ui/card"
-import { parseFloorPlan } from "@/lib/api"
+import { parseFloorPlan, snapElement } from "@/lib/api"
 
 interface FloorPlanEditorProps {
   floorPlanData: FloorPlanData | null
   onUpdate: (data: FloorPlanData) => void
 }
 
+// Largest distance, in plan units, a snap may move a dragged element
+const SNAP_TOLERANCE = 10
+
+// Width and height of an element, or null for elements without a box (walls)
+function elementSize(element: FloorPlanElement): [number, number] | null {
+  if (element.size) return element.size;
+  if (element.width !== undefined && element.height !== undefined) return [element.width, element.height];
+  return null;
+}
+
+// Line a position up with the guides of a snap result. The pointer may have
+// moved on since the request, so each offset is worked out again from the
+// current position; guides now out of tolerance leave their axis alone.
+function applySnapGuides(position: [number, number], size: [number, number],
+                         guides: SnapGuide[]): [number, number] {
+  const snapped: [number, number] = [position[0], position[1]];
+  for (const guide of guides) {
+    const axis = guide.axis === "x" ? 0 : 1;
+    const anchor = guide.anchor === "min" ? position[axis]
+      : guide.anchor === "max" ? position[axis] + size[axis]
+      : position[axis] + size[axis] / 2;
+    const offset = guide.target - anchor;
+    if (Math.abs(offset) <= SNAP_TOLERANCE) {
+      snapped[axis] = position[axis] + offset;
+    }
+  }
+  return snapped;
+}
+
 export default function FloorPlanEditor({ floorPlanData, onUpdate }: FloorPlanEditorProps) {
   const svgContainerRef = useRef<HTMLDivElement>(null)
   const [selectedElement, setSelectedElement] = useState<string | null>(null)
@@ -23,6 +52,12 @@ export default function FloorPlanEditor({ floorPlanData, onUpdate }: FloorPlanEd
   const [timestamp, setTimestamp] = useState<number>(Date.now())
   const [dragging, setDragging] = useState<boolean>(false)
   const [dragStart, setDragStart] = useState<{x: number, y: number} | null>(null)
+  // Position the pointer drags the element to, before snapping
+  const rawDragPosition = useRef<[number, number] | null>(null)
+  // At most one snap request in flight, so slow responses never pile up
+  const snapPending = useRef<boolean>(false)
+  // Latest position dragged to while a request was in flight, snapped once it settles
+  const queuedSnap = useRef<{ element: FloorPlanElement, position: [number, number] } | null>(null)
   const [svgContent, setSvgContent] = useState<string>("")
 
   const [localFloorPlanData, setLocalFloorPlanData] = useState<FloorPlanData | null>(floorPlanData)
@@ -250,11 +285,72 @@ export default function FloorPlanEditor({ floorPlanData, onUpdate }: FloorPlanEd
     const coords = getSvgCoordinates(e);
     if (!coords) return;
 
+    const element = localFloorPlanData?.elements.find(el => el.id === selectedElement);
+    rawDragPosition.current = element?.position ? [element.position[0], element.position[1]] : null;
+
     setDragging(true);
     setDragStart(coords);
     e.preventDefault();
   }
 
+  const moveElement = (elementId: string, position: [number, number]) => {
+    setLocalFloorPlanData(prev => prev && {
+      ...prev,
+      elements: prev.elements.map(element =>
+        element.id === elementId ? { ...element, position } : element
+      )
+    });
+  }
+
+  const snapDraggedElement = (element: FloorPlanElement, position: [number, number]) => {
+    const size = elementSize(element);
+    if (!localFloorPlanData?.plan_id || !size) return;
+    if (snapPending.current) {
+      queuedSnap.current = { element, position };
+      return;
+    }
+
+    snapPending.current = true;
+    snapElement(localFloorPlanData.plan_id, position, size, element.id, SNAP_TOLERANCE)
+      .then(result => {
+        // Snap from where the pointer is now; nothing to do once the drag is over
+        const raw = rawDragPosition.current;
+        if (result && raw) {
+          moveElement(element.id, applySnapGuides(raw, size, result.guides));
+        }
+      })
+      .catch(err => console.error("Error snapping element:", err))
+      .finally(() => {
+        snapPending.current = false;
+        // Send the position the pointer reached meanwhile
+        const queued = queuedSnap.current;
+        queuedSnap.current = null;
+        if (queued && rawDragPosition.current) {
+          snapDraggedElement(queued.element, queued.position);
+        }
+      });
+  }
+
+  const snapDroppedElement = (data: FloorPlanData, position: [number, number] | null): Promise<FloorPlanData> => {
+    const element = data.elements.find(el => el.id === selectedElement);
+    const size = element && elementSize(element);
+    if (!element || !size || !position || !data.plan_id) return Promise.resolve(data);
+
+    return snapElement(data.plan_id, position, size, element.id, SNAP_TOLERANCE)
+      .then(result => {
+        const snapped = result ? applySnapGuides(position, size, result.guides) : position;
+        moveElement(element.id, snapped);
+        return {
+          ...data,
+          elements: data.elements.map(el => el.id === element.id ? { ...el, position: snapped } : el)
+        };
+      })
+      .catch(err => {
+        console.error("Error snapping dropped element:", err);
+        return data;
+      });
+  }
+
   const handleMouseMove = (e: React.MouseEvent) => {
     if (!dragging || !dragStart || !selectedElement || !localFloorPlanData) return;
 
@@ -267,10 +363,14 @@ export default function FloorPlanEditor({ floorPlanData, onUpdate }: FloorPlanEd
     const updatedElements = localFloorPlanData.elements.map(element => {
       if (element.id === selectedElement) {
         if (element.position) {
+          // Follow the pointer from the unsnapped position, then ask the server where to snap
+          const raw = rawDragPosition.current ?? element.position;
           const newPos: [number, number] = [
-            (element.position[0] + deltaX),
-            (element.position[1] + deltaY)
+            (raw[0] + deltaX),
+            (raw[1] + deltaY)
           ];
+          rawDragPosition.current = newPos;
+          snapDraggedElement(element, newPos);
           return {
             ...element,
             position: newPos
@@ -304,14 +404,16 @@ export default function FloorPlanEditor({ floorPlanData, onUpdate }: FloorPlanEd
 
   const handleMouseUp = () => {
     if (dragging && localFloorPlanData) {
-      const dslCode = generateDslCode(localFloorPlanData);
-
-      parseFloorPlan(dslCode)
+      // Snap the drop position itself; pending drag snaps are dropped with the drag
+      queuedSnap.current = null;
+      snapDroppedElement(localFloorPlanData, rawDragPosition.current)
+        .then(dropped => parseFloorPlan(generateDslCode(dropped)))
         .then(data => {
           if (data && localFloorPlanData) {
             setLocalFloorPlanData(prev => ({
               ...prev!,
-              svg_url: data.svg_url
+              svg_url: data.svg_url,
+              plan_id: data.plan_id
             }));
             setTimestamp(Date.now());
           }
@@ -321,6 +423,7 @@ export default function FloorPlanEditor({ floorPlanData, onUpdate }: FloorPlanEd
 
     setDragging(false);
     setDragStart(null);
+    rawDragPosition.current = null;
   }
 
   const addNewElement = (x: number, y: number) => {
@@ -1,4 +1,4 @@
-import type { FloorPlanData } from "./types"
+import type { FloorPlanData, SnapResult } from "./types"
 
 export async function parseFloorPlan(dslCode: string): Promise<FloorPlanData> {
   console.log("Sending DSL code to backend:", dslCode.substring(0, 100) + "...")
@@ -34,4 +34,35 @@ export async function parseFloorPlan(dslCode: string): Promise<FloorPlanData> {
     console.error("Error parsing floor plan:", error)
     throw error
   }
-}
\ No newline at end of file
+}
+
+export async function snapElement(
+  planId: string,
+  position: [number, number],
+  size: [number, number],
+  elementId?: string,
+  tolerance = 10,
+  grid?: number,
+): Promise<SnapResult | null> {
+  const response = await fetch("http://localhost:5001/api/snap", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      plan_id: planId,
+      position,
+      size,
+      element_id: elementId,
+      tolerance,
+      grid,
+    }),
+  })
+
+  // The server forgot the plan: snap nothing until the next parse
+  if (response.status === 404) {
+    return null
+  }
+  if (!response.ok) {
+    throw new Error(`Failed to snap element: ${response.status} ${response.statusText}`)
+  }
+  return response.json()
+}
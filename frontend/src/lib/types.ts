@@ -16,4 +16,19 @@ export interface FloorPlanElement {
 export interface FloorPlanData {
   elements: FloorPlanElement[];
   svg_url?: string;
+  plan_id?: string;
+}
+
+export interface SnapGuide {
+  axis: "x" | "y";
+  kind: "edge" | "center" | "grid";
+  anchor: "min" | "center" | "max";
+  target: number;
+  element_id?: string | null;
+}
+
+export interface SnapResult {
+  position: [number, number];
+  offset: [number, number];
+  guides: SnapGuide[];
 }
\ No newline at end of file
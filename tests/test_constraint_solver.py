@@ -0,0 +1,84 @@
+import pytest
+
+from DSL.Layout.ConstraintSolver import (ConstraintSolver, LinearConstraint, Variable, UnsatisfiableConstraintError,
+                                         WEAK, STRONG, EQ, LE, GE)
+
+
+def test_required_constraints_hold():
+    x, width = Variable('x'), Variable('width')
+    solver = ConstraintSolver()
+    # x >= 10, width == 30, x + width <= 100
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -10.0, GE))
+    solver.add_constraint(LinearConstraint([(width, 1.0)], -30.0, EQ))
+    solver.add_constraint(LinearConstraint([(x, 1.0), (width, 1.0)], -100.0, LE))
+    solver.update_variables()
+
+    assert width.value == pytest.approx(30.0)
+    assert 10.0 - 1e-9 <= x.value <= 70.0 + 1e-9
+
+
+def test_stronger_preference_wins():
+    x = Variable('x')
+    solver = ConstraintSolver()
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -20.0, EQ, WEAK))
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -50.0, EQ, STRONG))
+    solver.update_variables()
+
+    assert x.value == pytest.approx(50.0)
+
+
+def test_preference_gives_way_to_required_bound():
+    x = Variable('x')
+    solver = ConstraintSolver()
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -40.0, LE))
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -50.0, EQ, STRONG))
+    solver.update_variables()
+
+    assert x.value == pytest.approx(40.0)
+
+
+def test_contradicting_required_constraint_is_rejected():
+    x = Variable('x')
+    solver = ConstraintSolver()
+    at_least = LinearConstraint([(x, 1.0)], -10.0, GE)
+    solver.add_constraint(at_least)
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -15.0, EQ, WEAK))
+
+    contradiction = LinearConstraint([(x, 1.0)], -5.0, LE)
+    with pytest.raises(UnsatisfiableConstraintError):
+        solver.add_constraint(contradiction)
+
+    # The solver is left as it was and keeps working
+    assert not solver.has_constraint(contradiction)
+    solver.update_variables()
+    assert x.value == pytest.approx(15.0)
+    solver.remove_constraint(at_least)
+    solver.add_constraint(contradiction)
+    solver.update_variables()
+    assert x.value == pytest.approx(5.0)
+
+
+def test_contradicting_equalities_are_rejected():
+    x, y = Variable('x'), Variable('y')
+    solver = ConstraintSolver()
+    solver.add_constraint(LinearConstraint([(x, 1.0), (y, -1.0)], 0.0, EQ))
+    solver.add_constraint(LinearConstraint([(y, 1.0)], -3.0, EQ))
+
+    with pytest.raises(UnsatisfiableConstraintError):
+        solver.add_constraint(LinearConstraint([(x, 1.0)], -4.0, EQ))
+
+
+def test_edit_variable_follows_suggestions_within_bounds():
+    x = Variable('x')
+    solver = ConstraintSolver()
+    solver.add_constraint(LinearConstraint([(x, 1.0)], 0.0, GE))
+    solver.add_constraint(LinearConstraint([(x, 1.0)], -100.0, LE))
+    solver.add_edit_variable(x, STRONG)
+
+    solver.suggest_value(x, 30.0)
+    solver.update_variables()
+    assert x.value == pytest.approx(30.0)
+
+    solver.suggest_value(x, 130.0)
+    solver.update_variables()
+    assert x.value == pytest.approx(100.0)
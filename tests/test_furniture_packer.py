@@ -0,0 +1,59 @@
+from DSL.Layout.FurniturePacker import FurniturePacker, PackingProblem
+
+
+def packed_boxes(problem, result):
+    """List the (min_x, min_y, max_x, max_y) footprints of the packed items"""
+    boxes = []
+    for item, position in enumerate(result.positions):
+        if position is None:
+            continue
+        width, height = problem.widths[item], problem.heights[item]
+        if result.turned[item]:
+            width, height = height, width
+        boxes.append((position[0], position[1], position[0] + width, position[1] + height))
+    return boxes
+
+
+def test_items_keep_clear_of_the_walls():
+    problem = PackingProblem(100, 80, None, [], [30, 30, 20, 40], [20, 20, 20, 10],
+                             [True, True, False, True], clearance=10)
+    result = FurniturePacker().pack(problem)
+
+    boxes = packed_boxes(problem, result)
+    assert len(boxes) == 4
+    for min_x, min_y, max_x, max_y in boxes:
+        assert min_x >= 10 and min_y >= 10 and max_x <= 90 and max_y <= 70
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            assert a[2] <= b[0] or b[2] <= a[0] or a[3] <= b[1] or b[3] <= a[1]
+
+
+def test_item_filling_the_room_does_not_fit_with_clearance():
+    problem = PackingProblem(40, 40, None, [], [40], [40], [False])
+    assert FurniturePacker().pack(problem).positions == [(0, 0)]
+
+    result = FurniturePacker().pack(problem._replace(clearance=5))
+    assert result.positions == [None]
+    assert result.placed_area == 0
+
+
+def test_clearance_of_half_the_room_leaves_no_space():
+    problem = PackingProblem(40, 20, None, [], [1], [1], [False], clearance=10)
+    result = FurniturePacker().pack(problem)
+
+    assert result.positions == [None]
+
+
+def test_clearance_applies_to_polygon_outlines():
+    # L-shaped room: a 100 x 40 band along the top and a 40 x 100 band on the left
+    outline = [(0, 0), (100, 0), (100, 40), (40, 40), (40, 100), (0, 100)]
+    problem = PackingProblem(100, 100, outline, [], [20, 60], [20, 32], [False, False])
+    assert None not in FurniturePacker().pack(problem).positions
+
+    # 5 off the walls the bands are 30 deep: the 60 x 32 item fits in neither
+    problem = problem._replace(clearance=5)
+    result = FurniturePacker().pack(problem)
+    assert result.positions[1] is None
+    min_x, min_y, max_x, max_y = packed_boxes(problem, result)[0]
+    assert min_x >= 5 and min_y >= 5
+    assert (max_x <= 95 and max_y <= 35) or (max_x <= 35 and max_y <= 95)
@@ -0,0 +1,130 @@
+import contextlib
+import io
+
+from DSL.Models.FloorPlan import FloorPlan
+from DSL.Models.Room import Room
+from DSL.Layout.LayoutManager import LayoutManager
+from DSL.Layout.LayoutCache import LayoutCache
+
+
+def make_plan(rooms, width=100, height=100):
+    """Build a floor plan of (id, x, y, width, height) rooms"""
+    floor_plan = FloorPlan()
+    floor_plan.header = {'width': width, 'height': height}
+    for room in rooms:
+        floor_plan.add_room(Room(*room))
+    return floor_plan
+
+
+def overlaps(rooms):
+    """List the pairs of room IDs whose rectangles overlap"""
+    return [(a.id, b.id) for i, a in enumerate(rooms) for b in rooms[i + 1:]
+            if a.x < b.x + b.width and b.x < a.x + a.width and a.y < b.y + b.height and b.y < a.y + a.height]
+
+
+def inside(room, floor_plan):
+    return (room.x >= 0 and room.y >= 0 and room.x + room.width <= floor_plan.header['width'] and
+            room.y + room.height <= floor_plan.header['height'])
+
+
+def quiet(function, *args):
+    """Call a layout step without its progress output"""
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        result = function(*args)
+    return result, output.getvalue()
+
+
+# A room dropped on the first of two placed rooms, less than its width apart:
+# pushed out of one it lands in the other and the pushes bounce between them
+BOUNCING_ROOMS = [('a', 0, 0, 10, 10), ('b', 13, 0, 10, 10), ('r', 2, 0, 10, 10)]
+
+
+def test_bouncing_pushes_stop_and_fall_back_to_free_space():
+    floor_plan = make_plan(BOUNCING_ROOMS)
+    layout_manager = LayoutManager(floor_plan)
+    pushes = []
+    push_out = layout_manager._push_out
+    layout_manager._push_out = lambda *args: pushes.append(args[0].id) or push_out(*args)
+
+    quiet(layout_manager._prevent_room_intersections)
+
+    assert overlaps(floor_plan.rooms) == []
+    assert all(inside(room, floor_plan) for room in floor_plan.rooms)
+    # The loop stops when the room comes back to a position it had
+    assert pushes == ['r', 'r']
+
+
+def test_push_limit_is_respected():
+    floor_plan = make_plan(BOUNCING_ROOMS)
+    layout_manager = LayoutManager(floor_plan)
+    layout_manager.max_push_iterations = 1
+    pushes = []
+    push_out = layout_manager._push_out
+    layout_manager._push_out = lambda *args: pushes.append(args[0].id) or push_out(*args)
+
+    quiet(layout_manager._prevent_room_intersections)
+
+    assert pushes == ['r']
+    assert overlaps(floor_plan.rooms) == []
+
+
+def test_free_space_search_keeps_the_room_gap():
+    floor_plan = make_plan(BOUNCING_ROOMS)
+    layout_manager = LayoutManager(floor_plan)
+    layout_manager.max_push_iterations = 0
+
+    quiet(layout_manager._prevent_room_intersections)
+
+    a, b, r = floor_plan.rooms
+    for other in (a, b):
+        gap_x = max(other.x - (r.x + r.width), r.x - (other.x + other.width))
+        gap_y = max(other.y - (r.y + r.height), r.y - (other.y + other.height))
+        assert max(gap_x, gap_y) >= layout_manager.room_gap
+
+
+def test_rooms_that_do_not_fit_are_reported():
+    floor_plan = make_plan([(f"r{i}", 0, 0, 8, 8) for i in range(3)], width=10, height=10)
+    layout_manager = LayoutManager(floor_plan)
+
+    _, output = quiet(layout_manager._prevent_room_intersections)
+
+    assert "2 room(s) do not fit inside the 10x10 plan" in output
+    assert "r1, r2" in output
+    assert overlaps(floor_plan.rooms) == []
+    assert [inside(room, floor_plan) for room in floor_plan.rooms] == [True, False, False]
+
+
+def test_cache_key_covers_input_and_settings():
+    key = LayoutManager(make_plan(BOUNCING_ROOMS))._cache_key()
+
+    assert LayoutManager(make_plan(BOUNCING_ROOMS))._cache_key() == key
+
+    moved = [('a', 0, 0, 10, 10), ('b', 13, 0, 10, 10), ('r', 3, 0, 10, 10)]
+    assert LayoutManager(make_plan(moved))._cache_key() != key
+
+    layout_manager = LayoutManager(make_plan(BOUNCING_ROOMS))
+    layout_manager.room_gap = 2
+    assert layout_manager._cache_key() != key
+
+    layout_manager = LayoutManager(make_plan(BOUNCING_ROOMS))
+    layout_manager.max_push_iterations = 4
+    assert layout_manager._cache_key() != key
+
+
+def test_cached_layout_round_trips_through_disk(tmp_path):
+    floor_plan = make_plan(BOUNCING_ROOMS)
+    layout_manager = LayoutManager(floor_plan)
+    layout_manager.cache = LayoutCache(directory=str(tmp_path))
+    quiet(layout_manager.optimize_layout)
+    laid_out = [(room.x, room.y, room.width, room.height) for room in floor_plan.rooms]
+
+    # A new cache on the same directory only has the file written above
+    restored_plan = make_plan(BOUNCING_ROOMS)
+    layout_manager = LayoutManager(restored_plan)
+    layout_manager.cache = LayoutCache(directory=str(tmp_path))
+    # Laying out again would fail: the result has to come from the cache
+    layout_manager._prevent_room_intersections = None
+    quiet(layout_manager.optimize_layout)
+
+    assert layout_manager.cache.hits == 1
+    assert [(room.x, room.y, room.width, room.height) for room in restored_plan.rooms] == laid_out
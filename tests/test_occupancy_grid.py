@@ -0,0 +1,61 @@
+import math
+import random
+
+import numpy as np
+
+from DSL.Geometry.OccupancyGrid import OccupancyGrid
+
+
+def brute_force_nearest(grid, width, height, x, y):
+    """Check every cell corner for the closest one where a box fits"""
+    size = grid.cell_size
+    columns, rows = math.ceil(width / size), math.ceil(height / size)
+    max_column = math.floor((grid.width - width) / size)
+    max_row = math.floor((grid.height - height) / size)
+    if max_column < 0 or max_row < 0 or rows > grid.rows or columns > grid.columns:
+        return None
+
+    # Taken cells under the box at every corner, from an integral image
+    sums = np.zeros((grid.rows + 1, grid.columns + 1), dtype=np.int64)
+    sums[1:, 1:] = grid.taken.cumsum(axis=0).cumsum(axis=1)
+    taken = sums[rows:, columns:] - sums[:-rows, columns:] - sums[rows:, :-columns] + sums[:-rows, :-columns]
+    corner_rows, corner_columns = np.nonzero(taken[:max_row + 1, :max_column + 1] == 0)
+    if not len(corner_rows):
+        return None
+    corners = [((column * size - x) ** 2 + (row * size - y) ** 2, row * size, column * size)
+               for row, column in zip(corner_rows.tolist(), corner_columns.tolist())]
+    best = min(corners)
+    return best[2], best[1]
+
+
+def test_block_marks_the_cells_a_box_reaches_into():
+    grid = OccupancyGrid(16, 8, 2)
+    grid.block(1, 2, 4, 4)
+
+    assert np.argwhere(grid.taken).tolist() == [[1, 0], [1, 1]]
+
+
+def test_nearest_free_matches_brute_force():
+    rng = random.Random(3)
+    for _ in range(20):
+        width, height = rng.randint(20, 300), rng.randint(20, 300)
+        grid = OccupancyGrid(width, height, rng.choice([1, 2, 0.5]))
+        for _ in range(30):
+            for _ in range(rng.randint(0, 6)):
+                x, y = rng.uniform(-5, width), rng.uniform(-5, height)
+                grid.block(x, y, x + rng.uniform(1, 40), y + rng.uniform(1, 40))
+            box_width, box_height = rng.uniform(0.5, 50), rng.uniform(0.5, 50)
+            x, y = rng.uniform(-10, width + 10), rng.uniform(-10, height + 10)
+
+            expected = brute_force_nearest(grid, box_width, box_height, x, y)
+            assert grid.nearest_free(box_width, box_height, x, y) == expected
+
+
+def test_full_area_has_no_free_position():
+    grid = OccupancyGrid(100, 100, 1)
+    grid.block(0, 0, 100, 60)
+    grid.block(0, 60, 50, 100)
+
+    assert grid.nearest_free(60, 10, 0, 0) is None
+    assert grid.nearest_free(50, 40, 0, 0) == (50, 60)
+    assert grid.nearest_free(101, 1, 0, 0) is None
@@ -0,0 +1,62 @@
+from DSL.Geometry.SnapIndex import SnapIndex
+from DSL.Models.Room import Room
+from DSL.Models.Wall import Wall
+
+
+def make_index():
+    return SnapIndex([Room('a', 0, 0, 100, 50), Room('b', 200, 0, 40, 40)], [Wall('w', 0, 300, 500, 300)])
+
+
+def test_edge_within_tolerance_snaps():
+    # Dragged rectangle whose left side is 3 right of room a's right edge
+    result = make_index().snap(103, 60, 133, 90, tolerance=5)
+
+    assert result.x.offset == -3
+    assert (result.x.anchor, result.x.target, result.x.kind, result.x.element_id) == ('min', 100, 'edge', 'a')
+
+
+def test_nothing_beyond_tolerance():
+    result = make_index().snap(106, 60, 136, 90, tolerance=5)
+
+    assert result.x is None
+    assert result.candidates_x == []
+
+
+def test_tolerance_is_inclusive():
+    result = make_index().snap(105, 60, 135, 90, tolerance=5)
+
+    assert result.x.offset == -5
+
+
+def test_closest_candidate_wins_and_edges_beat_centers():
+    # Center 1 left of room a's center, left side 3 from room a's left edge
+    result = make_index().snap(3, 60, 95, 90, tolerance=5)
+    assert result.x.anchor == 'center' and result.x.target == 50
+
+    # Right side 2 left of room b's left edge
+    result = make_index().snap(155, 60, 198, 90, tolerance=5)
+    assert result.x.anchor == 'max' and result.x.target == 200 and result.x.kind == 'edge'
+
+    # Same distance to an edge and to a center: the edge first
+    index = SnapIndex([Room('a', 0, 0, 20, 20), Room('b', 14, 50, 20, 20)])
+    result = index.snap(22, 100, 30, 120, tolerance=3)
+    assert [(candidate.offset, candidate.kind) for candidate in result.candidates_x] == [(-2, 'edge'), (-2, 'center')]
+
+
+def test_excluded_element_is_skipped():
+    index = make_index()
+    # Room b dragged by 3: its own edges must not hold it in place
+    result = index.snap(203, 0, 243, 40, tolerance=5, exclude=('b',))
+
+    assert all(candidate.element_id != 'b' for candidate in result.candidates_x + result.candidates_y)
+    assert result.x is None
+
+    result = index.snap(203, 0, 243, 40, tolerance=5)
+    assert result.x.element_id == 'b' and result.x.offset == -3
+
+
+def test_walls_and_grid():
+    result = make_index().snap(400, 296, 420, 298, tolerance=5, grid_size=25)
+
+    assert result.y.target == 300 and result.y.element_id == 'w'
+    assert result.x.kind == 'grid' and result.x.offset == 0